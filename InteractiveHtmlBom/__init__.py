@@ -2,14 +2,15 @@ import sys
 import threading
 import time
 
-import pcbnew
-import wx
-import wx.aui
+try:
+    import pcbnew
+except ImportError:
+    # Imported as a package outside of KiCad, e.g. by headless cli
+    pcbnew = None
 
-from .generate_interactive_bom import InteractiveHtmlBomPlugin
 
-
-def check_for_bom_button():
+def check_for_bom_button(plugin):
+    import wx
     # From Miles McCoo's blog
     # https://kicad.mmccoo.com/2017/03/05/adding-your-own-command-buttons-to-the-pcbnew-gui/
     def find_pcbnew_window():
@@ -44,13 +45,22 @@ def check_for_bom_button():
             top_tb.Realize()
 
 
-plugin = InteractiveHtmlBomPlugin()
-plugin.defaults()
-plugin.register()
+def register_plugin():
+    import wx.aui
+    from .generate_interactive_bom import InteractiveHtmlBomPlugin
+
+    plugin = InteractiveHtmlBomPlugin()
+    plugin.defaults()
+    plugin.register()
+
+    # Add a button the hacky way if plugin button is not supported
+    # in pcbnew, unless this is linux.
+    if not plugin.pcbnew_icon_support and \
+            not sys.platform.startswith('linux'):
+        t = threading.Thread(target=check_for_bom_button, args=(plugin,))
+        t.daemon = True
+        t.start()
+
 
-# Add a button the hacky way if plugin button is not supported
-# in pcbnew, unless this is linux.
-if not plugin.pcbnew_icon_support and not sys.platform.startswith('linux'):
-    t = threading.Thread(target=check_for_bom_button)
-    t.daemon = True
-    t.start()
+if pcbnew is not None and not getattr(pcbnew, 'IS_BOARD_MODEL', False):
+    register_plugin()
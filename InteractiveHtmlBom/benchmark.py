@@ -0,0 +1,991 @@
+# -*- coding: utf-8 -*-
+"""
+Micro benchmarks for InteractiveHtmlBom internals.
+
+Run from a python environment where pcbnew is importable, otherwise the
+bundled board reader is used, e.g.:
+    python benchmark.py bom --modules 6000
+    python benchmark.py sort --modules 50000
+    python benchmark.py profile --board board.kicad_pcb
+    python benchmark.py xml --modules 20000
+    python benchmark.py text --modules 2000
+
+Baseline numbers and expected outputs come from the plugin as it is in a
+git revision, by default the one before the optimizations, which is
+exported to a temporary directory:
+    python benchmark.py units netlist --baseline HEAD~10
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import importlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import timeit
+import types
+
+if __name__ == "__main__":
+    # Same trick as in generate_interactive_bom.py to allow relative imports.
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    __package__ = os.path.basename(dirname)
+    sys.path.insert(0, os.path.dirname(dirname))
+    __import__(__package__)
+
+try:
+    import pcbnew
+except ImportError:
+    from .core import kicad_pcb
+    pcbnew = kicad_pcb.install()
+
+from .core import bbox_index
+from .core import compact
+from .core import fontparser
+from .core import ibom
+from .core import template
+from .core import units
+from .core.config import Config
+from .core.text_geometry import TextTessellator
+from .schematic_data import sexpressions
+from .schematic_data.netlistparser import NetlistParser
+from .schematic_data.xmlparser import XmlParser
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2
+    tracemalloc = None
+
+SYNTHETIC_PARTS = [
+    ('C', ['100n', '0.1uF', '10u', '1u', '22p', '4.7uF'], 'C_0402'),
+    ('R', ['10k', '10K', '4k7', '100R', '0R', '1M', '49.9'], 'R_0402'),
+    ('L', ['10uH', '2.2u', '100nH'], 'L_0805'),
+    ('D', ['LED', 'BAT54', '1N4148'], 'D_SOD-123'),
+    ('U', ['STM32F4', 'LM317', 'TPS62130'], 'QFN-48'),
+    ('J', ['Conn_01x04', 'USB_C'], 'PinHeader_1x04'),
+]
+
+
+class SyntheticFpid:
+    def __init__(self, name):
+        self.name = name
+
+    def GetLibItemName(self):
+        return self.name
+
+
+class SyntheticModule:
+    """Stand-in for pcbnew.MODULE exposing what BOM generation reads."""
+
+    def __init__(self, ref, value, footprint, layer, attributes=0):
+        self.ref = ref
+        self.value = value
+        self.fpid = SyntheticFpid(footprint)
+        self.layer = layer
+        self.attributes = attributes
+
+    def GetReference(self):
+        return self.ref
+
+    def GetValue(self):
+        return self.value
+
+    def GetFPID(self):
+        return self.fpid
+
+    def GetLayer(self):
+        return self.layer
+
+    def GetAttributes(self):
+        return self.attributes
+
+
+def synthetic_modules(count, seed=0):
+    rnd = random.Random(seed)
+    counters = {}
+    modules = []
+    for _ in range(count):
+        prefix, values, footprint = rnd.choice(SYNTHETIC_PARTS)
+        counters[prefix] = counters.get(prefix, 0) + 1
+        ref = '%s%d' % (prefix, counters[prefix])
+        layer = pcbnew.F_Cu if rnd.random() < 0.8 else pcbnew.B_Cu
+        modules.append(SyntheticModule(
+                ref, rnd.choice(values), footprint, layer,
+                attributes=rnd.choice([0, 0, 0, 1, 2])))
+    rnd.shuffle(modules)
+    return modules
+
+
+BASELINE_PACKAGE = 'ibom_baseline'
+# Last revision before the optimization series
+BASELINE_REVISION = '8de26fb2d9b2ad9068ff05f773e8ec3d5d26a53b'
+
+
+class PluginModules:
+    """Plugin modules that benchmarks compare, imported from package."""
+    NAMES = ['core.ibom', 'core.units', 'core.fontparser',
+             'schematic_data.sexpressions', 'schematic_data.netlistparser',
+             'schematic_data.xmlparser']
+
+    def __init__(self, package):
+        for name in self.NAMES:
+            module = importlib.import_module(package + '.' + name)
+            setattr(self, name.split('.')[-1], module)
+
+
+class PlaceholderModule(types.ModuleType):
+    """Stands in for wx that baseline modules import but never use here."""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+
+def load_baseline(rev, tmp_dir):
+    """
+    Imports plugin modules as they are in a git revision.
+    :param rev: git revision
+    :param tmp_dir: directory the plugin tree is exported to
+    :return: PluginModules of the revision
+    """
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    top_dir, prefix = subprocess.check_output(
+            ['git', 'rev-parse', '--show-toplevel', '--show-prefix'],
+            cwd=plugin_dir).decode('utf-8').splitlines()
+    archive = subprocess.check_output(
+            ['git', 'archive', '--format=tar', '%s:%s' % (rev, prefix)],
+            cwd=top_dir)
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(tmp_dir)
+    package = types.ModuleType(BASELINE_PACKAGE)
+    package.__path__ = [tmp_dir]
+    # Settings dialog is only used by the plugin ui
+    package.dialog = types.ModuleType(BASELINE_PACKAGE + '.dialog')
+    sys.modules[BASELINE_PACKAGE] = package
+    sys.modules[package.dialog.__name__] = package.dialog
+    placeholders = []
+    try:
+        import wx
+    except ImportError:
+        sys.modules['wx'] = PlaceholderModule('wx')
+        placeholders.append('wx')
+    # Baseline ibom sets up its own handler on the shared logger
+    logger = logging.getLogger('InteractiveHtmlBom')
+    handlers = list(logger.handlers)
+    try:
+        return PluginModules(BASELINE_PACKAGE)
+    finally:
+        logger.handlers = handlers
+        for name in placeholders:
+            del sys.modules[name]
+
+
+def baseline_bom_tables(baseline, modules, config, extra_data):
+    """Revisions before group_bom() generate each table separately."""
+    if hasattr(baseline.ibom, 'group_bom'):
+        return baseline.ibom.group_bom(modules, config, extra_data)
+    tables = {"both": baseline.ibom.generate_bom(modules, config, extra_data)}
+    for layer in (pcbnew.F_Cu, pcbnew.B_Cu):
+        tables["F" if layer == pcbnew.F_Cu else "B"] = \
+            baseline.ibom.generate_bom(modules, config, extra_data,
+                                       filter_layer=layer)
+    return tables
+
+
+def baseline_skip_components(baseline, modules, config, extra_data):
+    """Revisions before ComponentFilter check components one by one."""
+    if hasattr(baseline.ibom, 'ComponentFilter'):
+        skip = baseline.ibom.ComponentFilter(config, extra_data)
+        return [skip(m) for m in modules]
+    return [baseline.ibom.skip_component(m, config, extra_data, None)
+            for m in modules]
+
+
+def baseline_component_values(baseline, values):
+    """Revisions before componentValues() have no normalizer cache."""
+    if hasattr(baseline.units, 'componentValues'):
+        return cold_component_values(baseline.units, values)
+    return [baseline.units.componentValue(v) for v in values]
+
+
+def cold_component_values(units_module, values):
+    units_module.clearCache()
+    return units_module.componentValues(values)
+
+
+def best_time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def report(name, baseline, optimized):
+    print("%-10s baseline %8.1f ms  optimized %8.1f ms  speedup %.2fx" % (
+        name, baseline * 1e3, optimized * 1e3, baseline / optimized))
+
+
+def bench_bom(args, baseline):
+    config = Config()
+    modules = synthetic_modules(args.modules)
+    expected = json.dumps(baseline_bom_tables(baseline, modules, config, {}))
+    actual = json.dumps(ibom.group_bom(modules, config, {}))
+    assert expected == actual, "group_bom output differs from baseline"
+    report('bom',
+           best_time(lambda: baseline_bom_tables(baseline, modules, config,
+                                                 {}),
+                     args.repeat),
+           best_time(lambda: ibom.group_bom(modules, config, {}),
+                     args.repeat))
+
+
+def synthetic_filter_setup(modules, seed=0):
+    """Config with blacklists and variants and extra data matching it."""
+    rnd = random.Random(seed)
+    config = Config()
+    config.component_blacklist = ['MH*', 'J*', 'TP1', 'TP2', 'R7', 'C100']
+    config.blacklist_empty_val = True
+    config.dnp_field = 'DNP'
+    config.board_variant_field = 'Variant'
+    config.board_variant_whitelist = ['', 'A', 'B']
+    config.board_variant_blacklist = ['B']
+    extra_data = {}
+    for m in modules:
+        if rnd.random() < 0.1:
+            # Missing from schematic data
+            continue
+        fields = {'Variant': rnd.choice(['', '', 'A', 'B', 'C'])}
+        if rnd.random() < 0.05:
+            fields['DNP'] = 'DNP'
+        extra_data[m.GetReference()] = fields
+    for m in modules[::50]:
+        m.value = rnd.choice(['', '~'])
+    return config, extra_data
+
+
+def bench_filter(args, baseline):
+    modules = synthetic_modules(args.modules)
+    config, extra_data = synthetic_filter_setup(modules)
+
+    def skip_baseline():
+        return baseline_skip_components(baseline, modules, config, extra_data)
+
+    def compiled():
+        skip = ibom.ComponentFilter(config, extra_data)
+        return [skip(m) for m in modules]
+
+    assert skip_baseline() == compiled(), \
+        "ComponentFilter verdicts differ from baseline"
+    expected = json.dumps(
+            baseline_bom_tables(baseline, modules, config, extra_data))
+    actual = json.dumps(ibom.group_bom(modules, config, extra_data))
+    assert expected == actual, "group_bom output differs from baseline"
+    report('filter', best_time(skip_baseline, args.repeat),
+           best_time(compiled, args.repeat))
+
+
+def captured_part_groups(ibom_module, modules, config):
+    """Part groups that group_bom() of ibom_module passes to sorting."""
+    captured = []
+    original = ibom_module.sort_bom_tables
+
+    def capture(part_groups, config):
+        captured.append(part_groups)
+        return original(part_groups, config)
+
+    ibom_module.sort_bom_tables = capture
+    try:
+        ibom_module.group_bom(modules, config, {})
+    finally:
+        ibom_module.sort_bom_tables = original
+    return captured[0]
+
+
+def baseline_sort_time(baseline, modules, config, repeat):
+    """
+    Best time baseline spends sorting bom tables. Revisions before
+    sort_bom_tables() sort inside generate_bom(), there the time of its
+    sorted() calls is measured.
+    """
+    if hasattr(baseline.ibom, 'sort_bom_tables'):
+        part_groups = captured_part_groups(baseline.ibom, modules, config)
+        return best_time(
+                lambda: baseline.ibom.sort_bom_tables(part_groups, config),
+                repeat)
+    elapsed = [0.0]
+
+    def timed_sorted(*args, **kwargs):
+        start = timeit.default_timer()
+        try:
+            return sorted(*args, **kwargs)
+        finally:
+            elapsed[0] += timeit.default_timer() - start
+
+    # Module globals shadow builtins for code of the baseline module
+    baseline.ibom.sorted = timed_sorted
+    try:
+        times = []
+        for _ in range(repeat):
+            elapsed[0] = 0.0
+            baseline_bom_tables(baseline, modules, config, {})
+            times.append(elapsed[0])
+        return min(times)
+    finally:
+        del baseline.ibom.sorted
+
+
+def bench_sort(args, baseline):
+    config = Config()
+    modules = synthetic_modules(args.modules)
+    part_groups = captured_part_groups(ibom, modules, config)
+    expected = json.dumps(baseline_bom_tables(baseline, modules, config, {}))
+    actual = json.dumps(ibom.sort_bom_tables(part_groups, config))
+    assert expected == actual, "sort_bom_tables output differs from baseline"
+    report('sort', baseline_sort_time(baseline, modules, config, args.repeat),
+           best_time(lambda: ibom.sort_bom_tables(part_groups, config),
+                     args.repeat))
+
+
+def synthetic_module_bboxes(count, seed=0):
+    """pcbdata modules with only ref, layer and bbox on a 300x200 mm board."""
+    rnd = random.Random(seed)
+    modules = []
+    for i in range(count):
+        if rnd.random() < 0.02:
+            w, h = rnd.uniform(10, 40), rnd.uniform(5, 15)
+        else:
+            w, h = rnd.uniform(0.5, 5), rnd.uniform(0.3, 3)
+        x = rnd.uniform(0, 300 - w)
+        y = rnd.uniform(0, 200 - h)
+        modules.append({
+            "ref": "U%d" % i,
+            "layer": "F" if rnd.random() < 0.8 else "B",
+            "bbox": {"pos": [x, y], "size": [w, h]},
+        })
+    return modules
+
+
+def quantized_bboxes(modules):
+    """Modules with bboxes rounded the way compact pcbdata stores them."""
+    result = []
+    for m in modules:
+        b = m["bbox"]
+        result.append(dict(m, bbox={
+            "pos": [compact.quantize(v) * 1.0 / compact.COORD_SCALE
+                    for v in b["pos"]],
+            "size": [compact.quantize(v) * 1.0 / compact.COORD_SCALE
+                     for v in b["size"]],
+        }))
+    return result
+
+
+def find_node():
+    for name in ('node', 'nodejs'):
+        for path in os.environ.get('PATH', '').split(os.pathsep):
+            if os.path.isfile(os.path.join(path, name)):
+                return os.path.join(path, name)
+    return None
+
+
+def run_render_js(function_names, script_lines, data):
+    """
+    Runs functions of render.js with node. Script reads data from variable
+    input and writes its result as json to stdout.
+    :return: decoded output, None if node is not available
+    """
+    node = find_node()
+    if node is None:
+        return None
+    render_js = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'web', 'render.js')
+    with io.open(render_js, 'r', encoding='utf-8') as f:
+        source = f.read()
+    functions = [re.search(r'^function %s\(.*?^}$' % name, source,
+                           re.M | re.S).group(0)
+                 for name in function_names]
+    script = '\n'.join(functions + [
+        'var input = JSON.parse(require("fs").readFileSync(0, "utf8"));',
+    ] + script_lines)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        script_file = os.path.join(tmp_dir, 'bench.js')
+        with io.open(script_file, 'w', encoding='utf-8') as f:
+            f.write(script)
+        process = subprocess.Popen(
+                [node, script_file], stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE)
+        output, _ = process.communicate(json.dumps(data).encode('utf-8'))
+    finally:
+        shutil.rmtree(tmp_dir)
+    if process.returncode != 0:
+        raise RuntimeError("node failed with code %d" % process.returncode)
+    return json.loads(output.decode('utf-8'))
+
+
+def node_bbox_queries(modules, index, points):
+    """
+    Runs bboxScan() and bboxQuery() of render.js with node.
+    :return: tuple of scan and query results, None if node is not available
+    """
+    result = run_render_js(('bboxScan', 'bboxQuery'), [
+        'var pcbdata = input.pcbdata;',
+        'var scan = [], query = [];',
+        'for (var p of input.points) {',
+        '  scan.push(bboxScan(p[0], p[1], p[2]));',
+        '  query.push(bboxQuery(p[0], p[1], p[2]));',
+        '}',
+        'process.stdout.write(JSON.stringify([scan, query]));',
+    ], {
+        "pcbdata": {"modules": modules, "bbox_index": index},
+        "points": points,
+    })
+    return tuple(result) if result is not None else None
+
+
+def bench_bbox(args, baseline):
+    rnd = random.Random(1)
+    modules = synthetic_module_bboxes(args.modules)
+    index = bbox_index.build_bbox_index(modules)
+    points = [(rnd.choice('FB'), rnd.uniform(-5, 305), rnd.uniform(-5, 205))
+              for _ in range(2000)]
+    # Points on bbox corners and edges
+    for m in modules[:500]:
+        b = m["bbox"]
+        points.append((m["layer"], b["pos"][0], b["pos"][1]))
+        points.append((m["layer"], b["pos"][0] + b["size"][0],
+                       b["pos"][1] + b["size"][1] * 0.5))
+    # Index is built from exact bboxes, compact formats round them later.
+    # bbox_index.query() itself is checked against scan() in the tests.
+    for checked in (modules, quantized_bboxes(modules)):
+        node_result = node_bbox_queries(checked, index, points)
+        if node_result is None:
+            print("bbox: node not found, render.js queries not checked")
+        else:
+            assert node_result[0] == node_result[1], \
+                "render.js bboxQuery() differs from bboxScan()"
+            assert node_result[1] == [
+                bbox_index.query(index, checked, *p) for p in points], \
+                "render.js bboxQuery() differs from bbox_index.query()"
+
+    def scan_all():
+        for layer, x, y in points:
+            bbox_index.scan(modules, layer, x, y)
+
+    def query_all():
+        for layer, x, y in points:
+            bbox_index.query(index, modules, layer, x, y)
+
+    report('bbox', best_time(scan_all, args.repeat),
+           best_time(query_all, args.repeat))
+    print("bbox index build %.1f ms, %d cells, %d items" % (
+        best_time(lambda: bbox_index.build_bbox_index(modules),
+                  args.repeat) * 1e3,
+        sum(len(g["offsets"]) - 1 for g in index.values()),
+        sum(len(g["items"]) for g in index.values())))
+
+
+def synthetic_texts(count, seed=0):
+    rnd = random.Random(seed)
+    words = ['R1', 'C105', 'U2', 'GND', '+3V3', 'Vin', 'LED_1', 'rev 2.1',
+             'TP 14', 'J3', 'SW_RESET', 'Q7\nBSS138', 'X1\n16MHz\n']
+    texts = []
+    for _ in range(count):
+        size = rnd.choice([0.8, 1, 1.27, 1.5])
+        text = {
+            "pos": [round(rnd.uniform(0, 300), 3),
+                    round(rnd.uniform(0, 200), 3)],
+            "text": rnd.choice(words),
+            "height": size,
+            "width": size * rnd.choice([1, 1, 0.8]),
+            "horiz_justify": rnd.choice([-1, 0, 0, 1]),
+            "thickness": round(size * 0.15, 4),
+            "attr": rnd.choice([[], [], ["italic"], ["mirrored"],
+                                ["mirrored", "italic"]]),
+            "angle": rnd.choice([0, 0, 90, 180, 270, 45, 12.5]),
+        }
+        texts.append(text)
+    # Same text placed twice, like a module value on silk and fab layers
+    texts.extend(dict(t) for t in texts[:count // 10])
+    return texts
+
+
+def node_text_segments(texts, font_data, polylines):
+    """
+    Runs drawtext() and drawPolylines() of render.js with node against a
+    canvas mock that records line segments in board coordinates.
+    :return: tuple of drawtext segments per text, drawPolylines segments
+        per text and drawtext, drawPolylines times in ms, None if node is
+        not available
+    """
+    return run_render_js(('deg2rad', 'calcFontPoint', 'drawtext',
+                          'drawPolylines'), [
+        'var pcbdata = {font_data: input.font_data};',
+        'function MockContext() {',
+        '  this.m = [1, 0, 0, 1, 0, 0];',
+        '  this.stack = [];',
+        '  this.segments = [];',
+        '  this.last = null;',
+        '}',
+        'MockContext.prototype = {',
+        '  save: function() { this.stack.push(this.m.slice()); },',
+        '  restore: function() { this.m = this.stack.pop(); },',
+        '  transform: function(a, b, c, d, e, f) {',
+        '    var m = this.m;',
+        '    this.m = [m[0] * a + m[2] * b, m[1] * a + m[3] * b,',
+        '              m[0] * c + m[2] * d, m[1] * c + m[3] * d,',
+        '              m[0] * e + m[2] * f + m[4],',
+        '              m[1] * e + m[3] * f + m[5]];',
+        '  },',
+        '  translate: function(x, y) { this.transform(1, 0, 0, 1, x, y); },',
+        '  scale: function(x, y) { this.transform(x, 0, 0, y, 0, 0); },',
+        '  rotate: function(a) {',
+        '    var c = Math.cos(a), s = Math.sin(a);',
+        '    this.transform(c, s, -s, c, 0, 0);',
+        '  },',
+        '  apply: function(x, y) {',
+        '    var m = this.m;',
+        '    return [m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5]];',
+        '  },',
+        '  beginPath: function() {},',
+        '  stroke: function() {},',
+        '  moveTo: function(x, y) { this.last = this.apply(x, y); },',
+        '  lineTo: function(x, y) {',
+        '    var p = this.apply(x, y);',
+        '    this.segments.push(this.last.concat(p));',
+        '    this.last = p;',
+        '  },',
+        '};',
+        'function record(draw, items) {',
+        '  return items.map(function(item) {',
+        '    var ctx = new MockContext();',
+        '    draw(ctx, item, "#000");',
+        '    return ctx.segments;',
+        '  });',
+        '}',
+        'function time(draw, items) {',
+        '  var ctx = new MockContext();',
+        '  var best = Infinity;',
+        '  for (var r = 0; r < 5; r++) {',
+        '    var start = process.hrtime();',
+        '    for (var item of items) draw(ctx, item, "#000");',
+        '    var t = process.hrtime(start);',
+        '    ctx.segments = [];',
+        '    best = Math.min(best, t[0] * 1e3 + t[1] / 1e6);',
+        '  }',
+        '  return best;',
+        '}',
+        'process.stdout.write(JSON.stringify([',
+        '  record(drawtext, input.texts),',
+        '  record(drawPolylines, input.polylines),',
+        '  time(drawtext, input.texts),',
+        '  time(drawPolylines, input.polylines),',
+        ']));',
+    ], {
+        "texts": texts,
+        "font_data": font_data,
+        "polylines": polylines,
+    })
+
+
+def bench_text(args, baseline):
+    texts = synthetic_texts(args.modules)
+    font_parser = fontparser.FontParser()
+    def tessellate():
+        return TextTessellator(font_parser).tessellate_drawings(texts)
+
+    tessellated = tessellate()
+    unique = TextTessellator(font_parser).tessellate_drawings(
+            [dict(t) for t in texts[:args.modules]])
+    assert len(tessellated) == len(unique), "duplicate texts not dropped"
+    # Texts are checked one to one, without deduplication
+    tessellator = TextTessellator(font_parser)
+    polylines = [tessellator.tessellate(t) for t in texts]
+    font_data = dict((c, font_parser.parse_font_char(c))
+                     for c in set(''.join(t["text"] for t in texts))
+                     if c != '\n')
+    node_result = node_text_segments(texts, font_data, polylines)
+    if node_result is None:
+        print("text: node not found, render.js output not checked")
+    else:
+        drawtext_segments, polyline_segments, drawtext_ms, polylines_ms = \
+            node_result
+        for t, expected, actual in zip(texts, drawtext_segments,
+                                       polyline_segments):
+            assert len(expected) == len(actual), \
+                "segment count differs for %r" % t["text"]
+            for e, a in zip(expected, actual):
+                assert max(abs(i - j) for i, j in zip(e, a)) < 1e-3, \
+                    "tessellated text %r differs from drawtext()" % t["text"]
+        report('text', drawtext_ms / 1e3, polylines_ms / 1e3)
+    texts_json = json.dumps({"drawings": texts, "font_data": font_data})
+    polylines_json = json.dumps({"drawings": tessellated})
+    packed_json = json.dumps(
+            compact.CompactEncoder(packed=True).encode_drawings(tessellated))
+    print("text tessellation %.1f ms, %d of %d texts emitted, "
+          "json %d kb with font data, %d kb tessellated, %d kb packed" % (
+              best_time(tessellate, args.repeat) * 1e3, len(tessellated),
+              len(texts), len(texts_json) // 1024,
+              len(polylines_json) // 1024, len(packed_json) // 1024))
+
+
+def bench_units(args, baseline):
+    values = [m.GetValue() for m in synthetic_modules(args.modules)]
+    values += ['0R05', '3.3mOhm', '1,000', '2.2 uF', u'4.7μF', '10meg']
+    assert baseline_component_values(baseline, values) == \
+        cold_component_values(units, values), \
+        "componentValues output differs from baseline"
+    report('units',
+           best_time(lambda: baseline_component_values(baseline, values),
+                     args.repeat),
+           best_time(lambda: cold_component_values(units, values),
+                     args.repeat))
+
+
+class HandlerProfile:
+    """Counts calls and cumulative time of wrapped parser handlers."""
+
+    def __init__(self):
+        self.stats = {}
+
+    def wrap(self, name, func):
+        stats = self.stats.setdefault(name, [0, 0.0])
+
+        def wrapper(*args):
+            start = timeit.default_timer()
+            try:
+                return func(*args)
+            finally:
+                stats[0] += 1
+                stats[1] += timeit.default_timer() - start
+
+        return wrapper
+
+    def report(self):
+        print("%-28s %10s %12s %10s" % ('handler', 'calls', 'total ms',
+                                         'us/call'))
+        rows = sorted(self.stats.items(), key=lambda r: -r[1][1])
+        for name, (calls, total) in rows:
+            if calls:
+                print("%-28s %10d %12.1f %10.2f" % (
+                    name, calls, total * 1e3, total * 1e6 / calls))
+
+
+def profile_handlers(pcb):
+    """Runs geometry parsing of the board with every handler profiled."""
+    profile = HandlerProfile()
+    patched = []
+
+    def patch(owner, key, name):
+        if isinstance(owner, dict):
+            original = owner[key]
+            owner[key] = profile.wrap(name, original)
+            patched.append(lambda: owner.__setitem__(key, original))
+        else:
+            original = getattr(owner, key)
+            setattr(owner, key, profile.wrap(name, original))
+            patched.append(lambda: setattr(owner, key, original))
+
+    for class_name in list(ibom.DRAWING_PARSERS):
+        patch(ibom.DRAWING_PARSERS, class_name, 'class ' + class_name)
+    for shape, parser in list(ibom.DRAW_SEGMENT_PARSERS.items()):
+        patch(ibom.DRAW_SEGMENT_PARSERS, shape, 'shape ' + parser.__name__)
+    for func in ['extract_module', 'extract_pad', 'extract_poly_set',
+                 'DrawingIndex', 'parse_edges', 'parse_drawings_on_layers',
+                 'parse_modules']:
+        patch(ibom, func, func)
+    try:
+        drawing_index = ibom.DrawingIndex(pcb)
+        ibom.parse_edges(drawing_index)
+        ibom.parse_drawings_on_layers(drawing_index, pcbnew.F_SilkS,
+                                      pcbnew.B_SilkS)
+        ibom.parse_drawings_on_layers(drawing_index, pcbnew.F_Fab,
+                                      pcbnew.B_Fab)
+        ibom.parse_modules(list(pcb.GetModules()), 0, drawing_index)
+    finally:
+        for restore in reversed(patched):
+            restore()
+    return profile
+
+
+def bench_profile(args, baseline):
+    if not args.board:
+        print("profile: skipped, needs --board")
+        return
+    profile_handlers(pcbnew.LoadBoard(os.path.abspath(args.board))).report()
+
+
+def cold_parse_font(fontparser_module, strings):
+    parser = fontparser_module.FontParser()
+    for s in strings:
+        parser.parse_font_for_string(s)
+    return json.dumps(parser.get_parsed_font())
+
+
+def warm_parse_font(strings):
+    parser = fontparser.FontParser()
+    for s in strings:
+        parser.parse_font_for_string(s)
+    return ''.join(template.iterencode(parser.get_encoded_font()))
+
+
+def import_time(statement, repeat):
+    """Best wall time of running statement in a fresh interpreter."""
+    core_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'core')
+
+    def run():
+        subprocess.check_call([sys.executable, '-c', statement],
+                              cwd=core_dir)
+
+    return best_time(run, repeat)
+
+
+def bench_font(args, baseline):
+    strings = [m.GetReference() for m in synthetic_modules(args.modules)]
+    strings += [u'Hello, world! 0123456789 μΩ°±', 'abcdefghijklmnopqrstuvwxyz']
+    expected = cold_parse_font(baseline.fontparser, strings)
+    assert expected == cold_parse_font(fontparser, strings), \
+        "FontParser output differs from baseline"
+    assert json.loads(expected) == json.loads(warm_parse_font(strings)), \
+        "encoded font differs from baseline"
+    report('font',
+           best_time(lambda: cold_parse_font(baseline.fontparser, strings),
+                     args.repeat),
+           best_time(lambda: cold_parse_font(fontparser, strings),
+                     args.repeat))
+    report('font warm',
+           best_time(lambda: cold_parse_font(baseline.fontparser, strings),
+                     args.repeat),
+           best_time(lambda: warm_parse_font(strings), args.repeat))
+    empty = import_time('pass', args.repeat)
+    report('font load',
+           import_time('import newstroke_font', args.repeat) - empty,
+           import_time('import glyphfile; glyphfile.GlyphTable().load()',
+                       args.repeat) - empty)
+
+
+def write_synthetic_netlist(path, modules):
+    """Writes KiCad 5 style netlist for list of synthetic modules."""
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'(export (version D)\n'
+                u'  (design\n'
+                u'    (source "/tmp/synthetic.sch")\n'
+                u'    (date "2020-01-01 00:00:00")\n'
+                u'    (tool "Eeschema 5.1.5"))\n'
+                u'  (components\n')
+        for i, m in enumerate(modules):
+            f.write(u'    (comp (ref %s)\n'
+                    u'      (value %s)\n'
+                    u'      (footprint Lib:%s)\n'
+                    u'      (fields\n'
+                    u'        (field (name MPN) "MPN-%d")\n'
+                    u'        (field (name Manufacturer) Acme))\n'
+                    u'      (libsource (lib Device) (part %s) '
+                    u'(description "Synthetic part"))\n'
+                    u'      (sheetpath (names /) (tstamps /))\n'
+                    u'      (tstamp %08X))\n' % (
+                        m.GetReference(), m.GetValue(),
+                        m.GetFPID().GetLibItemName(), i % 97,
+                        m.GetReference()[0], i))
+        f.write(u'  )\n  (libparts\n')
+        for prefix, _, footprint in SYNTHETIC_PARTS:
+            f.write(u'    (libpart (lib Device) (part %s)\n'
+                    u'      (footprints (fp %s*))\n'
+                    u'      (pins (pin (num 1) (name ~) (type passive)) '
+                    u'(pin (num 2) (name ~) (type passive))))\n' % (
+                        prefix, footprint))
+        f.write(u'  )\n  (nets\n')
+        net_count = max(1, len(modules) // 2)
+        nodes = [[] for _ in range(net_count)]
+        for i, m in enumerate(modules):
+            for pin in (1, 2):
+                nodes[(i * 7 + pin * 13) % net_count].append(
+                        (m.GetReference(), pin))
+        for code, net_nodes in enumerate(nodes):
+            f.write(u'    (net (code %d) (name "Net-%d")\n' % (
+                code + 1, code + 1))
+            for ref, pin in net_nodes:
+                f.write(u'      (node (ref %s) (pin %d))\n' % (ref, pin))
+            f.write(u'    )\n')
+        f.write(u'  )\n)\n')
+
+
+def parse_netlist_file(sexpressions_module, path):
+    """Revisions before the tokenizer parse the whole file text."""
+    with io.open(path, 'r', encoding='utf-8') as f:
+        if hasattr(sexpressions_module, 'parse_tokens'):
+            return sexpressions_module.parse_tokens(
+                    sexpressions_module.iter_tokens(f))
+        return sexpressions_module.parse_sexpression(f.read())
+
+
+def bench_netlist(args, baseline):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'synthetic.net')
+        write_synthetic_netlist(path, synthetic_modules(args.modules))
+        print("netlist: %d components, %d bytes" % (
+            args.modules, os.path.getsize(path)))
+        assert parse_netlist_file(baseline.sexpressions, path) == \
+            parse_netlist_file(sexpressions, path), \
+            "parse_tokens output differs from baseline"
+        baseline_parser = baseline.netlistparser.NetlistParser
+        expected = baseline_parser(path).get_extra_field_data()
+        actual = NetlistParser(path).get_extra_field_data()
+        assert sorted(expected[0]) == sorted(actual[0]) and \
+            expected[1] == actual[1], \
+            "NetlistParser output differs from baseline"
+        report('sexpr',
+               best_time(lambda: parse_netlist_file(baseline.sexpressions,
+                                                    path),
+                         args.repeat),
+               best_time(lambda: parse_netlist_file(sexpressions, path),
+                         args.repeat))
+        report('netlist',
+               best_time(lambda: baseline_parser(path).get_extra_field_data(),
+                         args.repeat),
+               best_time(lambda: NetlistParser(path).get_extra_field_data(),
+                         args.repeat))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def write_synthetic_xml(path, modules):
+    """Writes KiCad 5 style xml netlist for list of synthetic modules."""
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(u'<?xml version="1.0" encoding="UTF-8"?>\n'
+                u'<export version="D">\n'
+                u'  <design>\n'
+                u'    <source>/tmp/synthetic.sch</source>\n'
+                u'    <tool>Eeschema 5.1.5</tool>\n'
+                u'  </design>\n'
+                u'  <components>\n')
+        for i, m in enumerate(modules):
+            f.write(u'    <comp ref="%s">\n'
+                    u'      <value>%s</value>\n'
+                    u'      <footprint>Lib:%s</footprint>\n'
+                    u'      <fields>\n'
+                    u'        <field name="MPN">MPN-%d</field>\n'
+                    u'        <field name="Manufacturer">Acme &amp; Co'
+                    u'</field>\n'
+                    u'      </fields>\n'
+                    u'      <libsource lib="Device" part="%s" '
+                    u'description="Synthetic part"/>\n'
+                    u'      <sheetpath names="/" tstamps="/"/>\n'
+                    u'      <tstamp>%08X</tstamp>\n'
+                    u'    </comp>\n' % (
+                        m.GetReference(), m.GetValue(),
+                        m.GetFPID().GetLibItemName(), i % 97,
+                        m.GetReference()[0], i))
+        f.write(u'  </components>\n  <nets>\n')
+        for i, m in enumerate(modules):
+            f.write(u'    <net code="%d" name="Net-%d">\n'
+                    u'      <node ref="%s" pin="1"/>\n'
+                    u'      <node ref="%s" pin="2"/>\n'
+                    u'    </net>\n' % (
+                        i + 1, i + 1, m.GetReference(), m.GetReference()))
+        f.write(u'  </nets>\n</export>\n')
+
+
+def peak_memory(func):
+    """Peak python heap allocation in bytes while running func."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_xml(args, baseline):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'synthetic.xml')
+        write_synthetic_xml(path, synthetic_modules(args.modules))
+        print("xml: %d components, %d bytes" % (
+            args.modules, os.path.getsize(path)))
+        baseline_parser = baseline.xmlparser.XmlParser
+        expected = baseline_parser(path).get_extra_field_data()
+        actual = XmlParser(path).get_extra_field_data()
+        assert sorted(expected[0]) == sorted(actual[0]) and \
+            list(expected[1].items()) == list(actual[1].items()), \
+            "XmlParser output differs from baseline"
+        report('xml',
+               best_time(lambda: baseline_parser(path).get_extra_field_data(),
+                         args.repeat),
+               best_time(lambda: XmlParser(path).get_extra_field_data(),
+                         args.repeat))
+        if tracemalloc is None:
+            print("xml memory: skipped, needs tracemalloc")
+            return
+        baseline_peak = peak_memory(
+                lambda: baseline_parser(path).get_extra_field_data())
+        optimized_peak = peak_memory(
+                lambda: XmlParser(path).get_extra_field_data())
+        print("xml memory baseline %8.1f MB  optimized %8.1f MB  "
+              "reduction %.2fx" % (baseline_peak / 1e6, optimized_peak / 1e6,
+                                   float(baseline_peak) / optimized_peak))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+BENCHMARKS = {
+    'bbox': bench_bbox,
+    'bom': bench_bom,
+    'filter': bench_filter,
+    'font': bench_font,
+    'netlist': bench_netlist,
+    'profile': bench_profile,
+    'sort': bench_sort,
+    'text': bench_text,
+    'units': bench_units,
+    'xml': bench_xml,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='InteractiveHtmlBom micro benchmarks.',
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*',
+                        help='Benchmarks to run, all if omitted. '
+                             'One of: ' + ', '.join(sorted(BENCHMARKS)))
+    parser.add_argument('--modules', type=int, default=6000,
+                        help='Number of synthetic modules.')
+    parser.add_argument('--board',
+                        help='KiCad pcb file for benchmarks that need '
+                             'a real board.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of timed runs, best one is reported.')
+    parser.add_argument('--baseline', default=BASELINE_REVISION,
+                        help='Git revision of the plugin that outputs and '
+                             'times are compared against.')
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('Unknown benchmark %s' % name)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        try:
+            baseline = load_baseline(args.baseline, tmp_dir)
+        except (OSError, subprocess.CalledProcessError) as e:
+            parser.error('Can not export baseline revision %s, it needs git '
+                         'and a clone that has the revision: %s' % (
+                             args.baseline, e))
+        ibom.is_cli = True
+        baseline.ibom.is_cli = True
+        for name in args.benchmarks or sorted(BENCHMARKS):
+            BENCHMARKS[name](args, baseline)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
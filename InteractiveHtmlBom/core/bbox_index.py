@@ -0,0 +1,126 @@
+"""
+Uniform grid index over module bounding boxes for click hit testing.
+
+One grid is built per layer and embedded in pcbdata as:
+
+    "bbox_index": {
+        "F": {"x": minx, "y": miny, "cw": cell width, "ch": cell height,
+              "nx": columns, "ny": rows,
+              "offsets": [..], "items": [..]},
+        "B": {..}
+    }
+
+Module indexes in cell (ix, iy) are items[offsets[k]:offsets[k + 1]] where
+k = iy * nx + ix, in increasing order. render.js:bboxQuery() only checks
+modules listed in the cell under the pointer, its result is the same as a
+scan over all modules.
+"""
+
+import math
+
+# Average number of modules per cell the grid is sized for
+MODULES_PER_CELL = 2
+# Upper bound of columns and rows
+MAX_GRID_SIZE = 512
+# Bboxes are padded by this much when assigned to cells so that rounding
+# of coordinates in compact pcbdata formats can not move a box edge into
+# a cell it is not listed in.
+CELL_MARGIN = 1e-3
+
+
+def cell_range(lo, hi, origin, cell_size, count):
+    first = int(math.floor((lo - CELL_MARGIN - origin) / cell_size))
+    last = int(math.floor((hi + CELL_MARGIN - origin) / cell_size))
+    return max(first, 0), min(last, count - 1)
+
+
+def build_grid(bboxes):
+    # type: (list) -> dict
+    """
+    :param bboxes: list of (module index, (x, y, w, h)) tuples
+    :return: grid dict, None if bboxes is empty
+    """
+    if not bboxes:
+        return None
+    minx = min(b[0] for _, b in bboxes)
+    miny = min(b[1] for _, b in bboxes)
+    width = max(max(b[0] + b[2] for _, b in bboxes) - minx, 1e-3)
+    height = max(max(b[1] + b[3] for _, b in bboxes) - miny, 1e-3)
+    cell = math.sqrt(width * height * MODULES_PER_CELL / len(bboxes))
+    nx = max(1, min(MAX_GRID_SIZE, int(math.ceil(width / cell))))
+    ny = max(1, min(MAX_GRID_SIZE, int(math.ceil(height / cell))))
+    cw = width / nx
+    ch = height / ny
+    cells = [[] for _ in range(nx * ny)]
+    for i, (x, y, w, h) in bboxes:
+        x0, x1 = cell_range(x, x + w, minx, cw, nx)
+        y0, y1 = cell_range(y, y + h, miny, ch, ny)
+        for iy in range(y0, y1 + 1):
+            row = iy * nx
+            for ix in range(x0, x1 + 1):
+                cells[row + ix].append(i)
+    offsets = [0]
+    items = []
+    for c in cells:
+        items.extend(c)
+        offsets.append(len(items))
+    return {
+        "x": minx,
+        "y": miny,
+        "cw": cw,
+        "ch": ch,
+        "nx": nx,
+        "ny": ny,
+        "offsets": offsets,
+        "items": items,
+    }
+
+
+def build_bbox_index(modules):
+    # type: (list) -> dict
+    """
+    :param modules: pcbdata modules list
+    :return: dict of layer to grid, layers without modules are omitted
+    """
+    bboxes = {"F": [], "B": []}
+    for i, m in enumerate(modules):
+        if m["layer"] in bboxes:
+            pos = m["bbox"]["pos"]
+            size = m["bbox"]["size"]
+            bboxes[m["layer"]].append(
+                    (i, (pos[0], pos[1], size[0], size[1])))
+    result = {}
+    for layer, layer_bboxes in bboxes.items():
+        grid = build_grid(layer_bboxes)
+        if grid is not None:
+            result[layer] = grid
+    return result
+
+
+def bbox_contains(b, x, y):
+    return (b["pos"][0] <= x <= b["pos"][0] + b["size"][0] and
+            b["pos"][1] <= y <= b["pos"][1] + b["size"][1])
+
+
+def query(bbox_index, modules, layer, x, y):
+    # type: (dict, list, str, float, float) -> list
+    """Same as render.js:bboxQuery(), used to verify the index."""
+    grid = bbox_index.get(layer)
+    if grid is None:
+        return []
+    # Points outside of the grid are clamped to the border cells, bboxes
+    # touching the grid border are listed there.
+    ix = int(math.floor((x - grid["x"]) / grid["cw"]))
+    iy = int(math.floor((y - grid["y"]) / grid["ch"]))
+    ix = min(max(ix, 0), grid["nx"] - 1)
+    iy = min(max(iy, 0), grid["ny"] - 1)
+    k = iy * grid["nx"] + ix
+    candidates = grid["items"][grid["offsets"][k]:grid["offsets"][k + 1]]
+    return [i for i in candidates if bbox_contains(modules[i]["bbox"], x, y)]
+
+
+def scan(modules, layer, x, y):
+    # type: (list, str, float, float) -> list
+    """Same as render.js:bboxScan(), linear scan over all modules."""
+    return [i for i, m in enumerate(modules)
+            if m["layer"] == layer and bbox_contains(m["bbox"], x, y)]
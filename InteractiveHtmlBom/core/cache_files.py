@@ -0,0 +1,29 @@
+"""
+File helpers shared by the persistent module and schematic data caches.
+"""
+
+import os
+import sys
+
+
+def user_cache_dir():
+    # type: () -> str
+    """:return: per-user cache directory of the plugin"""
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform.startswith('darwin'):
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = (os.environ.get('XDG_CACHE_HOME') or
+                os.path.expanduser('~/.cache'))
+    return os.path.join(base, 'InteractiveHtmlBom')
+
+
+def replace_file(src, dst):
+    """Renames src to dst overwriting it, python 2 has no os.replace()."""
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+        return
+    if sys.platform.startswith('win') and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
@@ -0,0 +1,248 @@
+"""
+Compact columnar encoding of pcbdata.
+
+Geometry is quantized to integers, drawings and modules are stored as
+columns of numbers and identical pad geometries are stored once in a per
+board dictionary. Columns can additionally be delta encoded and packed into
+base64 strings of zigzag varints. render.js:decodePcbdata() restores the
+regular pcbdata structure when the page loads.
+
+Sections that are used before the page loads (metadata, bom, font data,
+edges bbox) are kept as is. Module bbox index columns are packed too.
+"""
+
+import base64
+
+FORMAT_VERSION = 3
+# Coordinates are stored in units of 1 / COORD_SCALE mm
+COORD_SCALE = 10000
+# Tessellated text points are stored in units of 1 / POLYLINE_SCALE mm,
+# same precision as text_geometry.PRECISION
+POLYLINE_SCALE = 1000
+# Angles are stored in units of 1 / ANGLE_SCALE degrees
+ANGLE_SCALE = 10
+LAYER_CODES = {"F": 1, "B": 2}
+# Drawing type letters of the order string that keeps drawing sequence,
+# anything else is stored as is with texts
+DRAWING_CODES = {"segment": "s", "arc": "a", "circle": "c", "polygon": "p",
+                 "polylines": "l"}
+TEXT_CODE = "t"
+
+
+def quantize(value, scale=COORD_SCALE):
+    return int(round(value * scale))
+
+
+def quantize_point(point):
+    return [quantize(point[0]), quantize(point[1])]
+
+
+def quantize_polygons(polygons):
+    result = []
+    for polygon in polygons:
+        flat = []
+        for point in polygon:
+            flat.extend(quantize_point(point))
+        result.append(flat)
+    return result
+
+
+def pack_column(values):
+    """Delta + zigzag + varint encodes list of ints into base64 string."""
+    data = bytearray()
+    last = 0
+    for v in values:
+        delta = v - last
+        last = v
+        zigzag = delta * 2 if delta >= 0 else -delta * 2 - 1
+        while zigzag >= 0x80:
+            data.append((zigzag & 0x7f) | 0x80)
+            zigzag >>= 7
+        data.append(zigzag)
+    return base64.b64encode(bytes(data)).decode('ascii')
+
+
+class CompactEncoder:
+    """Encodes pcbdata dict produced by ibom.main into compact format."""
+
+    def __init__(self, packed=False):
+        self.packed = packed
+        self.pad_shapes = []
+        self.pad_shape_index = {}
+
+    def column(self, values):
+        if self.packed:
+            return pack_column(values)
+        return values
+
+    def columns(self, table):
+        return dict((k, self.column(v)) for k, v in table.items())
+
+    def encode_drawings(self, drawings):
+        segments = {"x1": [], "y1": [], "x2": [], "y2": [], "w": []}
+        arcs = {"x": [], "y": [], "r": [], "a1": [], "a2": [], "w": []}
+        circles = {"x": [], "y": [], "r": [], "w": []}
+        polygons = []
+        polylines = {"w": [], "lines": [], "points": [], "x": [], "y": []}
+        texts = []
+        # Columns are grouped by type, order restores the z-order
+        order = []
+        for d in drawings:
+            shape = d.get("type")
+            order.append(DRAWING_CODES.get(shape, TEXT_CODE))
+            if shape == "segment":
+                segments["x1"].append(quantize(d["start"][0]))
+                segments["y1"].append(quantize(d["start"][1]))
+                segments["x2"].append(quantize(d["end"][0]))
+                segments["y2"].append(quantize(d["end"][1]))
+                segments["w"].append(quantize(d["width"]))
+            elif shape == "arc":
+                arcs["x"].append(quantize(d["start"][0]))
+                arcs["y"].append(quantize(d["start"][1]))
+                arcs["r"].append(quantize(d["radius"]))
+                arcs["a1"].append(quantize(d["startangle"], ANGLE_SCALE))
+                arcs["a2"].append(quantize(d["endangle"], ANGLE_SCALE))
+                arcs["w"].append(quantize(d["width"]))
+            elif shape == "circle":
+                circles["x"].append(quantize(d["start"][0]))
+                circles["y"].append(quantize(d["start"][1]))
+                circles["r"].append(quantize(d["radius"]))
+                circles["w"].append(quantize(d["width"]))
+            elif shape == "polygon":
+                polygons.append({
+                    "pos": quantize_point(d["pos"]),
+                    "angle": d["angle"],
+                    "polygons": quantize_polygons(d["polygons"]),
+                })
+            elif shape == "polylines":
+                polylines["w"].append(quantize(d["thickness"]))
+                polylines["lines"].append(len(d["lines"]))
+                for line in d["lines"]:
+                    polylines["points"].append(len(line) // 2)
+                    polylines["x"].extend(
+                            quantize(v, POLYLINE_SCALE) for v in line[0::2])
+                    polylines["y"].extend(
+                            quantize(v, POLYLINE_SCALE) for v in line[1::2])
+            else:
+                texts.append(d)
+        result = {}
+        if segments["w"]:
+            result["segments"] = self.columns(segments)
+        if arcs["w"]:
+            result["arcs"] = self.columns(arcs)
+        if circles["w"]:
+            result["circles"] = self.columns(circles)
+        if polygons:
+            result["polygons"] = polygons
+        if polylines["w"]:
+            result["polylines"] = self.columns(polylines)
+        if texts:
+            result["texts"] = texts
+        if order:
+            result["order"] = "".join(order)
+        return result
+
+    def pad_shape(self, pad):
+        """Returns index of pad geometry in pad shape dictionary."""
+        shape = {
+            "shape": pad["shape"],
+            "type": pad["type"],
+            "size": quantize_point(pad["size"]),
+        }
+        if "radius" in pad:
+            shape["radius"] = quantize(pad["radius"])
+        if "polygons" in pad:
+            shape["polygons"] = quantize_polygons(pad["polygons"])
+        if "drillshape" in pad:
+            shape["drillshape"] = pad["drillshape"]
+            shape["drillsize"] = quantize_point(pad["drillsize"])
+        if "offset" in pad:
+            shape["offset"] = quantize_point(pad["offset"])
+        key = repr(sorted(shape.items()))
+        if key not in self.pad_shape_index:
+            self.pad_shape_index[key] = len(self.pad_shapes)
+            self.pad_shapes.append(shape)
+        return self.pad_shape_index[key]
+
+    def encode_modules(self, modules):
+        table = {
+            "cx": [], "cy": [], "bx": [], "by": [], "bw": [], "bh": [],
+            "padcount": [],
+            "px": [], "py": [], "pangle": [], "pshape": [], "players": [],
+        }
+        refs = []
+        layers = []
+        pin1 = []
+        drawings = {}
+        pad_index = 0
+        for i, m in enumerate(modules):
+            refs.append(m["ref"])
+            layers.append(m["layer"] or "-")
+            table["cx"].append(quantize(m["center"][0]))
+            table["cy"].append(quantize(m["center"][1]))
+            table["bx"].append(quantize(m["bbox"]["pos"][0]))
+            table["by"].append(quantize(m["bbox"]["pos"][1]))
+            table["bw"].append(quantize(m["bbox"]["size"][0]))
+            table["bh"].append(quantize(m["bbox"]["size"][1]))
+            table["padcount"].append(len(m["pads"]))
+            for pad in m["pads"]:
+                table["px"].append(quantize(pad["pos"][0]))
+                table["py"].append(quantize(pad["pos"][1]))
+                table["pangle"].append(quantize(pad["angle"], ANGLE_SCALE))
+                table["pshape"].append(self.pad_shape(pad))
+                table["players"].append(
+                        sum(LAYER_CODES[l] for l in pad["layers"]))
+                if pad.get("pin1"):
+                    pin1.append(pad_index)
+                pad_index += 1
+            if m["drawings"]:
+                drawings[str(i)] = dict(
+                        (layer, self.encode_drawings(
+                                [d["drawing"] for d in m["drawings"]
+                                 if d["layer"] == layer]))
+                        for layer in LAYER_CODES)
+        table["pin1"] = pin1
+        return {
+            "columns": self.columns(table),
+            "ref": refs,
+            "layer": "".join(layers),
+            "drawings": drawings,
+        }
+
+    def encode_grid(self, grid):
+        result = dict(grid)
+        result["offsets"] = self.column(grid["offsets"])
+        result["items"] = self.column(grid["items"])
+        return result
+
+    def encode(self, pcbdata):
+        result = dict(pcbdata)
+        result["edges"] = self.encode_drawings(pcbdata["edges"])
+        for layer_group in ["silkscreen", "fabrication"]:
+            result[layer_group] = dict(
+                    (layer, self.encode_drawings(drawings))
+                    for layer, drawings in pcbdata[layer_group].items())
+        result["modules"] = self.encode_modules(pcbdata["modules"])
+        if "bbox_index" in pcbdata:
+            result["bbox_index"] = dict(
+                    (layer, self.encode_grid(grid))
+                    for layer, grid in pcbdata["bbox_index"].items())
+        result["compact"] = {
+            "version": FORMAT_VERSION,
+            "packed": self.packed,
+            "coord_scale": COORD_SCALE,
+            "polyline_scale": POLYLINE_SCALE,
+            "angle_scale": ANGLE_SCALE,
+            "pad_shapes": self.pad_shapes,
+        }
+        return result
+
+
+def encode_pcbdata(pcbdata, packed=False):
+    # type: (dict, bool) -> dict
+    """
+    :param pcbdata: pcbdata dict in regular format
+    :param packed: delta encode and base64 pack numeric columns
+    :return: pcbdata dict in compact format
+    """
+    return CompactEncoder(packed).encode(pcbdata)
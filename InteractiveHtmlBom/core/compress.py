@@ -0,0 +1,28 @@
+"""
+Compression of data embedded in generated html.
+
+Data is compressed with raw deflate and embedded as base64 string,
+util.js:decompressString() decodes it in the browser.
+"""
+
+import base64
+import zlib
+
+
+def deflate_base64(chunks):
+    # type: (iter) -> (str, int)
+    """
+    Compresses text given as iterable of string chunks.
+    :return: tuple of base64 encoded raw deflate stream and uncompressed
+        size in bytes.
+    """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = []
+    raw_size = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        raw_size += len(data)
+        compressed.append(compressor.compress(data))
+    compressed.append(compressor.flush())
+    blob = base64.b64encode(b''.join(compressed)).decode('ascii')
+    return blob, raw_size
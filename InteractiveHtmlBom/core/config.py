@@ -3,9 +3,13 @@
 import argparse
 import os
 
-from wx import FileConfig
-
-from .. import dialog
+try:
+    from wx import FileConfig
+    from .. import dialog
+except ImportError:
+    # Headless cli without wxPython, settings dialog is not available
+    from .fileconfig import FileConfig
+    dialog = None
 
 
 class Config:
@@ -19,10 +23,12 @@ class Config:
         'HS', 'CNN', 'J', 'P', 'NT', 'MH',
     ]
     default_checkboxes = ['Sourced', 'Placed']
+    pcbdata_format_choices = ['full', 'compact', 'packed']
+    compression_choices = ['none', 'pcbdata', 'all']
     html_config_fields = [
         'dark_mode', 'show_pads', 'show_fabrication', 'show_silkscreen',
         'highlight_pin1', 'redraw_on_drag', 'board_rotation', 'checkboxes',
-        'bom_view', 'layer_view', 'extra_fields'
+        'bom_view', 'layer_view', 'extra_fields', 'zoom_cache_budget'
     ]
 
     # Defaults
@@ -34,6 +40,8 @@ class Config:
     show_silkscreen = True
     highlight_pin1 = False
     redraw_on_drag = True
+    # Megapixels of cached layer bitmaps in the page, 0 disables the cache
+    zoom_cache_budget = 32
     board_rotation = 0
     checkboxes = ','.join(default_checkboxes)
     bom_view = bom_view_choices[1]
@@ -47,6 +55,12 @@ class Config:
     component_blacklist = []
     blacklist_virtual = True
     blacklist_empty_val = False
+    pcbdata_format = pcbdata_format_choices[0]
+    tessellate_text = False
+    compression = compression_choices[0]
+    parallel_threshold = 0
+    module_cache_size = 0  # 0 disables module cache
+    invalidate_module_cache = False  # Not saved
 
     # Extra fields section
     netlist_file = None
@@ -77,6 +91,8 @@ class Config:
                 'show_silkscreen', self.show_silkscreen)
         self.highlight_pin1 = f.ReadBool('highlight_pin1', self.highlight_pin1)
         self.redraw_on_drag = f.ReadBool('redraw_on_drag', self.redraw_on_drag)
+        self.zoom_cache_budget = f.ReadInt(
+                'zoom_cache_budget', self.zoom_cache_budget)
         self.board_rotation = f.ReadInt('board_rotation', self.board_rotation)
         self.checkboxes = f.Read('checkboxes', self.checkboxes)
         self.bom_view = f.Read('bom_view', self.bom_view)
@@ -96,6 +112,14 @@ class Config:
                 'blacklist_virtual', self.blacklist_virtual)
         self.blacklist_empty_val = f.ReadBool(
                 'blacklist_empty_val', self.blacklist_empty_val)
+        self.pcbdata_format = f.Read('pcbdata_format', self.pcbdata_format)
+        self.tessellate_text = f.ReadBool(
+                'tessellate_text', self.tessellate_text)
+        self.compression = f.Read('compression', self.compression)
+        self.parallel_threshold = f.ReadInt(
+                'parallel_threshold', self.parallel_threshold)
+        self.module_cache_size = f.ReadInt(
+                'module_cache_size', self.module_cache_size)
 
         f.SetPath('/extra_fields')
         self.extra_fields = self._split(f.Read(
@@ -121,6 +145,7 @@ class Config:
         f.WriteBool('show_silkscreen', self.show_silkscreen)
         f.WriteBool('highlight_pin1', self.highlight_pin1)
         f.WriteBool('redraw_on_drag', self.redraw_on_drag)
+        f.WriteInt('zoom_cache_budget', self.zoom_cache_budget)
         f.WriteInt('board_rotation', self.board_rotation)
         f.Write('checkboxes', self.checkboxes)
         f.Write('bom_view', self.bom_view)
@@ -140,6 +165,11 @@ class Config:
                 ','.join(self.component_blacklist))
         f.WriteBool('blacklist_virtual', self.blacklist_virtual)
         f.WriteBool('blacklist_empty_val', self.blacklist_empty_val)
+        f.Write('pcbdata_format', self.pcbdata_format)
+        f.WriteBool('tessellate_text', self.tessellate_text)
+        f.Write('compression', self.compression)
+        f.WriteInt('parallel_threshold', self.parallel_threshold)
+        f.WriteInt('module_cache_size', self.module_cache_size)
 
         f.SetPath('/extra_fields')
         f.Write('extra_fields', ','.join(self.extra_fields))
@@ -160,6 +190,7 @@ class Config:
         self.show_silkscreen = dlg.html.showSilkscreenCheckbox.IsChecked()
         self.highlight_pin1 = dlg.html.highlightPin1Checkbox.IsChecked()
         self.redraw_on_drag = dlg.html.continuousRedrawCheckbox.IsChecked()
+        self.zoom_cache_budget = dlg.html.zoomCacheBudgetSpin.Value
         self.board_rotation = dlg.html.boardRotationSlider.Value
         self.checkboxes = dlg.html.bomCheckboxesCtrl.Value
         self.bom_view = self.bom_view_choices[dlg.html.bomDefaultView.Selection]
@@ -176,6 +207,14 @@ class Config:
             dlg.general.blacklistVirtualCheckbox.IsChecked()
         self.blacklist_empty_val = \
             dlg.general.blacklistEmptyValCheckbox.IsChecked()
+        self.pcbdata_format = self.pcbdata_format_choices[
+            dlg.general.pcbdataFormatChoice.Selection]
+        self.compression = self.compression_choices[
+            dlg.general.compressionChoice.Selection]
+        self.tessellate_text = dlg.general.tessellateTextCheckbox.IsChecked()
+        self.module_cache_size = dlg.general.moduleCacheSizeSpin.Value
+        self.invalidate_module_cache = \
+            dlg.general.invalidateModuleCacheCheckbox.IsChecked()
 
         # Extra fields
         self.netlist_file = dlg.extra.netlistFilePicker.Path
@@ -200,6 +239,7 @@ class Config:
         dlg.html.showSilkscreenCheckbox.Value = self.show_silkscreen
         dlg.html.highlightPin1Checkbox.Value = self.highlight_pin1
         dlg.html.continuousRedrawCheckbox.value = self.redraw_on_drag
+        dlg.html.zoomCacheBudgetSpin.Value = self.zoom_cache_budget
         dlg.html.boardRotationSlider.Value = self.board_rotation
         dlg.html.bomCheckboxesCtrl.Value = self.checkboxes
         dlg.html.bomDefaultView.Selection = self.bom_view_choices.index(
@@ -220,6 +260,14 @@ class Config:
         dlg.general.blacklistBox.SetItems(self.component_blacklist)
         dlg.general.blacklistVirtualCheckbox.Value = self.blacklist_virtual
         dlg.general.blacklistEmptyValCheckbox.Value = self.blacklist_empty_val
+        dlg.general.pcbdataFormatChoice.Selection = \
+            self.pcbdata_format_choices.index(self.pcbdata_format)
+        dlg.general.compressionChoice.Selection = \
+            self.compression_choices.index(self.compression)
+        dlg.general.tessellateTextCheckbox.Value = self.tessellate_text
+        dlg.general.moduleCacheSizeSpin.Value = self.module_cache_size
+        dlg.general.invalidateModuleCacheCheckbox.Value = \
+            self.invalidate_module_cache
 
         # Extra fields
         dlg.extra.netlistFilePicker.SetInitialDirectory(
@@ -264,6 +312,13 @@ class Config:
         parser.add_argument('--no-redraw-on-drag',
                             help='Do not redraw pcb on drag by default.',
                             action='store_true')
+        parser.add_argument('--zoom-cache-budget', type=int,
+                            default=self.zoom_cache_budget,
+                            help='Megapixels of offscreen bitmaps the page '
+                                 'may use to cache static layers per zoom '
+                                 'level. Redraws on drag then only copy '
+                                 'the bitmaps. Lower it for devices with '
+                                 'little memory, 0 disables the cache.')
         parser.add_argument('--board-rotation', type=int,
                             default=self.board_rotation * 5,
                             help='Board rotation in degrees (-180 to 180). '
@@ -298,6 +353,43 @@ class Config:
                             help='Do not blacklist virtual components.')
         parser.add_argument('--blacklist-empty-val', action='store_true',
                             help='Blacklist components with empty value.')
+        parser.add_argument('--pcbdata-format', default=self.pcbdata_format,
+                            choices=self.pcbdata_format_choices,
+                            help='Format of embedded pcb data. "compact" '
+                                 'stores quantized columnar geometry, '
+                                 '"packed" additionally delta encodes and '
+                                 'base64 packs the columns.')
+        parser.add_argument('--tessellate-text', action='store_true',
+                            help='Convert texts to polylines when '
+                                 'generating the page instead of laying '
+                                 'out glyphs on every redraw. Faster '
+                                 'rendering of dense silkscreen for a '
+                                 'larger file: points are rounded to 1 um '
+                                 'but text data is still about 5 times '
+                                 'larger in full format. Use it with '
+                                 'packed pcb data format, which keeps it '
+                                 'close to the size of untessellated '
+                                 'text.')
+        parser.add_argument('--compression', default=self.compression,
+                            choices=self.compression_choices,
+                            help='Deflate compress embedded pcb data or pcb '
+                                 'data and scripts. Decompressed by the '
+                                 'browser when page loads.')
+        parser.add_argument('--parallel-threshold', type=int,
+                            default=self.parallel_threshold,
+                            help='Build module data in a process pool for '
+                                 'boards with at least this many modules. '
+                                 '0 disables the process pool.')
+        parser.add_argument('--module-cache-size', type=int,
+                            default=self.module_cache_size,
+                            help='Cache parsed modules of each pcb in the '
+                                 'user cache directory and keep at most '
+                                 'this many of them. Modules are looked up '
+                                 'by all of their pad and copper drawing '
+                                 'data. 0 disables the cache.')
+        parser.add_argument('--invalidate-module-cache', action='store_true',
+                            help='Discard module cache content before '
+                                 'generating bom.')
 
         # Extra fields section
         parser.add_argument('--netlist-file',
@@ -331,6 +423,7 @@ class Config:
         self.show_silkscreen = not args.hide_silkscreen
         self.highlight_pin1 = args.highlight_pin1
         self.redraw_on_drag = not args.no_redraw_on_drag
+        self.zoom_cache_budget = max(args.zoom_cache_budget, 0)
         self.board_rotation = math.fmod(args.board_rotation // 5, 37)
         self.checkboxes = args.checkboxes
         self.bom_view = args.bom_view
@@ -344,6 +437,12 @@ class Config:
         self.component_blacklist = self._split(args.blacklist)
         self.blacklist_virtual = not args.no_blacklist_virtual
         self.blacklist_empty_val = args.blacklist_empty_val
+        self.pcbdata_format = args.pcbdata_format
+        self.tessellate_text = args.tessellate_text
+        self.compression = args.compression
+        self.parallel_threshold = args.parallel_threshold
+        self.module_cache_size = args.module_cache_size
+        self.invalidate_module_cache = args.invalidate_module_cache
 
         # Extra
         self.netlist_file = args.netlist_file
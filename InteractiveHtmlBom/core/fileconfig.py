@@ -0,0 +1,116 @@
+"""
+Subset of wx.FileConfig used by Config, for running without wxPython.
+
+Reads and writes the same ini format as wxFileConfig so config.ini is
+shared between the plugin and headless cli.
+"""
+
+import io
+import os
+
+ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', '\\': '\\', '"': '"'}
+UNESCAPES = dict((v, '\\' + k) for k, v in ESCAPES.items())
+
+
+def unescape(value):
+    if len(value) > 1 and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+    result = []
+    i = 0
+    while i < len(value):
+        c = value[i]
+        if c == '\\' and i + 1 < len(value):
+            i += 1
+            c = ESCAPES.get(value[i], value[i])
+        result.append(c)
+        i += 1
+    return ''.join(result)
+
+
+def escape(value):
+    value = ''.join(UNESCAPES.get(c, c) for c in value)
+    if value != value.strip():
+        value = '"' + value + '"'
+    return value
+
+
+class FileConfig:
+    def __init__(self, localFilename):
+        self.file_name = localFilename
+        self.path = ''
+        # section name -> ordered list of [key, value]
+        self.sections = {'': []}
+        self.section_order = ['']
+        self.dirty = False
+        if os.path.isfile(localFilename):
+            self._load()
+
+    def _load(self):
+        section = self.sections['']
+        with io.open(self.file_name, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] in '#;':
+                    continue
+                if line[0] == '[' and line[-1] == ']':
+                    section = self._section(line[1:-1])
+                    continue
+                key, _, value = line.partition('=')
+                section.append([key.strip(), unescape(value.strip())])
+
+    def _section(self, name):
+        if name not in self.sections:
+            self.sections[name] = []
+            self.section_order.append(name)
+        return self.sections[name]
+
+    def SetPath(self, path):
+        self.path = path.strip('/')
+
+    def Read(self, key, default=''):
+        for k, v in self.sections.get(self.path, []):
+            if k == key:
+                return v
+        return default
+
+    def ReadBool(self, key, default=False):
+        value = self.Read(key, None)
+        if value is None:
+            return default
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+    def ReadInt(self, key, default=0):
+        try:
+            return int(self.Read(key, default))
+        except ValueError:
+            return default
+
+    def Write(self, key, value):
+        section = self._section(self.path)
+        self.dirty = True
+        for entry in section:
+            if entry[0] == key:
+                entry[1] = value
+                return True
+        section.append([key, value])
+        return True
+
+    def WriteBool(self, key, value):
+        return self.Write(key, '1' if value else '0')
+
+    def WriteInt(self, key, value):
+        return self.Write(key, str(value))
+
+    def Flush(self):
+        if not self.dirty:
+            return True
+        lines = []
+        for name in self.section_order:
+            entries = self.sections[name]
+            if name:
+                lines.append(u'[%s]' % name)
+            lines.extend(u'%s=%s' % (k, escape(v)) for k, v in entries)
+        with io.open(self.file_name, 'w', encoding='utf-8') as f:
+            f.write(u'\n'.join(lines) + u'\n')
+        self.dirty = False
+        return True
@@ -1,9 +1,17 @@
-from .newstroke_font import NEWSTROKE_FONT
+import json
+
+from .glyphfile import GlyphTable
+from .template import RawJson
 
 
 class FontParser:
     STROKE_FONT_SCALE = 1.0 / 21.0
     FONT_OFFSET = -10
+    # Glyph table is loaded when first glyph is parsed
+    glyph_table = GlyphTable()
+    # Json of parsed glyphs shared by all parser instances, filled when
+    # font data is encoded
+    glyph_json_cache = {}
 
     def __init__(self):
         self.parsed_font = {}
@@ -13,23 +21,24 @@ class FontParser:
         line = []
         glyph_x = 0
         index = ord(chr) - ord(' ')
-        if index >= len(NEWSTROKE_FONT):
+        if index >= len(self.glyph_table):
             index = ord('?') - ord(' ')
-        glyph_str = NEWSTROKE_FONT[index]
-        for i in range(0, len(glyph_str), 2):
-            coord = glyph_str[i:i + 2]
+        glyph = self.glyph_table[index]
+        r = ord('R')
+        for i in range(0, len(glyph), 2):
+            x, y = glyph[i], glyph[i + 1]
 
             # The first two values contain the width of the char
             if i < 2:
-                glyph_x = (ord(coord[0]) - ord('R')) * self.STROKE_FONT_SCALE
-                glyph_width = (ord(coord[1]) - ord(coord[0])) * self.STROKE_FONT_SCALE
-            elif coord[0] == ' ' and coord[1] == 'R':
+                glyph_x = (x - r) * self.STROKE_FONT_SCALE
+                glyph_width = (y - x) * self.STROKE_FONT_SCALE
+            elif x == ord(' ') and y == r:
                 lines.append(line)
                 line = []
             else:
                 line.append([
-                    (ord(coord[0]) - ord('R')) * self.STROKE_FONT_SCALE - glyph_x,
-                    (ord(coord[1]) - ord('R') + self.FONT_OFFSET) * self.STROKE_FONT_SCALE
+                    (x - r) * self.STROKE_FONT_SCALE - glyph_x,
+                    (y - r + self.FONT_OFFSET) * self.STROKE_FONT_SCALE
                 ])
 
         if len(line) > 0:
@@ -41,9 +50,23 @@ class FontParser:
         }
 
     def parse_font_for_string(self, s):
+        parsed_font = self.parsed_font
         for c in s:
-            if c not in self.parsed_font and ord(c) >= ord(' '):
-                self.parsed_font[c] = self.parse_font_char(c)
+            if c not in parsed_font and ord(c) >= 32:
+                parsed_font[c] = self.parse_font_char(c)
 
     def get_parsed_font(self):
         return self.parsed_font
+
+    def get_encoded_font(self):
+        """
+        :return: dict of char -> RawJson of parsed glyph for pcbdata,
+            template.iterencode splices the json into output as is. Json of
+            each glyph is encoded once per process.
+        """
+        encoded = {}
+        for c, glyph in self.parsed_font.items():
+            if c not in self.glyph_json_cache:
+                self.glyph_json_cache[c] = RawJson(json.dumps(glyph))
+            encoded[c] = self.glyph_json_cache[c]
+        return encoded
@@ -0,0 +1,95 @@
+"""
+Binary glyph table of the NEWSTROKE font.
+
+Importing newstroke_font.py means unmarshalling more than 11000 strings on
+every start. The same data is stored in newstroke_font.bin which is mapped
+in when the first glyph is needed:
+
+    magic (4 bytes) | version (uint32) | glyph count (uint32)
+    | glyph offsets (uint32 * (count + 1)) | glyph data
+
+All integers are little endian. Glyph data uses the original encoding of
+newstroke_font.py, one byte per coordinate.
+
+Rebuild the file after changing newstroke_font.py:
+    python glyphfile.py
+"""
+
+import mmap
+import os
+import struct
+
+GLYPH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          'newstroke_font.bin')
+MAGIC = b'IBGF'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+
+
+def build(glyphs, path=GLYPH_FILE):
+    # type: (list, str) -> None
+    """Writes list of glyph strings into binary glyph file."""
+    data = [bytearray(g.encode('ascii')) for g in glyphs]
+    offsets = [0]
+    for g in data:
+        offsets.append(offsets[-1] + len(g))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(data)))
+        f.write(struct.pack('<%dI' % len(offsets), *offsets))
+        for g in data:
+            f.write(g)
+
+
+class GlyphTable:
+    """Lazily loaded glyph table, glyphs are returned as bytearrays."""
+
+    def __init__(self, path=GLYPH_FILE):
+        self.path = path
+        self.data = None
+        self.offsets = None
+        self.base = 0
+
+    def load(self):
+        if self.data is not None:
+            return
+        if os.path.isfile(self.path):
+            with open(self.path, 'rb') as f:
+                try:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, EnvironmentError):
+                    data = f.read()
+            magic, version, count = HEADER.unpack_from(data, 0)
+            if magic == MAGIC and version == VERSION:
+                self.offsets = struct.unpack_from(
+                        '<%dI' % (count + 1), data, HEADER.size)
+                self.base = HEADER.size + 4 * (count + 1)
+                self.data = data
+                return
+        # Glyph file is missing or outdated, fall back to slow import
+        from .newstroke_font import NEWSTROKE_FONT
+        self.offsets = None
+        self.data = [bytearray(g.encode('ascii')) for g in NEWSTROKE_FONT]
+
+    def __len__(self):
+        self.load()
+        if self.offsets is None:
+            return len(self.data)
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        self.load()
+        if self.offsets is None:
+            return self.data[index]
+        start = self.base + self.offsets[index]
+        end = self.base + self.offsets[index + 1]
+        return bytearray(self.data[start:end])
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from newstroke_font import NEWSTROKE_FONT
+
+    build(NEWSTROKE_FONT)
+    print("Wrote %d glyphs to %s" % (len(NEWSTROKE_FONT), GLYPH_FILE))
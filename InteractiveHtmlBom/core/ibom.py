@@ -1,19 +1,42 @@
 from __future__ import absolute_import
 
 import io
-import json
+import itertools
 import logging
+import multiprocessing
 import os
 import re
 import sys
+import time
 from datetime import datetime
 
 import pcbnew
-import wx
 
+try:
+    import wx
+except ImportError:
+    # Headless cli, messages only go to the log
+    wx = None
+
+from . import compact
+from . import compress
+from . import template
 from . import units
+from .bbox_index import build_bbox_index
 from .config import Config
 from .fontparser import FontParser
+from .module_cache import ModuleCache, cache_file_path, make_key
+from .module_data import RawModule, RawPad
+from .module_data import build_modules, build_pad
+from .module_data import normalize, normalize_polygons
+from .text_geometry import TextTessellator
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError:
+    # python 2 without futures backport
+    ProcessPoolExecutor = None
 
 
 def setup_logger():
@@ -52,86 +75,115 @@ def logwarn(msg):
         wx.LogWarning(msg)
 
 
-def skip_component(m, config, extra_data, filter_layer):
-    # type: (pcbnew.MODULE, Config, dict, int) -> bool
-    # filter part by layer
-    if filter_layer is not None and filter_layer != m.GetLayer():
-        return True
-
-    # skip blacklisted components
-    ref = m.GetReference()
-    ref_prefix = re.findall('^[A-Z]*', ref)[0]
-    if ref in config.component_blacklist:
-        return True
-    if ref_prefix + '*' in config.component_blacklist:
-        return True
+REF_PREFIX_RE = re.compile('^[A-Z]*')
 
-    val = m.GetValue()
-    if config.blacklist_empty_val and val in ['', '~']:
-        return True
 
-    # skip components with dnp field not empty
-    if config.dnp_field and ref in extra_data \
-            and config.dnp_field in extra_data[ref] \
-            and extra_data[ref][config.dnp_field]:
-        return True
+class ComponentFilter:
+    """
+    Config blacklists and schematic variant/DNP settings compiled into a
+    single predicate. Verdicts that only depend on the reference are
+    computed up front from extra_data.
+    """
 
-    # skip components with wrong variant field
-    if config.board_variant_field and config.board_variant_whitelist:
-        if ref in extra_data:
-            ref_variant = extra_data[ref].get(config.board_variant_field, '')
-            if ref_variant not in config.board_variant_whitelist:
-                return True
+    def __init__(self, config, extra_data):
+        # type: (Config, dict) -> None
+        """
+        :param config: Config object
+        :param extra_data: Extra fields data, None if there is no
+            schematic data
+        """
+        blacklist = config.component_blacklist
+        self.blacklisted_refs = set(blacklist)
+        self.blacklisted_prefixes = set(
+                b[:-1] for b in blacklist if b.endswith('*'))
+        self.blacklisted_values = \
+            {'', '~'} if config.blacklist_empty_val else set()
+        self.skipped_refs = set(
+                ref for ref, fields in (extra_data or {}).items()
+                if self.skip_fields(fields, config))
+
+    @staticmethod
+    def skip_fields(fields, config):
+        # type: (dict, Config) -> bool
+        # skip components with dnp field not empty
+        if config.dnp_field and fields.get(config.dnp_field):
+            return True
+        if not config.board_variant_field:
+            return False
+        # skip components with wrong variant field
+        ref_variant = fields.get(config.board_variant_field, '')
+        if config.board_variant_whitelist and \
+                ref_variant not in config.board_variant_whitelist:
+            return True
+        if config.board_variant_blacklist and ref_variant and \
+                ref_variant in config.board_variant_blacklist:
+            return True
+        return False
+
+    def __call__(self, m):
+        # type: (pcbnew.MODULE) -> bool
+        """:return: True if module should not be in the bom"""
+        ref = m.GetReference()
+        if ref in self.skipped_refs or ref in self.blacklisted_refs:
+            return True
+        if self.blacklisted_prefixes and \
+                REF_PREFIX_RE.match(ref).group() in self.blacklisted_prefixes:
+            return True
+        return m.GetValue() in self.blacklisted_values
 
-    if config.board_variant_field and config.board_variant_blacklist:
-        if ref in extra_data:
-            ref_variant = extra_data[ref].get(config.board_variant_field, '')
-            if ref_variant and ref_variant in config.board_variant_blacklist:
-                return True
 
-    return False
+LAYER_KEYS = {
+    pcbnew.F_Cu: "F",
+    pcbnew.B_Cu: "B",
+}
 
 
 def generate_bom(pcb_modules, config, extra_data, filter_layer=None):
     # type: (list, Config, dict, int) -> list
     """
-    Generate BOM from pcb layout.
+    Generate single BOM table from pcb layout.
+    Use group_bom() when more than one table is needed.
     :param pcb_modules: list of modules on the pcb
     :param config: Config object
     :param extra_data: Extra fields data
     :param filter_layer: include only parts for given layer
     :return: BOM table (qty, value, footprint, refs)
     """
+    tables = group_bom(pcb_modules, config, extra_data)
+    if filter_layer is None:
+        return tables["both"]
+    return tables.get(LAYER_KEYS.get(filter_layer), [])
 
-    def convert(text):
-        return int(text) if text.isdigit() else text.lower()
-
-    def alphanum_key(key):
-        return [convert(c)
-                for c in re.split('([0-9]+)', key)]
-
-    def natural_sort(l):
-        """
-        Natural sort for strings containing numbers
-        """
-
-        return sorted(l, key=lambda r: (alphanum_key(r[0]), r[1]))
 
+def group_bom(pcb_modules, config, extra_data):
+    # type: (list, Config, dict) -> dict
+    """
+    Generate all BOM tables from pcb layout in a single pass over modules.
+    :param pcb_modules: list of modules on the pcb
+    :param config: Config object
+    :param extra_data: Extra fields data
+    :return: dict with "both", "F" and "B" BOM tables
+        (qty, value, footprint, refs)
+    """
     attr_dict = {0: 'Normal',
                  1: 'Normal+Insert',
                  2: 'Virtual'
                  }
 
-    # build grouped part list
+    # build grouped part lists, module is visited once and lands in the
+    # "both" groups and in the groups of its own layer
     warning_shown = False
-    part_groups = {}
+    part_groups = {"both": {}, "F": {}, "B": {}}
+    values = [m.GetValue() for m in pcb_modules]
+    norm_values = units.componentValues(values)
+    skip_component = ComponentFilter(config, extra_data)
     for i, m in enumerate(pcb_modules):
-        if skip_component(m, config, extra_data, filter_layer):
+        if skip_component(m):
             continue
 
         # group part refs by value and footprint
-        value = m.GetValue()
-        norm_value = units.componentValue(value)
+        value = values[i]
+        norm_value = norm_values[i]
         try:
             footprint = str(m.GetFPID().GetFootprintName())
         except:
@@ -155,122 +207,214 @@ def generate_bom(pcb_modules, config, extra_data, filter_layer=None):
             else:
                 # Some components are on pcb but not in schematic data.
                 # Show a warning about possibly outdated netlist/xml file.
-                # Doing it only once when generating full bom is enough.
-                if filter_layer is None:
-                    logwarn(
-                            'Component %s is missing from schematic data.' % ref)
-                    warning_shown = True
+                logwarn(
+                        'Component %s is missing from schematic data.' % ref)
+                warning_shown = True
                 extras = [''] * len(config.extra_fields)
 
         group_key = (norm_value, tuple(extras), footprint, attr)
-        valrefs = part_groups.setdefault(group_key, [value, []])
+        valrefs = part_groups["both"].setdefault(group_key, [value, []])
         valrefs[1].append((ref, i))
+        layer_key = LAYER_KEYS.get(m.GetLayer())
+        if layer_key is not None:
+            valrefs = part_groups[layer_key].setdefault(
+                    group_key, [value, []])
+            valrefs[1].append((ref, i))
 
     if warning_shown:
         logwarn('Netlist/xml file is likely out of date.')
-    # build bom table, sort refs
-    bom_table = []
-    for (norm_value, extras, footprint, attr), valrefs in part_groups.items():
-        bom_row = (
-            len(valrefs[1]), valrefs[0], footprint,
-            natural_sort(valrefs[1]), extras)
-        bom_table.append(bom_row)
+
+    return sort_bom_tables(part_groups, config)
+
+
+class RefSortKeys:
+    """
+    Natural sort keys and sort order ranks of references. Each one is
+    computed once and shared by ref sorting and table sorting of all bom
+    tables.
+    """
+    SPLIT_RE = re.compile('([0-9]+)')
+    # Most references are a prefix followed by a number
+    SIMPLE_RE = re.compile('^([^0-9]*)([0-9]+)$')
+
+    def __init__(self, sort_order):
+        # type: (list) -> None
+        self.ranks = {}
+        for i, prefix in enumerate(sort_order):
+            # same as sort_order.index(), first occurrence wins
+            self.ranks.setdefault(prefix, i)
+        self.default_rank = self.ranks['~']
+        self.keys = {}
+        self.ref_ranks = {}
+
+    def key(self, ref):
+        """Natural sort key for strings containing numbers."""
+        try:
+            return self.keys[ref]
+        except KeyError:
+            m = self.SIMPLE_RE.match(ref)
+            if m is not None:
+                # same as split result [prefix, number, '']
+                key = (m.group(1).lower(), int(m.group(2)), '')
+            else:
+                key = tuple(int(c) if c.isdigit() else c.lower()
+                            for c in self.SPLIT_RE.split(ref))
+            self.keys[ref] = key
+            return key
+
+    def rank(self, ref):
+        """Position of reference prefix in component sort order."""
+        try:
+            return self.ref_ranks[ref]
+        except KeyError:
+            prefix = REF_PREFIX_RE.match(ref).group()
+            rank = self.ref_ranks[ref] = self.ranks.get(
+                    prefix, self.default_rank)
+            return rank
+
+
+def sort_bom_tables(part_groups, config):
+    # type: (dict, Config) -> dict
+    """
+    Builds sorted bom tables from grouped part lists.
+    :param part_groups: dict of table key to dict of group key
+        (norm_value, extras, footprint, attr) to [value, [(ref, index)]],
+        refs of a group are in order of module index
+    :param config: Config object
+    :return: dict of table key to bom table (qty, value, footprint, refs)
+    """
+    if '~' not in config.component_sort_order:
+        config.component_sort_order.append('~')
+    ref_keys = RefSortKeys(config.component_sort_order)
+
+    # Refs are listed in module order, stable sort keeps that order for
+    # equal refs without comparing indexes.
+    def ref_sort_key(r):
+        return ref_keys.key(r[0])
 
     # sort table by reference prefix, footprint and quantity
     def sort_func(row):
         qty, _, fp, rf, e = row
-        prefix = re.findall('^[A-Z]*', rf[0][0])[0]
-        if prefix in config.component_sort_order:
-            ref_ord = config.component_sort_order.index(prefix)
-        else:
-            ref_ord = config.component_sort_order.index('~')
-        return ref_ord, e, fp, -qty, alphanum_key(rf[0][0])
+        ref = rf[0][0]
+        return ref_keys.rank(ref), e, fp, -qty, ref_keys.key(ref)
 
-    if '~' not in config.component_sort_order:
-        config.component_sort_order.append('~')
-    bom_table = sorted(bom_table, key=sort_func)
+    tables = {}
+    for table_key, groups in part_groups.items():
+        # build bom table, sort refs
+        bom_table = []
+        for (norm_value, extras, footprint, attr), valrefs in groups.items():
+            bom_row = (
+                len(valrefs[1]), valrefs[0], footprint,
+                sorted(valrefs[1], key=ref_sort_key), extras)
+            bom_table.append(bom_row)
+        tables[table_key] = sorted(bom_table, key=sort_func)
 
-    return bom_table
+    return tables
 
 
-def normalize(point):
-    return [point[0] * 1e-6, point[1] * 1e-6]
+_method_support = {}
+
+
+def has_method(obj, name):
+    """
+    Cached hasattr(). Available methods differ between KiCad versions,
+    they are probed once per python type instead of once per item.
+    """
+    key = (type(obj), name)
+    supported = _method_support.get(key)
+    if supported is None:
+        supported = _method_support[key] = hasattr(obj, name)
+    return supported
+
+
+def parse_segment(d):
+    return {
+        "type": "segment",
+        "start": normalize(d.GetStart()),
+        "end": normalize(d.GetEnd()),
+        "width": d.GetWidth() * 1e-6
+    }
+
+
+def parse_circle(d):
+    return {
+        "type": "circle",
+        "start": normalize(d.GetStart()),
+        "radius": d.GetRadius() * 1e-6,
+        "width": d.GetWidth() * 1e-6
+    }
+
+
+def parse_arc(d):
+    a1 = d.GetArcAngleStart() * 0.1
+    a2 = (d.GetArcAngleStart() + d.GetAngle()) * 0.1
+    if d.GetAngle() < 0:
+        (a1, a2) = (a2, a1)
+    r = d.GetRadius() * 1e-6
+    return {
+        "type": "arc",
+        "start": normalize(d.GetStart()),
+        "radius": r,
+        "startangle": a1,
+        "endangle": a2,
+        "width": d.GetWidth() * 1e-6
+    }
+
+
+def parse_polygon(d):
+    if has_method(d, "GetPolyShape"):
+        polygons = parse_poly_set(d.GetPolyShape())
+    else:
+        loginfo("Polygons not supported for KiCad 4, skipping")
+        return None
+    angle = 0
+    if d.GetParentModule() is not None:
+        angle = d.GetParentModule().GetOrientation() * 0.1,
+    return {
+        "type": "polygon",
+        "pos": normalize(d.GetStart()),
+        "angle": angle,
+        "polygons": polygons
+    }
+
+
+DRAW_SEGMENT_PARSERS = {
+    pcbnew.S_SEGMENT: parse_segment,
+    pcbnew.S_CIRCLE: parse_circle,
+    pcbnew.S_ARC: parse_arc,
+    pcbnew.S_POLYGON: parse_polygon,
+}
 
 
 def parse_draw_segment(d):
-    shape = {
-        pcbnew.S_SEGMENT: "segment",
-        pcbnew.S_CIRCLE: "circle",
-        pcbnew.S_ARC: "arc",
-        pcbnew.S_POLYGON: "polygon",
-    }.get(d.GetShape(), "")
-    if shape == "":
+    parser = DRAW_SEGMENT_PARSERS.get(d.GetShape())
+    if parser is None:
         loginfo("Unsupported shape %s, skipping", d.GetShape())
         return None
-    start = normalize(d.GetStart())
-    end = normalize(d.GetEnd())
-    if shape == "segment":
-        return {
-            "type": shape,
-            "start": start,
-            "end": end,
-            "width": d.GetWidth() * 1e-6
-        }
-    if shape == "circle":
-        return {
-            "type": shape,
-            "start": start,
-            "radius": d.GetRadius() * 1e-6,
-            "width": d.GetWidth() * 1e-6
-        }
-    if shape == "arc":
-        a1 = d.GetArcAngleStart() * 0.1
-        a2 = (d.GetArcAngleStart() + d.GetAngle()) * 0.1
-        if d.GetAngle() < 0:
-            (a1, a2) = (a2, a1)
-        r = d.GetRadius() * 1e-6
-        return {
-            "type": shape,
-            "start": start,
-            "radius": r,
-            "startangle": a1,
-            "endangle": a2,
-            "width": d.GetWidth() * 1e-6
-        }
-    if shape == "polygon":
-        if hasattr(d, "GetPolyShape"):
-            polygons = parse_poly_set(d.GetPolyShape())
-        else:
-            loginfo("Polygons not supported for KiCad 4, skipping")
-            return None
-        angle = 0
-        if d.GetParentModule() is not None:
-            angle = d.GetParentModule().GetOrientation() * 0.1,
-        return {
-            "type": shape,
-            "pos": start,
-            "angle": angle,
-            "polygons": polygons
-        }
+    return parser(d)
 
 
-def parse_poly_set(polygon_set):
+def extract_poly_set(polygon_set):
     result = []
     for polygon_index in range(polygon_set.OutlineCount()):
         outline = polygon_set.Outline(polygon_index)
-        if not hasattr(outline, "PointCount"):
+        if not has_method(outline, "PointCount"):
             logwarn("No PointCount method on outline object. "
                     "Unpatched kicad version?")
             return result
         parsed_outline = []
         for point_index in range(outline.PointCount()):
             point = outline.Point(point_index)
-            parsed_outline.append(normalize([point.x, point.y]))
+            parsed_outline.append((point.x, point.y))
         result.append(parsed_outline)
 
     return result
 
 
+def parse_poly_set(polygon_set):
+    return normalize_polygons(extract_poly_set(polygon_set))
+
+
 def parse_text(d):
     pos = normalize(d.GetPosition())
     if not d.IsVisible():
@@ -278,17 +422,17 @@ def parse_text(d):
     if d.GetClass() == "MTEXT":
         angle = d.GetDrawRotation() * 0.1
     else:
-        if hasattr(d, "GetTextAngle"):
+        if has_method(d, "GetTextAngle"):
             angle = d.GetTextAngle() * 0.1
         else:
             angle = d.GetOrientation() * 0.1
-    if hasattr(d, "GetTextHeight"):
+    if has_method(d, "GetTextHeight"):
         height = d.GetTextHeight() * 1e-6
         width = d.GetTextWidth() * 1e-6
     else:
         height = d.GetHeight() * 1e-6
         width = d.GetWidth() * 1e-6
-    if hasattr(d, "GetShownText"):
+    if has_method(d, "GetShownText"):
         text = d.GetShownText()
     else:
         text = d.GetText()
@@ -312,190 +456,297 @@ def parse_text(d):
     }
 
 
+# Drawing parsers by pcbnew class name
+DRAWING_PARSERS = {
+    "DRAWSEGMENT": parse_draw_segment,
+    "MGRAPHIC": parse_draw_segment,
+    "PTEXT": parse_text,
+    "MTEXT": parse_text,
+}
+
+
 def parse_drawing(d):
-    if d.GetClass() in ["DRAWSEGMENT", "MGRAPHIC"]:
-        return parse_draw_segment(d)
-    elif d.GetClass() in ["PTEXT", "MTEXT"]:
-        return parse_text(d)
-    else:
+    parser = DRAWING_PARSERS.get(d.GetClass())
+    if parser is None:
         loginfo("Unsupported drawing class %s, skipping", d.GetClass())
         return None
+    return parser(d)
+
 
+class DrawingIndex:
+    """
+    Board and module drawings bucketed by layer id.
 
-def parse_edges(pcb):
+    All drawings are visited once when the index is built, consumers then
+    read only the buckets of layers they are interested in, so adding more
+    layers does not add more scans of the board.
+    """
+
+    def __init__(self, pcb):
+        # type: (pcbnew.BOARD) -> None
+        # layer id -> list of (order, drawing, module index, is_field)
+        self.layers = {}
+        self.count = 0
+        self.add_drawings(pcb.GetDrawings(), None, False)
+        for i, m in enumerate(pcb.GetModules()):
+            self.add_drawings([m.Reference(), m.Value()], i, True)
+            self.add_drawings(m.GraphicalItems(), i, False)
+
+    def add_drawings(self, drawings, module_index, is_field):
+        for d in drawings:
+            entry = (self.count, d, module_index, is_field)
+            self.layers.setdefault(d.GetLayer(), []).append(entry)
+            self.count += 1
+
+    def get(self, layer, fields=True):
+        """
+        :param layer: pcbnew layer id
+        :param fields: include module reference and value texts
+        :return: list of drawings on layer in board order
+        """
+        return [e[1] for e in self.layers.get(layer, [])
+                if fields or not e[3]]
+
+    def module_drawings(self, layers):
+        """
+        :param layers: list of pcbnew layer ids
+        :return: dict of module index -> list of (layer, drawing) tuples of
+            module graphical items on given layers in board order
+        """
+        entries = [(e, layer) for layer in layers
+                   for e in self.layers.get(layer, [])
+                   if e[2] is not None and not e[3]]
+        entries.sort(key=lambda el: el[0][0])
+        result = {}
+        for e, layer in entries:
+            result.setdefault(e[2], []).append((layer, e[1]))
+        return result
+
+
+def parse_edges(drawing_index):
+    # type: (DrawingIndex) -> tuple
     edges = []
-    drawings = list(pcb.GetDrawings())
     bbox = None
-    for m in pcb.GetModules():
-        for g in m.GraphicalItems():
-            drawings.append(g)
-    for d in drawings:
-        if d.GetLayer() == pcbnew.Edge_Cuts:
-            parsed_drawing = parse_drawing(d)
-            if parsed_drawing:
-                edges.append(parsed_drawing)
-                if bbox is None:
-                    bbox = d.GetBoundingBox()
-                else:
-                    bbox.Merge(d.GetBoundingBox())
+    for d in drawing_index.get(pcbnew.Edge_Cuts, fields=False):
+        parsed_drawing = parse_drawing(d)
+        if parsed_drawing:
+            edges.append(parsed_drawing)
+            if bbox is None:
+                bbox = d.GetBoundingBox()
+            else:
+                bbox.Merge(d.GetBoundingBox())
     if bbox:
         bbox.Normalize()
     return edges, bbox
 
 
-def parse_drawings_on_layers(drawings, f_layer, b_layer):
-    front = []
-    back = []
-
-    for d in drawings:
-        if d.GetLayer() not in [f_layer, b_layer]:
-            continue
+def parse_drawings_on_layer(drawing_index, layer):
+    # type: (DrawingIndex, int) -> list
+    drawings = []
+    for d in drawing_index.get(layer):
         drawing = parse_drawing(d)
-        if not drawing:
-            continue
-        if d.GetLayer() == f_layer:
-            front.append(drawing)
-        else:
-            back.append(drawing)
+        if drawing:
+            drawings.append(drawing)
+    return drawings
 
+
+def parse_drawings_on_layers(drawing_index, f_layer, b_layer):
+    # type: (DrawingIndex, int, int) -> dict
     return {
-        "F": front,
-        "B": back
+        "F": parse_drawings_on_layer(drawing_index, f_layer),
+        "B": parse_drawings_on_layer(drawing_index, b_layer)
     }
 
 
-def get_all_drawings(pcb):
-    drawings = list(pcb.GetDrawings())
-    for m in pcb.GetModules():
-        drawings.append(m.Reference())
-        drawings.append(m.Value())
-        for d in m.GraphicalItems():
-            drawings.append(d)
-    return drawings
+COPPER_LAYERS = [pcbnew.F_Cu, pcbnew.B_Cu]
 
 
-def parse_pad(pad):
+PAD_SHAPES = {
+    pcbnew.PAD_SHAPE_RECT: "rect",
+    pcbnew.PAD_SHAPE_OVAL: "oval",
+    pcbnew.PAD_SHAPE_CIRCLE: "circle",
+}
+if hasattr(pcbnew, "PAD_SHAPE_ROUNDRECT"):
+    PAD_SHAPES[pcbnew.PAD_SHAPE_ROUNDRECT] = "roundrect"
+if hasattr(pcbnew, "PAD_SHAPE_CUSTOM"):
+    PAD_SHAPES[pcbnew.PAD_SHAPE_CUSTOM] = "custom"
+
+DRILL_SHAPES = {
+    pcbnew.PAD_DRILL_SHAPE_CIRCLE: "circle",
+    pcbnew.PAD_DRILL_SHAPE_OBLONG: "oblong"
+}
+
+TH_PAD_ATTRIBUTES = [
+    pcbnew.PAD_ATTRIB_STANDARD,
+    pcbnew.PAD_ATTRIB_HOLE_NOT_PLATED,
+]
+
+
+def extract_pad(pad):
+    # type: (pcbnew.D_PAD) -> RawPad
+    shape = PAD_SHAPES.get(pad.GetShape(), "")
+    if shape == "":
+        loginfo("Unsupported pad shape %s, skipping.", pad.GetShape())
+        return None
     layers_set = list(pad.GetLayerSet().Seq())
     layers = []
     if pcbnew.F_Cu in layers_set:
         layers.append("F")
     if pcbnew.B_Cu in layers_set:
         layers.append("B")
-    pos = normalize(pad.GetPosition())
-    size = normalize(pad.GetSize())
-    is_pin1 = pad.GetPadName() in ['1', 'A', 'A1', 'P1', 'PAD1']
-    angle = pad.GetOrientation() * -0.1
-    shape_lookup = {
-        pcbnew.PAD_SHAPE_RECT: "rect",
-        pcbnew.PAD_SHAPE_OVAL: "oval",
-        pcbnew.PAD_SHAPE_CIRCLE: "circle",
-    }
-    if hasattr(pcbnew, "PAD_SHAPE_ROUNDRECT"):
-        shape_lookup[pcbnew.PAD_SHAPE_ROUNDRECT] = "roundrect"
-    if hasattr(pcbnew, "PAD_SHAPE_CUSTOM"):
-        shape_lookup[pcbnew.PAD_SHAPE_CUSTOM] = "custom"
-    shape = shape_lookup.get(pad.GetShape(), "")
-    if shape == "":
-        loginfo("Unsupported pad shape %s, skipping.", pad.GetShape())
-        return None
-    pad_dict = {
-        "layers": layers,
-        "pos": pos,
-        "size": size,
-        "angle": angle,
-        "shape": shape
-    }
-    if is_pin1:
-        pad_dict['pin1'] = 1
+    pos = pad.GetPosition()
+    size = pad.GetSize()
+    polygons = None
     if shape == "custom":
         polygon_set = pad.GetCustomShapeAsPolygon()
         if polygon_set.HasHoles():
             logwarn('Detected holes in custom pad polygons')
         if polygon_set.IsSelfIntersecting():
             logwarn('Detected self intersecting polygons in custom pad')
-        pad_dict["polygons"] = parse_poly_set(polygon_set)
+        polygons = extract_poly_set(polygon_set)
+    radius = None
     if shape == "roundrect":
-        pad_dict["radius"] = pad.GetRoundRectCornerRadius() * 1e-6
-    if (pad.GetAttribute() == pcbnew.PAD_ATTRIB_STANDARD or
-            pad.GetAttribute() == pcbnew.PAD_ATTRIB_HOLE_NOT_PLATED):
-        pad_dict["type"] = "th"
-        pad_dict["drillshape"] = {
-            pcbnew.PAD_DRILL_SHAPE_CIRCLE: "circle",
-            pcbnew.PAD_DRILL_SHAPE_OBLONG: "oblong"
-        }.get(pad.GetDrillShape())
-        pad_dict["drillsize"] = normalize(pad.GetDrillSize())
-    else:
-        pad_dict["type"] = "smd"
-    if hasattr(pad, "GetOffset"):
-        pad_dict["offset"] = normalize(pad.GetOffset())
+        radius = pad.GetRoundRectCornerRadius()
+    is_th = pad.GetAttribute() in TH_PAD_ATTRIBUTES
+    drill_shape = None
+    drill_size = None
+    if is_th:
+        drill_shape = DRILL_SHAPES.get(pad.GetDrillShape())
+        drill_size = pad.GetDrillSize()
+        drill_size = (drill_size[0], drill_size[1])
+    offset = None
+    if has_method(pad, "GetOffset"):
+        offset = pad.GetOffset()
+        offset = (offset[0], offset[1])
+    return RawPad(
+            name=pad.GetPadName(),
+            layers=layers,
+            pos=(pos[0], pos[1]),
+            size=(size[0], size[1]),
+            orientation=pad.GetOrientation(),
+            shape=shape,
+            polygons=polygons,
+            radius=radius,
+            is_th=is_th,
+            drill_shape=drill_shape,
+            drill_size=drill_size,
+            offset=offset)
 
-    return pad_dict
 
+def parse_pad(pad):
+    raw = extract_pad(pad)
+    if raw is None:
+        return None
+    return build_pad(raw)
 
-def parse_modules(pcb_modules):
-    # type: (list) -> list
-    modules = []
-    for m in pcb_modules:
-        ref = m.GetReference()
-        center = normalize(m.GetCenter())
-
-        # bounding box
-        mrect = m.GetFootprintRect()
-        mrect_pos = normalize(mrect.GetPosition())
-        mrect_size = normalize(mrect.GetSize())
-        bbox = {
-            "pos": mrect_pos,
-            "size": mrect_size
-        }
-
-        # graphical drawings
-        drawings = []
-        for d in m.GraphicalItems():
-            # we only care about copper ones, silkscreen is taken care of
-            if d.GetLayer() not in [pcbnew.F_Cu, pcbnew.B_Cu]:
-                continue
-            drawing = parse_drawing(d)
-            if not drawing:
-                continue
-            drawings.append({
-                "layer": "F" if d.GetLayer() == pcbnew.F_Cu else "B",
-                "drawing": drawing,
-            })
-
-        # footprint pads
-        pads = []
-        for p in m.Pads():
-            pad_dict = parse_pad(p)
-            if pad_dict is not None:
-                pads.append((p.GetPadName(), pad_dict))
-
-        # If no pads have common 'first' pad name then pick lexicographically.
-        pin1_pads = [p for p in pads if 'pin1' in p[1]]
-        if pads and not pin1_pads:
-            pads = sorted(pads, key=lambda el: el[0])
-            for pad_name, pad_dict in pads:
-                if pad_name:
-                    pad_dict['pin1'] = 1
-                    break
-
-        pads = [p[1] for p in pads]
-
-        # add module
-        modules.append({
-            "ref": ref,
-            "center": center,
-            "bbox": bbox,
-            "pads": pads,
-            "drawings": drawings,
-            "layer": {
-                pcbnew.F_Cu: "F",
-                pcbnew.B_Cu: "B"
-            }.get(m.GetLayer())
+
+def extract_module(m, copper_drawings=None):
+    # type: (pcbnew.MODULE, list) -> RawModule
+    """
+    :param m: module
+    :param copper_drawings: list of (layer, drawing) tuples of module
+        graphical items on copper layers as returned by
+        DrawingIndex.module_drawings(), if None they are looked up here.
+    """
+    center = m.GetCenter()
+    mrect = m.GetFootprintRect()
+    mrect_pos = mrect.GetPosition()
+    mrect_size = mrect.GetSize()
+
+    # graphical drawings
+    if copper_drawings is None:
+        # we only care about copper ones, silkscreen is taken care of
+        copper_drawings = [(d.GetLayer(), d) for d in m.GraphicalItems()
+                           if d.GetLayer() in COPPER_LAYERS]
+    drawings = []
+    for layer, d in copper_drawings:
+        drawing = parse_drawing(d)
+        if not drawing:
+            continue
+        drawings.append({
+            "layer": LAYER_KEYS[layer],
+            "drawing": drawing,
         })
 
+    # footprint pads
+    pads = []
+    for p in m.Pads():
+        raw_pad = extract_pad(p)
+        if raw_pad is not None:
+            pads.append(raw_pad)
+
+    return RawModule(
+            ref=m.GetReference(),
+            center=(center[0], center[1]),
+            bbox_pos=(mrect_pos[0], mrect_pos[1]),
+            bbox_size=(mrect_size[0], mrect_size[1]),
+            layer=LAYER_KEYS.get(m.GetLayer()),
+            drawings=drawings,
+            pads=pads)
+
+
+def build_modules_in_pool(raw_modules, parallel_threshold):
+    # type: (list, int) -> list
+    if (not is_cli or not parallel_threshold or ProcessPoolExecutor is None
+            or len(raw_modules) < parallel_threshold):
+        return build_modules(raw_modules)
+
+    chunk_count = 4 * multiprocessing.cpu_count()
+    chunk_size = max(1, len(raw_modules) // chunk_count)
+    chunks = [raw_modules[i:i + chunk_size]
+              for i in range(0, len(raw_modules), chunk_size)]
+    loginfo("Building %d modules in %d chunks in a process pool",
+            len(raw_modules), len(chunks))
+    modules = []
+    try:
+        with ProcessPoolExecutor() as executor:
+            for chunk in executor.map(build_modules, chunks):
+                modules.extend(chunk)
+    except (BrokenProcessPool, OSError) as e:
+        # Workers may fail to start, e.g. spawned workers that can not
+        # import the main script.
+        logwarn('Process pool failed (%s), building modules in this '
+                'process.' % e)
+        return build_modules(raw_modules)
     return modules
 
 
+def parse_modules(pcb_modules, parallel_threshold=0, drawing_index=None,
+                  module_cache=None):
+    # type: (list, int, DrawingIndex, ModuleCache) -> list
+    """
+    :param pcb_modules: list of modules on the pcb
+    :param parallel_threshold: build module dicts in a process pool when
+        there are at least this many modules, 0 disables the pool.
+        Only used in cli mode since inside pcbnew sys.executable is not
+        a python interpreter.
+    :param drawing_index: index of board drawings to take module copper
+        drawings from, pcb_modules must be in board order when given.
+    :param module_cache: cache of previously built modules, modules are
+        always extracted but only those that are not in it are built.
+    :return: list of module dicts
+    """
+    copper = None
+    if drawing_index is not None:
+        copper = drawing_index.module_drawings(COPPER_LAYERS)
+
+    if copper is None:
+        raw_modules = [extract_module(m) for m in pcb_modules]
+    else:
+        raw_modules = [extract_module(m, copper.get(i, []))
+                       for i, m in enumerate(pcb_modules)]
+
+    if module_cache is None:
+        return build_modules_in_pool(raw_modules, parallel_threshold)
+
+    def build(missed):
+        return build_modules_in_pool([raw_modules[i] for i in missed],
+                                     parallel_threshold)
+
+    keys = [make_key(raw) for raw in raw_modules]
+    return module_cache.build_modules(keys, build)
+
+
 def open_file(filename):
     import subprocess
     try:
@@ -524,45 +775,124 @@ def process_substitutions(bom_name_format, pcb_file_name, metadata):
     return name + '.html'
 
 
+def get_bom_file_dir(pcb_file_dir, config):
+    # type: (str, Config) -> str
+    if os.path.isabs(config.bom_dest_dir):
+        return config.bom_dest_dir
+    return os.path.join(pcb_file_dir, config.bom_dest_dir)
+
+
+COMPRESSIBLE_SCRIPTS = ['render.js', 'ibom.js']
+
+
+class WebAssets:
+    """
+    Static files from the web directory used by generate_file().
+
+    Without cache files are streamed from disk on every use. With cache
+    their content, the parsed html template and compressed scripts are kept
+    in memory, so generating many boards in one process reads and
+    compresses them once.
+    """
+
+    def __init__(self, cache=False):
+        self.cache = {} if cache else None
+
+    @staticmethod
+    def get_file_path(file_name):
+        return os.path.join(os.path.dirname(__file__), "..", "web", file_name)
+
+    def cached(self, key, func):
+        if self.cache is None:
+            return func()
+        if key not in self.cache:
+            self.cache[key] = func()
+        return self.cache[key]
+
+    def chunks(self, file_name):
+        path = self.get_file_path(file_name)
+        if self.cache is None:
+            return template.file_chunks(path)
+        return self.cached(
+                file_name, lambda: [''.join(template.file_chunks(path))])
+
+    def template(self):
+        return self.cached(
+                ('template', 'ibom.html'),
+                lambda: template.Template.from_file(
+                        self.get_file_path('ibom.html')))
+
+    def compressed(self, file_name, compress_func):
+        """
+        :param compress_func: function taking name and chunks returning
+            compressed blob
+        """
+        return self.cached(
+                ('compressed', file_name),
+                lambda: compress_func(file_name, self.chunks(file_name)))
+
+
+web_assets = WebAssets()
+
+
 def generate_file(pcb_file_dir, pcb_file_name, pcbdata, config):
-    def get_file_content(file_name):
-        path = os.path.join(os.path.dirname(__file__), "..", "web", file_name)
-        with io.open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+    def compressed(name, chunks):
+        start = time.time()
+        blob, raw_size = compress.deflate_base64(chunks)
+        loginfo("Compressed %s from %d to %d bytes (%.1fx) in %.2f s",
+                name, raw_size, len(blob),
+                raw_size / max(len(blob), 1.0), time.time() - start)
+        return blob
+
+    def get_script(file_name):
+        # only scripts loaded after util.js can be compressed
+        if config.compression == 'all' and file_name in COMPRESSIBLE_SCRIPTS:
+            blob = web_assets.compressed(file_name, compressed)
+            return ['(0, eval)(decompressString("', blob, '"));']
+        return web_assets.chunks(file_name)
 
     loginfo("Dumping pcb json data")
 
-    if os.path.isabs(config.bom_dest_dir):
-        bom_file_dir = config.bom_dest_dir
-    else:
-        bom_file_dir = os.path.join(pcb_file_dir, config.bom_dest_dir)
+    bom_file_dir = get_bom_file_dir(pcb_file_dir, config)
     if not os.path.isdir(bom_file_dir):
         os.makedirs(bom_file_dir)
     bom_file_name = process_substitutions(
             config.bom_name_format, pcb_file_name, pcbdata['metadata'])
     bom_file_name = os.path.join(bom_file_dir, bom_file_name)
-    pcbdata_js = "var pcbdata = " + json.dumps(pcbdata)
+    if config.compression == 'none':
+        pcbdata_js = template.buffered(itertools.chain(
+                ["var pcbdata = "], template.iterencode(pcbdata)))
+    else:
+        blob = compressed('pcb data', template.iterencode(pcbdata))
+        pcbdata_js = ['var pcbdata = "', blob, '"']
     config_js = "var config = " + config.get_html_config()
-    html = get_file_content("ibom.html")
-    html = html.replace('///CSS///', get_file_content('ibom.css'))
-    html = html.replace('///SPLITJS///', get_file_content('split.js'))
-    html = html.replace('///POINTER_EVENTS_POLYFILL///',
-                        get_file_content('pep.js'))
-    html = html.replace('///CONFIG///', config_js)
-    html = html.replace('///PCBDATA///', pcbdata_js)
-    html = html.replace('///UTILJS///', get_file_content('util.js'))
-    html = html.replace('///RENDERJS///', get_file_content('render.js'))
-    html = html.replace('///IBOMJS///', get_file_content('ibom.js'))
+    substitutions = {
+        'CSS': web_assets.chunks('ibom.css'),
+        'SPLITJS': web_assets.chunks('split.js'),
+        'POINTER_EVENTS_POLYFILL': web_assets.chunks('pep.js'),
+        'CONFIG': [config_js],
+        'PCBDATA': pcbdata_js,
+        'UTILJS': web_assets.chunks('util.js'),
+        'RENDERJS': get_script('render.js'),
+        'IBOMJS': get_script('ibom.js'),
+    }
+    html = web_assets.template()
+    start = time.time()
     with io.open(bom_file_name, 'wt', encoding='utf-8') as bom:
-        bom.write(html)
-    loginfo("Created file %s", bom_file_name)
+        html.write(bom, substitutions)
+    loginfo("Created file %s, %d bytes in %.2f s", bom_file_name,
+            os.path.getsize(bom_file_name), time.time() - start)
     return bom_file_name
 
 
 def main(pcb, config, parse_schematic_data, cli=False):
-    # type: (pcbnew.BOARD, Config, lambda: str, bool) -> None
-    global is_cli
+    # type: (pcbnew.BOARD, Config, lambda: str, bool) -> str
+    """:return: path of generated bom file or None on failure"""
+    global is_cli, font_parser
     is_cli = cli
+    # Glyphs parsed for previous boards are reused from FontParser cache
+    # but only glyphs used by this board end up in its font data.
+    font_parser = FontParser()
     pcb_file_name = pcb.GetFileName()
     # Get extra field data
     extra_fields = None
@@ -602,7 +932,8 @@ def main(pcb, config, parse_schematic_data, cli=False):
     if not title:
         # remove .kicad_pcb extension
         title = os.path.splitext(pcb_file_name)[0]
-    edges, bbox = parse_edges(pcb)
+    drawing_index = DrawingIndex(pcb)
+    edges, bbox = parse_edges(drawing_index)
     if bbox is None:
         logerror('Please draw pcb outline on the edges '
                  'layer on sheet or any module before '
@@ -616,16 +947,25 @@ def main(pcb, config, parse_schematic_data, cli=False):
     }
 
     pcb_modules = list(pcb.GetModules())
-    drawings = get_all_drawings(pcb)
+    module_cache = None
+    if config.module_cache_size > 0:
+        module_cache = ModuleCache(
+                cache_file_path(pcb.GetFileName()),
+                config.module_cache_size,
+                invalidate=config.invalidate_module_cache)
+        if module_cache.load_error is not None:
+            logwarn('Ignoring unreadable module cache: %s'
+                    % module_cache.load_error)
 
     pcbdata = {
         "edges_bbox": bbox,
         "edges": edges,
         "silkscreen": parse_drawings_on_layers(
-                drawings, pcbnew.F_SilkS, pcbnew.B_SilkS),
+                drawing_index, pcbnew.F_SilkS, pcbnew.B_SilkS),
         "fabrication": parse_drawings_on_layers(
-                drawings, pcbnew.F_Fab, pcbnew.B_Fab),
-        "modules": parse_modules(pcb_modules),
+                drawing_index, pcbnew.F_Fab, pcbnew.B_Fab),
+        "modules": parse_modules(pcb_modules, config.parallel_threshold,
+                                 drawing_index, module_cache),
         "metadata": {
             "title": title,
             "revision": title_block.GetRevision(),
@@ -634,17 +974,25 @@ def main(pcb, config, parse_schematic_data, cli=False):
         },
         "bom": {},
     }
-    pcbdata["bom"]["both"] = generate_bom(pcb_modules, config, extra_fields)
+    if module_cache is not None:
+        module_cache.save()
+        loginfo(module_cache.summary())
+    pcbdata["bbox_index"] = build_bbox_index(pcbdata["modules"])
 
     # build BOM
-    for layer in (pcbnew.F_Cu, pcbnew.B_Cu):
-        bom_table = generate_bom(pcb_modules, config, extra_fields,
-                                 filter_layer=layer)
-        pcbdata["bom"]["F" if layer == pcbnew.F_Cu else "B"] = bom_table
+    pcbdata["bom"] = group_bom(pcb_modules, config, extra_fields)
 
-    pcbdata["font_data"] = font_parser.get_parsed_font()
+    if config.tessellate_text:
+        TextTessellator(font_parser).tessellate_pcbdata(pcbdata)
+    else:
+        pcbdata["font_data"] = font_parser.get_encoded_font()
+    if config.pcbdata_format != 'full':
+        pcbdata = compact.encode_pcbdata(
+                pcbdata, packed=config.pcbdata_format == 'packed')
     bom_file = generate_file(pcb_file_dir, pcb_file_name, pcbdata, config)
 
     if config.open_browser:
         loginfo("Opening file in browser")
         open_file(bom_file)
+
+    return bom_file
@@ -0,0 +1,860 @@
+"""
+Pure python reader of KiCad 5 .kicad_pcb files.
+
+Exposes the subset of pcbnew API (BOARD, MODULE, D_PAD, DRAWSEGMENT,
+EDGE_MODULE, TEXTE_PCB, TEXTE_MODULE and constants) that ibom uses, so
+boms can be generated without a KiCad installation:
+
+    from InteractiveHtmlBom.core import kicad_pcb
+    kicad_pcb.install()  # before ibom is imported
+    board = kicad_pcb.LoadBoard('board.kicad_pcb')
+
+Coordinates are converted to pcbnew internal units (nanometers) and angles
+to tenths of degree. Footprint items are placed and rotated the way
+pcbnew does it when loading the board.
+"""
+
+import io
+import math
+import re
+import sys
+from collections import namedtuple
+
+from ..schematic_data.sexpressions import parse_tokens
+
+# Marks this module as board model stand-in for the real pcbnew
+IS_BOARD_MODEL = True
+
+# Layer ids and default names of KiCad 5
+LAYER_NAMES = ['F.Cu'] + ['In%d.Cu' % i for i in range(1, 31)] + [
+    'B.Cu', 'B.Adhes', 'F.Adhes', 'B.Paste', 'F.Paste', 'B.SilkS', 'F.SilkS',
+    'B.Mask', 'F.Mask', 'Dwgs.User', 'Cmts.User', 'Eco1.User', 'Eco2.User',
+    'Edge.Cuts', 'Margin', 'B.CrtYd', 'F.CrtYd', 'B.Fab', 'F.Fab',
+]
+globals().update((name.replace('.', '_'), layer_id)
+                 for layer_id, name in enumerate(LAYER_NAMES))
+COPPER_LAYER_IDS = list(range(0, 32))
+
+# STROKE_T
+S_SEGMENT, S_RECT, S_ARC, S_CIRCLE, S_POLYGON, S_CURVE = range(6)
+# PAD_SHAPE_T
+(PAD_SHAPE_CIRCLE, PAD_SHAPE_RECT, PAD_SHAPE_OVAL, PAD_SHAPE_TRAPEZOID,
+ PAD_SHAPE_ROUNDRECT, PAD_SHAPE_CHAMFERED_RECT, PAD_SHAPE_CUSTOM) = range(7)
+# PAD_ATTR_T
+(PAD_ATTRIB_STANDARD, PAD_ATTRIB_SMD, PAD_ATTRIB_CONN,
+ PAD_ATTRIB_HOLE_NOT_PLATED) = range(4)
+# PAD_DRILL_SHAPE_T
+PAD_DRILL_SHAPE_CIRCLE, PAD_DRILL_SHAPE_OBLONG = range(2)
+# MODULE_ATTR_T
+MOD_DEFAULT, MOD_CPLACE, MOD_VIRTUAL = range(3)
+# EDA_TEXT_HJUSTIFY_T
+GR_TEXT_HJUSTIFY_LEFT, GR_TEXT_HJUSTIFY_CENTER, GR_TEXT_HJUSTIFY_RIGHT = \
+    range(-1, 2)
+
+PAD_SHAPES = {
+    'circle': PAD_SHAPE_CIRCLE,
+    'rect': PAD_SHAPE_RECT,
+    'oval': PAD_SHAPE_OVAL,
+    'trapezoid': PAD_SHAPE_TRAPEZOID,
+    'roundrect': PAD_SHAPE_ROUNDRECT,
+    'chamfered_rect': PAD_SHAPE_CHAMFERED_RECT,
+    'custom': PAD_SHAPE_CUSTOM,
+}
+PAD_ATTRIBUTES = {
+    'thru_hole': PAD_ATTRIB_STANDARD,
+    'smd': PAD_ATTRIB_SMD,
+    'connect': PAD_ATTRIB_CONN,
+    'np_thru_hole': PAD_ATTRIB_HOLE_NOT_PLATED,
+}
+MODULE_ATTRIBUTES = {
+    'smd': MOD_CPLACE,
+    'virtual': MOD_VIRTUAL,
+}
+# Segment count of circles approximated by polygons
+CIRCLE_SEGMENTS = 32
+
+Point = namedtuple('Point', ['x', 'y'])
+
+# Unlike netlists board files escape quotes and backslashes in strings
+token_pattern = re.compile(r'\s*(\(|\)|"(?:[^"\\]|\\.)*"|[^()\s]+)', re.S)
+escape_pattern = re.compile(r'\\(.)', re.S)
+
+
+def install():
+    """Registers this module as pcbnew, must be called before ibom import."""
+    sys.modules['pcbnew'] = sys.modules[__name__]
+    return sys.modules[__name__]
+
+
+def unescape(match):
+    c = match.group(1)
+    return '\n' if c == 'n' else c
+
+
+def iter_tokens(text):
+    """Tokens in the format of sexpressions.scan() with escapes resolved."""
+    for token in token_pattern.findall(text):
+        if token[0] == '"' and '\\' in token:
+            token = '"' + escape_pattern.sub(unescape, token[1:-1]) + '"'
+        yield token
+
+
+def to_iu(value):
+    """Millimeters string to internal units."""
+    return int(round(float(value) * 1e6))
+
+
+def to_decidegrees(value):
+    return float(value) * 10
+
+
+def rotate_point(x, y, angle):
+    """Same as KiCad RotatePoint(), angle is in tenths of degree."""
+    angle = angle % 3600
+    if angle == 0:
+        return x, y
+    if angle == 900:
+        return y, -x
+    if angle == 1800:
+        return -x, -y
+    if angle == 2700:
+        return -y, x
+    rad = math.radians(angle * 0.1)
+    sin = math.sin(rad)
+    cos = math.cos(rad)
+    return (int(round(y * sin + x * cos)),
+            int(round(y * cos - x * sin)))
+
+
+def arc_tangent(dy, dx):
+    """KiCad ArcTangente() in tenths of degree."""
+    return math.degrees(math.atan2(dy, dx)) * 10
+
+
+def normalize_angle_pos(angle):
+    while angle < 0:
+        angle += 3600
+    while angle >= 3600:
+        angle -= 3600
+    return angle
+
+
+def children(expr, name):
+    return [c for c in expr[1:] if isinstance(c, list) and c and
+            c[0] == name]
+
+
+def child(expr, name):
+    for c in expr[1:]:
+        if isinstance(c, list) and c and c[0] == name:
+            return c
+    return None
+
+
+def child_value(expr, name, default=None):
+    c = child(expr, name)
+    if c is None or len(c) < 2:
+        return default
+    return c[1]
+
+
+def parse_xy(expr):
+    return Point(to_iu(expr[1]), to_iu(expr[2]))
+
+
+def parse_pts(expr):
+    pts = child(expr, 'pts')
+    if pts is None:
+        return []
+    return [parse_xy(xy) for xy in children(pts, 'xy')]
+
+
+class Rect:
+    """EDA_RECT subset."""
+
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_points(cls, points, inflate=0):
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        rect = cls(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+        rect.Inflate(inflate)
+        return rect
+
+    def GetPosition(self):
+        return Point(self.x, self.y)
+
+    def GetSize(self):
+        return Point(self.width, self.height)
+
+    def GetX(self):
+        return self.x
+
+    def GetY(self):
+        return self.y
+
+    def GetWidth(self):
+        return self.width
+
+    def GetHeight(self):
+        return self.height
+
+    def GetRight(self):
+        return self.x + self.width
+
+    def GetBottom(self):
+        return self.y + self.height
+
+    def Centre(self):
+        return Point(self.x + self.width // 2, self.y + self.height // 2)
+
+    def Normalize(self):
+        if self.width < 0:
+            self.x += self.width
+            self.width = -self.width
+        if self.height < 0:
+            self.y += self.height
+            self.height = -self.height
+
+    def Inflate(self, d):
+        self.x -= d
+        self.y -= d
+        self.width += 2 * d
+        self.height += 2 * d
+
+    def Merge(self, other):
+        self.Normalize()
+        other.Normalize()
+        right = max(self.GetRight(), other.GetRight())
+        bottom = max(self.GetBottom(), other.GetBottom())
+        self.x = min(self.x, other.x)
+        self.y = min(self.y, other.y)
+        self.width = right - self.x
+        self.height = bottom - self.y
+
+
+class Outline:
+    """SHAPE_LINE_CHAIN subset."""
+
+    def __init__(self, points):
+        self.points = points
+
+    def PointCount(self):
+        return len(self.points)
+
+    def Point(self, index):
+        return self.points[index]
+
+    def CPoint(self, index):
+        return self.points[index]
+
+
+class PolySet:
+    """SHAPE_POLY_SET subset, outlines are never merged."""
+
+    def __init__(self, outlines):
+        self.outlines = [Outline(o) for o in outlines]
+
+    def OutlineCount(self):
+        return len(self.outlines)
+
+    def Outline(self, index):
+        return self.outlines[index]
+
+    def HasHoles(self):
+        return False
+
+    def IsSelfIntersecting(self):
+        return False
+
+
+def circle_points(cx, cy, radius, segments=CIRCLE_SEGMENTS):
+    return [Point(int(round(cx + radius * math.cos(2 * math.pi * i /
+                                                   segments))),
+                  int(round(cy + radius * math.sin(2 * math.pi * i /
+                                                   segments))))
+            for i in range(segments)]
+
+
+def arc_points(cx, cy, sx, sy, angle, segments=CIRCLE_SEGMENTS):
+    """Points of arc around (cx, cy) from (sx, sy) by angle in decidegrees."""
+    steps = max(1, int(abs(angle) / 3600.0 * segments + 0.5))
+    points = [Point(cx, cy)]
+    for i in range(steps + 1):
+        x, y = rotate_point(sx - cx, sy - cy, angle * i / steps)
+        points.append(Point(cx + x, cy + y))
+    return points
+
+
+def segment_polygon(start, end, width):
+    """Polygon of a thick segment with rectangular ends."""
+    dx = end[0] - start[0]
+    dy = end[1] - start[1]
+    length = math.hypot(dx, dy) or 1.0
+    nx = -dy / length * width / 2.0
+    ny = dx / length * width / 2.0
+    return [Point(int(round(p[0] + s * nx)), int(round(p[1] + s * ny)))
+            for p, s in ((start, 1), (end, 1), (end, -1), (start, -1))]
+
+
+def ensure_ccw(points):
+    """Orients outline so overlapping outlines fill as union."""
+    area = 0
+    for i in range(len(points)):
+        x1, y1 = points[i - 1]
+        x2, y2 = points[i]
+        area += x1 * y2 - x2 * y1
+    return points if area >= 0 else points[::-1]
+
+
+class LayerSet:
+    """LSET subset."""
+
+    def __init__(self, layers):
+        self.layers = sorted(set(layers))
+
+    def Seq(self):
+        return list(self.layers)
+
+    def Contains(self, layer):
+        return layer in self.layers
+
+
+class Fpid:
+    """LIB_ID subset."""
+
+    def __init__(self, name):
+        self.nickname, _, self.item_name = name.rpartition(':')
+
+    def GetLibNickname(self):
+        return self.nickname
+
+    def GetLibItemName(self):
+        return self.item_name
+
+
+class TitleBlock:
+    def __init__(self, expr):
+        self.expr = expr or ['title_block']
+
+    def get(self, name):
+        return child_value(self.expr, name, '')
+
+    def GetTitle(self):
+        return self.get('title')
+
+    def GetDate(self):
+        return self.get('date')
+
+    def GetRevision(self):
+        return self.get('rev')
+
+    def GetCompany(self):
+        return self.get('company')
+
+
+class BoardItem:
+    def __init__(self, layer, parent=None):
+        self.layer = layer
+        self.parent = parent
+
+    def GetLayer(self):
+        return self.layer
+
+    def GetParentModule(self):
+        return self.parent
+
+
+class DrawSegment(BoardItem):
+    """DRAWSEGMENT and EDGE_MODULE subset."""
+
+    def __init__(self, shape, layer, width, start=Point(0, 0),
+                 end=Point(0, 0), angle=0, polygon=None, parent=None):
+        BoardItem.__init__(self, layer, parent)
+        self.shape = shape
+        self.width = width
+        self.start = start
+        self.end = end
+        self.angle = angle
+        self.polygon = polygon or []
+
+    @classmethod
+    def from_expr(cls, expr, layers, parent=None):
+        kind = expr[0][3:]
+        layer = layers.get(child_value(expr, 'layer'), -1)
+        width = to_iu(child_value(expr, 'width', '0'))
+        if parent is None:
+            def place(p):
+                return p
+        else:
+            def place(p):
+                return parent.place(p)
+        if kind == 'line':
+            return cls(S_SEGMENT, layer, width,
+                       place(parse_xy(child(expr, 'start'))),
+                       place(parse_xy(child(expr, 'end'))), parent=parent)
+        if kind == 'circle':
+            return cls(S_CIRCLE, layer, width,
+                       place(parse_xy(child(expr, 'center'))),
+                       place(parse_xy(child(expr, 'end'))), parent=parent)
+        if kind == 'arc':
+            return cls(S_ARC, layer, width,
+                       place(parse_xy(child(expr, 'start'))),
+                       place(parse_xy(child(expr, 'end'))),
+                       angle=to_decidegrees(child_value(expr, 'angle', '0')),
+                       parent=parent)
+        if kind == 'poly':
+            # Module polygons stay relative to the module, pcbnew draws
+            # them from module position rotated by module orientation.
+            start = parent.GetPosition() if parent else Point(0, 0)
+            return cls(S_POLYGON, layer, width, start, start,
+                       polygon=parse_pts(expr), parent=parent)
+        if kind == 'curve':
+            pts = [place(p) for p in parse_pts(expr)]
+            return cls(S_CURVE, layer, width, pts[0], pts[-1],
+                       polygon=pts, parent=parent)
+        return None
+
+    def GetClass(self):
+        return 'MGRAPHIC' if self.parent is not None else 'DRAWSEGMENT'
+
+    def GetShape(self):
+        return self.shape
+
+    def GetStart(self):
+        return self.start
+
+    def GetEnd(self):
+        return self.end
+
+    def GetCenter(self):
+        return self.start
+
+    def GetWidth(self):
+        return self.width
+
+    def GetAngle(self):
+        return self.angle
+
+    def GetRadius(self):
+        return int(round(math.hypot(self.end.x - self.start.x,
+                                    self.end.y - self.start.y)))
+
+    def GetArcAngleStart(self):
+        return normalize_angle_pos(arc_tangent(self.end.y - self.start.y,
+                                               self.end.x - self.start.x))
+
+    def GetPolyShape(self):
+        return PolySet([self.polygon])
+
+    def GetBoundingBox(self):
+        half_width = self.width // 2
+        if self.shape == S_CIRCLE:
+            r = self.GetRadius()
+            return Rect.from_points(
+                    [(self.start.x - r, self.start.y - r),
+                     (self.start.x + r, self.start.y + r)], half_width)
+        if self.shape == S_ARC:
+            start = self.GetArcAngleStart() * 0.1
+            end = start + self.angle * 0.1
+            if end < start:
+                start, end = end, start
+            r = self.GetRadius()
+            angles = [start, end] + [
+                a for a in range(int(math.ceil(start / 90.0)) * 90,
+                                 int(end) + 1, 90)]
+            return Rect.from_points(
+                    [(self.start.x + r * math.cos(math.radians(a)),
+                      self.start.y + r * math.sin(math.radians(a)))
+                     for a in angles], half_width)
+        if self.shape == S_POLYGON:
+            points = self.polygon
+            if self.parent is not None:
+                points = [self.parent.place(p) for p in points]
+            return Rect.from_points(points or [self.start], half_width)
+        if self.shape == S_CURVE:
+            return Rect.from_points(self.polygon, half_width)
+        return Rect.from_points([self.start, self.end], half_width)
+
+
+class Text(BoardItem):
+    """TEXTE_PCB and TEXTE_MODULE subset."""
+
+    def __init__(self, expr, text, layers, parent=None):
+        at = child(expr, 'at')
+        pos = parse_xy(at)
+        # Angles in file are absolute for module texts too
+        self.angle = to_decidegrees(at[3]) if len(at) > 3 else 0
+        layer = layers.get(child_value(expr, 'layer'), -1)
+        BoardItem.__init__(self, layer, parent)
+        self.pos = parent.place(pos) if parent else pos
+        self.text = text
+        self.visible = 'hide' not in expr
+        self.keep_upright = 'unlocked' not in expr
+        effects = child(expr, 'effects') or ['effects']
+        if 'hide' in effects:
+            self.visible = False
+        font = child(effects, 'font') or ['font']
+        size = child(font, 'size') or ['size', '1', '1']
+        self.height = to_iu(size[1])
+        self.text_width = to_iu(size[2])
+        self.thickness = to_iu(child_value(font, 'thickness', '0.15'))
+        self.bold = 'bold' in font
+        self.italic = 'italic' in font
+        justify = child(effects, 'justify') or ['justify']
+        self.mirrored = 'mirror' in justify
+        self.horiz_justify = GR_TEXT_HJUSTIFY_CENTER
+        if 'left' in justify:
+            self.horiz_justify = GR_TEXT_HJUSTIFY_LEFT
+        elif 'right' in justify:
+            self.horiz_justify = GR_TEXT_HJUSTIFY_RIGHT
+
+    def GetClass(self):
+        return 'MTEXT' if self.parent is not None else 'PTEXT'
+
+    def GetPosition(self):
+        return self.pos
+
+    def GetTextAngle(self):
+        if self.parent is not None:
+            return self.angle - self.parent.GetOrientation()
+        return self.angle
+
+    def GetDrawRotation(self):
+        rotation = self.angle
+        if self.keep_upright:
+            while rotation > 900:
+                rotation -= 1800
+            while rotation < -900:
+                rotation += 1800
+        else:
+            rotation = normalize_angle_pos(rotation)
+        return rotation
+
+    def GetText(self):
+        return self.text
+
+    def GetShownText(self):
+        if self.parent is None or '%' not in self.text:
+            return self.text
+        result = []
+        i = 0
+        while i < len(self.text):
+            c = self.text[i]
+            if c == '%' and i + 1 < len(self.text):
+                i += 1
+                c = self.text[i]
+                if c == 'R':
+                    result.append(self.parent.GetReference())
+                elif c == 'V':
+                    result.append(self.parent.GetValue())
+                elif c == '%':
+                    result.append('%')
+                else:
+                    result.append('%' + c)
+            else:
+                result.append(c)
+            i += 1
+        return ''.join(result)
+
+    def IsVisible(self):
+        return self.visible
+
+    def GetTextHeight(self):
+        return self.height
+
+    def GetTextWidth(self):
+        return self.text_width
+
+    def GetThickness(self):
+        return self.thickness
+
+    def IsMirrored(self):
+        return self.mirrored
+
+    def IsItalic(self):
+        return self.italic
+
+    def IsBold(self):
+        return self.bold
+
+    def GetHorizJustify(self):
+        return self.horiz_justify
+
+
+class Pad:
+    """D_PAD subset."""
+
+    def __init__(self, expr, layers, parent):
+        self.parent = parent
+        self.name = expr[1]
+        self.attribute = PAD_ATTRIBUTES.get(expr[2], PAD_ATTRIB_SMD)
+        self.shape = PAD_SHAPES.get(expr[3], -1)
+        at = child(expr, 'at')
+        self.pos = parent.place(parse_xy(at))
+        self.orientation = to_decidegrees(at[3]) if len(at) > 3 else 0
+        size = child(expr, 'size')
+        self.size = Point(to_iu(size[1]), to_iu(size[2]))
+        self.drill_shape = PAD_DRILL_SHAPE_CIRCLE
+        self.drill_size = Point(0, 0)
+        self.offset = Point(0, 0)
+        drill = child(expr, 'drill')
+        if drill is not None:
+            offset = child(drill, 'offset')
+            if offset is not None:
+                self.offset = parse_xy(offset)
+            values = [v for v in drill[1:] if not isinstance(v, list)]
+            if values and values[0] == 'oval':
+                self.drill_shape = PAD_DRILL_SHAPE_OBLONG
+                values = values[1:]
+            if values:
+                dx = to_iu(values[0])
+                dy = to_iu(values[1]) if len(values) > 1 else dx
+                self.drill_size = Point(dx, dy)
+        self.layers = LayerSet(self.parse_layers(child(expr, 'layers'),
+                                                 layers))
+        self.rratio = float(child_value(expr, 'roundrect_rratio', '0.25'))
+        self.primitives = []
+        self.anchor_shape = PAD_SHAPE_CIRCLE
+        if self.shape == PAD_SHAPE_CUSTOM:
+            options = child(expr, 'options') or ['options']
+            if child_value(options, 'anchor') == 'rect':
+                self.anchor_shape = PAD_SHAPE_RECT
+            self.primitives = (child(expr, 'primitives') or [''])[1:]
+
+    @staticmethod
+    def parse_layers(expr, layers):
+        result = []
+        for name in (expr or [''])[1:]:
+            if name in ('*.Cu', 'F&B.Cu'):
+                result.extend([F_Cu, B_Cu] if name == 'F&B.Cu'
+                              else COPPER_LAYER_IDS)
+            elif name.startswith('*.'):
+                suffix = name[1:]
+                result.extend(layer_id for layer_name, layer_id
+                              in layers.items()
+                              if layer_name.endswith(suffix))
+            elif name in layers:
+                result.append(layers[name])
+        return result
+
+    def GetPadName(self):
+        return self.name
+
+    def GetName(self):
+        return self.name
+
+    def GetShape(self):
+        return self.shape
+
+    def GetAttribute(self):
+        return self.attribute
+
+    def GetLayerSet(self):
+        return self.layers
+
+    def GetPosition(self):
+        return self.pos
+
+    def GetSize(self):
+        return self.size
+
+    def GetOrientation(self):
+        return self.orientation
+
+    def GetDrillShape(self):
+        return self.drill_shape
+
+    def GetDrillSize(self):
+        return self.drill_size
+
+    def GetOffset(self):
+        return self.offset
+
+    def GetRoundRectCornerRadius(self):
+        return int(self.rratio * min(self.size.x, self.size.y))
+
+    def GetCustomShapeAsPolygon(self):
+        """
+        Outlines of anchor and primitives in pad coordinates. Unlike pcbnew
+        they are not merged, they are oriented the same way instead so
+        nonzero filling draws their union.
+        """
+        w, h = self.size.x / 2.0, self.size.y / 2.0
+        if self.anchor_shape == PAD_SHAPE_RECT:
+            outlines = [[Point(-w, -h), Point(w, -h), Point(w, h),
+                         Point(-w, h)]]
+        else:
+            outlines = [circle_points(0, 0, w)]
+        for p in self.primitives:
+            if not isinstance(p, list) or not p:
+                continue
+            width = to_iu(child_value(p, 'width', '0'))
+            if p[0] == 'gr_poly':
+                outlines.append(parse_pts(p))
+            elif p[0] == 'gr_line':
+                outlines.append(segment_polygon(
+                        parse_xy(child(p, 'start')),
+                        parse_xy(child(p, 'end')), width))
+            elif p[0] == 'gr_circle':
+                center = parse_xy(child(p, 'center'))
+                end = parse_xy(child(p, 'end'))
+                r = math.hypot(end.x - center.x, end.y - center.y)
+                outlines.append(circle_points(center.x, center.y,
+                                              r + width / 2.0))
+            elif p[0] == 'gr_arc':
+                center = parse_xy(child(p, 'start'))
+                start = parse_xy(child(p, 'end'))
+                outlines.append(arc_points(
+                        center.x, center.y, start.x, start.y,
+                        -to_decidegrees(child_value(p, 'angle', '0'))))
+        return PolySet([ensure_ccw(o) for o in outlines if len(o) > 2])
+
+    def GetBoundingBox(self):
+        w, h = self.size.x // 2, self.size.y // 2
+        corners = [rotate_point(x, y, self.orientation)
+                   for x, y in ((-w, -h), (w, -h), (w, h), (-w, h))]
+        return Rect.from_points([(self.pos.x + x, self.pos.y + y)
+                                 for x, y in corners])
+
+
+class Module:
+    """MODULE subset."""
+
+    def __init__(self, expr, layers):
+        self.fpid = Fpid(expr[1])
+        self.layer = layers.get(child_value(expr, 'layer'), F_Cu)
+        at = child(expr, 'at')
+        self.pos = parse_xy(at)
+        self.orientation = to_decidegrees(at[3]) if len(at) > 3 else 0
+        self.attributes = MODULE_ATTRIBUTES.get(child_value(expr, 'attr'),
+                                                MOD_DEFAULT)
+        self.reference = None
+        self.value = None
+        self.drawings = []
+        for e in expr[2:]:
+            if not isinstance(e, list) or not e:
+                continue
+            if e[0] == 'fp_text':
+                text = Text(e, e[2], layers, self)
+                if e[1] == 'reference':
+                    self.reference = text
+                elif e[1] == 'value':
+                    self.value = text
+                else:
+                    self.drawings.append(text)
+            elif e[0].startswith('fp_'):
+                drawing = DrawSegment.from_expr(e, layers, self)
+                if drawing is not None:
+                    self.drawings.append(drawing)
+        self.pads = [Pad(e, layers, self) for e in children(expr, 'pad')]
+
+    def place(self, point):
+        """Module relative point to board coordinates."""
+        x, y = rotate_point(point[0], point[1], self.orientation)
+        return Point(self.pos.x + x, self.pos.y + y)
+
+    def Reference(self):
+        return self.reference
+
+    def Value(self):
+        return self.value
+
+    def GetReference(self):
+        return self.reference.GetText() if self.reference else ''
+
+    def GetValue(self):
+        return self.value.GetText() if self.value else ''
+
+    def GetFPID(self):
+        return self.fpid
+
+    def GetLayer(self):
+        return self.layer
+
+    def GetPosition(self):
+        return self.pos
+
+    def GetCenter(self):
+        return self.pos
+
+    def GetOrientation(self):
+        return self.orientation
+
+    def GetAttributes(self):
+        return self.attributes
+
+    def GraphicalItems(self):
+        return self.drawings
+
+    def Pads(self):
+        return self.pads
+
+    def GetFootprintRect(self):
+        area = Rect(self.pos.x, self.pos.y)
+        area.Inflate(250000)
+        for d in self.drawings:
+            if isinstance(d, DrawSegment):
+                area.Merge(d.GetBoundingBox())
+        for p in self.pads:
+            area.Merge(p.GetBoundingBox())
+        return area
+
+
+class Board:
+    """BOARD subset."""
+
+    def __init__(self, expr, file_name=''):
+        self.file_name = file_name
+        self.layers = dict((name, layer_id)
+                           for layer_id, name in enumerate(LAYER_NAMES))
+        layers_expr = child(expr, 'layers')
+        if layers_expr is not None:
+            for layer in layers_expr[1:]:
+                if isinstance(layer, list) and len(layer) > 1:
+                    self.layers[layer[1]] = int(layer[0])
+        self.title_block = TitleBlock(child(expr, 'title_block'))
+        self.drawings = []
+        self.modules = []
+        for e in expr[1:]:
+            if not isinstance(e, list) or not e:
+                continue
+            if e[0] == 'module' or e[0] == 'footprint':
+                self.modules.append(Module(e, self.layers))
+            elif e[0] == 'gr_text':
+                self.drawings.append(Text(e, e[1], self.layers))
+            elif e[0].startswith('gr_'):
+                drawing = DrawSegment.from_expr(e, self.layers)
+                if drawing is not None:
+                    self.drawings.append(drawing)
+
+    def GetFileName(self):
+        return self.file_name
+
+    def GetTitleBlock(self):
+        return self.title_block
+
+    def GetDrawings(self):
+        return self.drawings
+
+    def GetModules(self):
+        return self.modules
+
+
+def LoadBoard(file_name):
+    # type: (str) -> Board
+    with io.open(file_name, 'r', encoding='utf-8') as f:
+        expr = parse_tokens(iter_tokens(f.read()))
+    return Board(expr, file_name)
+
+
+class ActionPlugin(object):
+    """Stand-in so plugin class can be defined without KiCad."""
+
+    def register(self):
+        pass
@@ -0,0 +1,134 @@
+"""
+Persistent cache of built module dicts.
+
+Entries are keyed by a hash of the extracted RawModule, which holds
+every pad and copper drawing attribute that module dicts are built from.
+Modules are always extracted from pcbnew, so texts still reach the font
+parser, only building is skipped for unchanged modules.
+
+Cache files live in the per-user cache directory, one file per pcb. They
+are replaced atomically so concurrent runs never read a partial file.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+from .cache_files import replace_file, user_cache_dir
+
+# Bump when module_data output or module keys change so stale entries are
+# dropped
+CACHE_VERSION = 3
+# Protocol 2 can be read by both python 2 and 3
+PICKLE_PROTOCOL = 2
+
+
+def cache_file_path(pcb_file_name):
+    # type: (str) -> str
+    """
+    :param pcb_file_name: pcb file path
+    :return: path of the cache file for this pcb in the user cache dir
+    """
+    path = os.path.abspath(pcb_file_name)
+    if not isinstance(path, bytes):
+        path = path.encode('utf-8')
+    digest = hashlib.sha1(path).hexdigest()[:16]
+    return os.path.join(user_cache_dir(), 'modules-%s.pickle' % digest)
+
+
+def make_key(raw_module):
+    # type: (RawModule) -> str
+    data = json.dumps(raw_module, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class ModuleCache:
+    """
+    Cache file holds entries ordered from least to most recently used,
+    when there are more than max_entries the oldest ones are evicted.
+    """
+
+    def __init__(self, path, max_entries, invalidate=False):
+        """
+        :param path: cache file path
+        :param max_entries: maximum number of modules kept in the cache
+        :param invalidate: ignore existing cache content
+        """
+        self.path = path
+        self.max_entries = max_entries
+        # key -> (build time in seconds, module dict)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        self.load_error = None
+        if not invalidate:
+            self.load()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data['entries']
+        except Exception as e:
+            self.load_error = e
+            self.entries = OrderedDict()
+
+    def save(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir and not os.path.isdir(cache_dir):
+            try:
+                os.makedirs(cache_dir, 0o700)
+            except OSError:
+                # created by a concurrent run
+                if not os.path.isdir(cache_dir):
+                    raise
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': CACHE_VERSION, 'entries': self.entries},
+                        f, PICKLE_PROTOCOL)
+        replace_file(tmp_path, self.path)
+
+    def build_modules(self, keys, build):
+        """
+        :param keys: list of module keys as returned by make_key()
+        :param build: function taking list of indexes into keys of cache
+            misses and returning list of their module dicts, called once
+        :return: list of module dicts in keys order
+        """
+        modules = [None] * len(keys)
+        missed = []
+        for i, key in enumerate(keys):
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                missed.append(i)
+                continue
+            # re-insert to mark as most recently used
+            self.entries[key] = entry
+            # identical modules share an entry, callers may modify the dict
+            modules[i] = copy.deepcopy(entry[1])
+            self.hits += 1
+            self.time_saved += entry[0]
+
+        if missed:
+            start = time.time()
+            built = build(missed)
+            build_time = (time.time() - start) / len(missed)
+            for i, module in zip(missed, built):
+                modules[i] = module
+                self.entries[keys[i]] = (build_time, module)
+            self.misses += len(missed)
+        return modules
+
+    def summary(self):
+        return 'Module cache: %d hits, %d misses, saved %.2f s' % (
+            self.hits, self.misses, self.time_saved)
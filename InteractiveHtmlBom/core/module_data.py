@@ -0,0 +1,106 @@
+"""
+Second stage of module parsing.
+
+ibom.extract_module() reads everything needed from pcbnew objects into
+plain picklable tuples defined here. Functions in this module turn those
+tuples into pcbdata dicts without touching pcbnew, so they can run in
+worker processes or on cached data.
+"""
+
+from collections import namedtuple
+
+RawModule = namedtuple('RawModule', [
+    'ref',  # str
+    'center',  # (x, y)
+    'bbox_pos',  # (x, y)
+    'bbox_size',  # (w, h)
+    'layer',  # 'F', 'B' or None
+    'drawings',  # list of {"layer": .., "drawing": ..} dicts
+    'pads',  # list of RawPad
+])
+
+RawPad = namedtuple('RawPad', [
+    'name',  # str
+    'layers',  # list of 'F' and/or 'B'
+    'pos',  # (x, y)
+    'size',  # (w, h)
+    'orientation',  # tenths of degree
+    'shape',  # pcbdata shape name
+    'polygons',  # list of lists of (x, y) for custom pads, else None
+    'radius',  # roundrect corner radius, else None
+    'is_th',  # bool
+    'drill_shape',  # pcbdata drill shape name
+    'drill_size',  # (w, h)
+    'offset',  # (x, y) or None
+])
+
+PIN1_NAMES = ['1', 'A', 'A1', 'P1', 'PAD1']
+
+# Raw coordinates are in nanometers
+SCALE = 1e-6
+
+
+def normalize(point):
+    return [point[0] * SCALE, point[1] * SCALE]
+
+
+def normalize_polygons(polygons):
+    return [[normalize(point) for point in outline] for outline in polygons]
+
+
+def build_pad(raw):
+    # type: (RawPad) -> dict
+    pad_dict = {
+        "layers": raw.layers,
+        "pos": normalize(raw.pos),
+        "size": normalize(raw.size),
+        "angle": raw.orientation * -0.1,
+        "shape": raw.shape
+    }
+    if raw.name in PIN1_NAMES:
+        pad_dict['pin1'] = 1
+    if raw.shape == "custom":
+        pad_dict["polygons"] = normalize_polygons(raw.polygons)
+    if raw.shape == "roundrect":
+        pad_dict["radius"] = raw.radius * SCALE
+    if raw.is_th:
+        pad_dict["type"] = "th"
+        pad_dict["drillshape"] = raw.drill_shape
+        pad_dict["drillsize"] = normalize(raw.drill_size)
+    else:
+        pad_dict["type"] = "smd"
+    if raw.offset is not None:
+        pad_dict["offset"] = normalize(raw.offset)
+
+    return pad_dict
+
+
+def build_module(raw):
+    # type: (RawModule) -> dict
+    pads = [(p.name, build_pad(p)) for p in raw.pads]
+
+    # If no pads have common 'first' pad name then pick lexicographically.
+    pin1_pads = [p for p in pads if 'pin1' in p[1]]
+    if pads and not pin1_pads:
+        pads = sorted(pads, key=lambda el: el[0])
+        for pad_name, pad_dict in pads:
+            if pad_name:
+                pad_dict['pin1'] = 1
+                break
+
+    return {
+        "ref": raw.ref,
+        "center": normalize(raw.center),
+        "bbox": {
+            "pos": normalize(raw.bbox_pos),
+            "size": normalize(raw.bbox_size)
+        },
+        "pads": [p[1] for p in pads],
+        "drawings": raw.drawings,
+        "layer": raw.layer
+    }
+
+
+def build_modules(raw_modules):
+    # type: (list) -> list
+    return [build_module(raw) for raw in raw_modules]
@@ -0,0 +1,112 @@
+"""Streaming writer for the html template"""
+
+import io
+import json
+import re
+
+MARKER_REGEX = re.compile(r'///([A-Z_]+)///')
+CHUNK_SIZE = 64 * 1024
+STRING_TYPES = (str, type(u''))
+
+
+def to_text(s):
+    """
+    Python 2 json.dumps() and str literals are byte strings, text files
+    opened with io.open() only accept unicode.
+    """
+    if isinstance(s, bytes):
+        return s.decode('utf-8')
+    return s
+
+
+class RawJson:
+    """Already json encoded value, written by iterencode() as is."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class Template:
+    """
+    Html template split once at its ///MARKER/// placeholders.
+    Rendering writes literal parts and substitutions straight to the output
+    file so the whole document is never held in memory.
+    """
+
+    def __init__(self, text):
+        parts = MARKER_REGEX.split(text)
+        self.literals = parts[0::2]
+        self.markers = parts[1::2]
+
+    @classmethod
+    def from_file(cls, path):
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def write(self, out, substitutions):
+        """
+        :param out: text file object
+        :param substitutions: dict of marker name -> iterable of strings.
+            Markers without substitution are left as is.
+        """
+        for literal, marker in zip(self.literals, self.markers):
+            out.write(to_text(literal))
+            chunks = substitutions.get(marker, [u'///%s///' % marker])
+            for chunk in chunks:
+                out.write(to_text(chunk))
+        out.write(to_text(self.literals[-1]))
+
+
+def file_chunks(path):
+    """Yields content of utf-8 text file in CHUNK_SIZE pieces."""
+    with io.open(path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iterencode(obj, depth=3):
+    """
+    Yields same text as json.dumps(obj) in unicode pieces.
+    Dicts and lists down to given depth are streamed item by item, anything
+    deeper is encoded in one json.dumps call which is much faster than
+    json.JSONEncoder.iterencode in pure python mode.
+    """
+    if isinstance(obj, RawJson):
+        yield to_text(obj.text)
+    elif depth > 0 and isinstance(obj, dict) and obj and \
+            all(isinstance(k, STRING_TYPES) for k in obj):
+        separator = u'{'
+        for k, v in obj.items():
+            yield separator + to_text(json.dumps(k)) + u': '
+            for chunk in iterencode(v, depth - 1):
+                yield chunk
+            separator = u', '
+        yield u'}'
+    elif depth > 0 and isinstance(obj, (list, tuple)) and obj:
+        separator = u'['
+        for v in obj:
+            yield separator
+            for chunk in iterencode(v, depth - 1):
+                yield chunk
+            separator = u', '
+        yield u']'
+    else:
+        yield to_text(json.dumps(obj))
+
+
+def buffered(chunks, size=CHUNK_SIZE):
+    """Joins small chunks into pieces of at least given size."""
+    buf = []
+    buf_len = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buf_len += len(chunk)
+        if buf_len >= size:
+            yield u''.join(buf)
+            buf = []
+            buf_len = 0
+    if buf:
+        yield u''.join(buf)
@@ -0,0 +1,148 @@
+"""
+Optional pre-tessellation of texts into polylines.
+
+By default pcbdata texts only carry their attributes and render.js lays
+out glyphs from font_data on every redraw. In tessellated mode each text
+drawing is replaced with
+
+    {"type": "polylines", "thickness": t, "lines": [[x0, y0, x1, y1, ..]]}
+
+in board coordinates, laid out exactly like render.js:drawtext() does it.
+The renderer then only strokes the lines.
+
+Glyph layout of a string depends only on the string, size, justification
+and italic attribute, it is computed once for all texts sharing them.
+Texts that are identical including position and angle are emitted once
+per drawing list.
+"""
+
+import math
+
+from .fontparser import FontParser
+
+# Decimal places of emitted coordinates, 1 um. Finer precision only makes
+# the page larger, stroke widths of texts are 100 um and more.
+PRECISION = 3
+ITALIC_TILT = 0.125
+
+
+class TextTessellator:
+    # Parsed glyphs shared by all instances
+    glyphs = {}
+
+    def __init__(self, font_parser=None):
+        self.font_parser = font_parser or FontParser()
+        # layout key -> list of polylines in text coordinates
+        self.layouts = {}
+
+    def glyph(self, c):
+        if c not in self.glyphs:
+            self.glyphs[c] = self.font_parser.parse_font_char(c)
+        return self.glyphs[c]
+
+    def layout(self, text):
+        # type: (dict) -> list
+        """
+        Polylines of text before rotation and mirroring, same math as in
+        render.js:drawtext().
+        """
+        tilt = ITALIC_TILT if "italic" in text["attr"] else 0
+        key = (text["text"], text["width"], text["height"],
+               text["thickness"], text["horiz_justify"], tilt)
+        if key in self.layouts:
+            return self.layouts[key]
+        width = text["width"]
+        height = text["height"]
+        interline = (height * 1.5 + text["thickness"]) / 2
+        txt = text["text"].split("\n")
+        # KiCad ignores last empty line.
+        if txt[-1] == '':
+            txt.pop()
+        polylines = []
+        for i, line_text in enumerate(txt):
+            # Same as missing font_data in the renderer, nothing is drawn
+            line_text = [c for c in line_text if ord(c) >= ord(' ')]
+            offsety = (-(len(txt) - 1) + i * 2) * interline + height * 0.5
+            line_width = sum(self.glyph(c)['w'] * width for c in line_text)
+            offsetx = 0
+            if text["horiz_justify"] == 0:
+                offsetx -= line_width / 2
+            elif text["horiz_justify"] == 1:
+                offsetx -= line_width
+            for c in line_text:
+                glyph = self.glyph(c)
+                for glyph_line in glyph['l']:
+                    polyline = []
+                    for x, y in glyph_line:
+                        px = x * width + offsetx
+                        py = y * height + offsety
+                        px -= (py + height * 0.5) * tilt
+                        polyline.append((px, py))
+                    if polyline:
+                        polylines.append(polyline)
+                offsetx += glyph['w'] * width
+        self.layouts[key] = polylines
+        return polylines
+
+    def tessellate(self, text):
+        # type: (dict) -> dict
+        """:return: polylines drawing in board coordinates"""
+        angle = -text["angle"]
+        mirror = "mirrored" in text["attr"]
+        if mirror:
+            angle = -angle
+        sin = math.sin(math.radians(angle))
+        cos = math.cos(math.radians(angle))
+        sx = -1 if mirror else 1
+        px, py = text["pos"]
+        lines = []
+        for polyline in self.layout(text):
+            flat = []
+            for x, y in polyline:
+                flat.append(round(px + sx * (x * cos - y * sin), PRECISION))
+                flat.append(round(py + x * sin + y * cos, PRECISION))
+            lines.append(flat)
+        return {
+            "type": "polylines",
+            "thickness": text["thickness"],
+            "lines": lines,
+        }
+
+    @staticmethod
+    def is_text(drawing):
+        return "type" not in drawing
+
+    @staticmethod
+    def text_key(text):
+        return (text["text"], tuple(text["pos"]), text["angle"],
+                text["width"], text["height"], text["thickness"],
+                text["horiz_justify"], tuple(text["attr"]))
+
+    def tessellate_drawings(self, drawings):
+        # type: (list) -> list
+        """Replaces texts in drawings list, drops duplicate texts."""
+        result = []
+        seen = set()
+        for d in drawings:
+            if self.is_text(d):
+                key = self.text_key(d)
+                if key in seen:
+                    continue
+                seen.add(key)
+                d = self.tessellate(d)
+            result.append(d)
+        return result
+
+    def tessellate_pcbdata(self, pcbdata):
+        # type: (dict) -> None
+        """Tessellates all texts of pcbdata in place."""
+        for layer_group in ["silkscreen", "fabrication"]:
+            for layer, drawings in pcbdata[layer_group].items():
+                pcbdata[layer_group][layer] = \
+                    self.tessellate_drawings(drawings)
+        for m in pcbdata["modules"]:
+            for d in m["drawings"]:
+                if self.is_text(d["drawing"]):
+                    d["drawing"] = self.tessellate(d["drawing"])
+        # Renderer does not need glyphs any more
+        pcbdata["font_data"] = {}
@@ -12,6 +12,7 @@ in different formats e.g.
 """
 
 import re
+from collections import OrderedDict
 
 PREFIX_MICRO = [u"μ", "u", "micro"]
 PREFIX_MILLI = ["milli", "m"]
@@ -32,6 +33,26 @@ UNIT_L = ["henry", "h"]
 
 UNIT_ALL = UNIT_R + UNIT_C + UNIT_L
 
+# Lookup tables built once from the lists above
+PREFIX_VALUES = {}
+for _prefixes, _value in ((PREFIX_PICO, 1.0e-12),
+                          (PREFIX_NANO, 1.0e-9),
+                          (PREFIX_MICRO, 1.0e-6),
+                          (PREFIX_MILLI, 1.0e-3),
+                          (PREFIX_KILO, 1.0e3),
+                          (PREFIX_MEGA, 1.0e6),
+                          (PREFIX_GIGA, 1.0e9)):
+    for _prefix in _prefixes:
+        PREFIX_VALUES[_prefix] = _value
+
+UNIT_VALUES = {}
+for _units, _unit in ((UNIT_R, "R"), (UNIT_C, "F"), (UNIT_L, "H")):
+    for _u in _units:
+        UNIT_VALUES[_u] = _unit
+
+# Maximum number of distinct value strings kept in compMatch cache
+CACHE_SIZE = 4096
+
 """
 Return a simplified version of a units string, for comparison purposes
 """
@@ -41,16 +62,7 @@ def getUnit(unit):
     if not unit:
         return None
 
-    unit = unit.lower()
-
-    if unit in UNIT_R:
-        return "R"
-    if unit in UNIT_C:
-        return "F"
-    if unit in UNIT_L:
-        return "H"
-
-    return None
+    return UNIT_VALUES.get(unit.lower())
 
 
 """
@@ -62,24 +74,7 @@ def getPrefix(prefix):
     if not prefix:
         return 1
 
-    prefix = prefix.lower()
-
-    if prefix in PREFIX_PICO:
-        return 1.0e-12
-    if prefix in PREFIX_NANO:
-        return 1.0e-9
-    if prefix in PREFIX_MICRO:
-        return 1.0e-6
-    if prefix in PREFIX_MILLI:
-        return 1.0e-3
-    if prefix in PREFIX_KILO:
-        return 1.0e3
-    if prefix in PREFIX_MEGA:
-        return 1.0e6
-    if prefix in PREFIX_GIGA:
-        return 1.0e9
-
-    return 1
+    return PREFIX_VALUES.get(prefix.lower(), 1)
 
 
 def groupString(group):  # return a reg-ex string for a list of values
@@ -91,6 +86,48 @@ def matchString():
             UNIT_ALL) + ")*(\d*)$"
 
 
+MATCH_PATTERN = re.compile(matchString())
+
+
+class LRUCache:
+    """Dict-like cache that drops least recently used keys over max_size."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            return default
+        value = self.data.pop(key)
+        self.data[key] = value
+        return value
+
+    def put(self, key, value):
+        if key in self.data:
+            self.data.pop(key)
+        elif len(self.data) >= self.max_size:
+            self.data.popitem(last=False)
+        self.data[key] = value
+
+    def clear(self):
+        self.data.clear()
+
+
+_match_cache = LRUCache(CACHE_SIZE)
+_MISSING = object()
+
+
+def clearCache():
+    _match_cache.clear()
+
+
 """
 Return a normalized value and units for a given component value string
 e.g. compMatch("10R2") returns (10, R)
@@ -99,10 +136,22 @@ e.g. compMatch("3.3mOhm") returns (0.0033, R)
 
 
 def compMatch(component):
+    result = _match_cache.get(component, _MISSING)
+    if result is _MISSING:
+        result = parseComponent(component)
+        _match_cache.put(component, result)
+    return result
+
+
+"""
+Uncached version of compMatch
+"""
+
+
+def parseComponent(component):
     # remove any commas
     component = component.strip().replace(",", "").lower()
-    match = matchString()
-    result = re.search(match, component)
+    result = MATCH_PATTERN.search(component)
 
     if not result:
         return None
@@ -149,6 +198,21 @@ def componentValue(valString):
     return val
 
 
+"""
+Batch version of componentValue for all values of a board at once
+e.g. componentValues(["100n", "10k", "100n"]) returns
+["0.000000100000000", "10000.000000000000000", "0.000000100000000"]
+"""
+
+
+def componentValues(valStrings):
+    normalized = {}
+    for valString in valStrings:
+        if valString not in normalized:
+            normalized[valString] = componentValue(valString)
+    return [normalized[valString] for valString in valStrings]
+
+
 # compare two values
 
 
@@ -118,6 +118,22 @@ class HtmlSettingsPanelBase ( wx.Panel ):
         self.continuousRedrawCheckbox.SetValue(True) 
         b_sizer.Add( self.continuousRedrawCheckbox, 0, wx.ALL, 5 )
         
+        zoomCacheSizer = wx.BoxSizer( wx.HORIZONTAL )
+        
+        self.m_zoomCacheBudgetLabel = wx.StaticText( self, wx.ID_ANY, u"缩放缓存 (百万像素)", wx.DefaultPosition, wx.DefaultSize, 0 )
+        self.m_zoomCacheBudgetLabel.Wrap( -1 )
+        
+        zoomCacheSizer.Add( self.m_zoomCacheBudgetLabel, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 5 )
+        
+        
+        zoomCacheSizer.Add( ( 0, 0), 1, wx.EXPAND, 5 )
+        
+        self.zoomCacheBudgetSpin = wx.SpinCtrl( self, wx.ID_ANY, wx.EmptyString, wx.DefaultPosition, wx.DefaultSize, wx.SP_ARROW_KEYS, 0, 1024, 32 )
+        zoomCacheSizer.Add( self.zoomCacheBudgetSpin, 0, wx.ALL, 5 )
+        
+        
+        b_sizer.Add( zoomCacheSizer, 0, wx.EXPAND, 5 )
+        
         bSizer18 = wx.BoxSizer( wx.VERTICAL )
         
         bSizer19 = wx.BoxSizer( wx.HORIZONTAL )
@@ -312,6 +328,54 @@ class GeneralSettingsPanelBase ( wx.Panel ):
         
         bSizer32.Add( blacklistSizer, 1, wx.ALL|wx.EXPAND|wx.TOP, 5 )
         
+        outputSizer = wx.StaticBoxSizer( wx.StaticBox( self, wx.ID_ANY, u"输出" ), wx.VERTICAL )
+        
+        outputGridSizer = wx.FlexGridSizer( 0, 2, 0, 0 )
+        outputGridSizer.AddGrowableCol( 1 )
+        outputGridSizer.SetFlexibleDirection( wx.BOTH )
+        outputGridSizer.SetNonFlexibleGrowMode( wx.FLEX_GROWMODE_SPECIFIED )
+        
+        self.m_pcbdataFormatLabel = wx.StaticText( outputSizer.GetStaticBox(), wx.ID_ANY, u"pcb 数据格式", wx.DefaultPosition, wx.DefaultSize, 0 )
+        self.m_pcbdataFormatLabel.Wrap( -1 )
+        
+        outputGridSizer.Add( self.m_pcbdataFormatLabel, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 5 )
+        
+        pcbdataFormatChoiceChoices = [ u"完整", u"紧凑", u"紧凑并打包" ]
+        self.pcbdataFormatChoice = wx.Choice( outputSizer.GetStaticBox(), wx.ID_ANY, wx.DefaultPosition, wx.DefaultSize, pcbdataFormatChoiceChoices, 0 )
+        self.pcbdataFormatChoice.SetSelection( 0 )
+        outputGridSizer.Add( self.pcbdataFormatChoice, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL|wx.EXPAND, 5 )
+        
+        self.m_compressionLabel = wx.StaticText( outputSizer.GetStaticBox(), wx.ID_ANY, u"压缩", wx.DefaultPosition, wx.DefaultSize, 0 )
+        self.m_compressionLabel.Wrap( -1 )
+        
+        outputGridSizer.Add( self.m_compressionLabel, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 5 )
+        
+        compressionChoiceChoices = [ u"不压缩", u"压缩 pcb 数据", u"压缩 pcb 数据和脚本" ]
+        self.compressionChoice = wx.Choice( outputSizer.GetStaticBox(), wx.ID_ANY, wx.DefaultPosition, wx.DefaultSize, compressionChoiceChoices, 0 )
+        self.compressionChoice.SetSelection( 0 )
+        outputGridSizer.Add( self.compressionChoice, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL|wx.EXPAND, 5 )
+        
+        self.m_moduleCacheSizeLabel = wx.StaticText( outputSizer.GetStaticBox(), wx.ID_ANY, u"模块缓存大小", wx.DefaultPosition, wx.DefaultSize, 0 )
+        self.m_moduleCacheSizeLabel.Wrap( -1 )
+        
+        outputGridSizer.Add( self.m_moduleCacheSizeLabel, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 5 )
+        
+        self.moduleCacheSizeSpin = wx.SpinCtrl( outputSizer.GetStaticBox(), wx.ID_ANY, wx.EmptyString, wx.DefaultPosition, wx.DefaultSize, wx.SP_ARROW_KEYS, 0, 1000000, 0 )
+        
+        outputGridSizer.Add( self.moduleCacheSizeSpin, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL|wx.EXPAND, 5 )
+        
+        
+        outputSizer.Add( outputGridSizer, 0, wx.EXPAND, 5 )
+        
+        self.tessellateTextCheckbox = wx.CheckBox( outputSizer.GetStaticBox(), wx.ID_ANY, u"将文字转换为折线", wx.DefaultPosition, wx.DefaultSize, 0 )
+        outputSizer.Add( self.tessellateTextCheckbox, 0, wx.ALL, 5 )
+        
+        self.invalidateModuleCacheCheckbox = wx.CheckBox( outputSizer.GetStaticBox(), wx.ID_ANY, u"丢弃模块缓存", wx.DefaultPosition, wx.DefaultSize, 0 )
+        outputSizer.Add( self.invalidateModuleCacheCheckbox, 0, wx.ALL, 5 )
+        
+        
+        bSizer32.Add( outputSizer, 0, wx.ALL|wx.EXPAND, 5 )
+        
         
         self.SetSizer( bSizer32 )
         self.Layout()
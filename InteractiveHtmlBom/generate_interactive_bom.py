@@ -1,14 +1,32 @@
 # -*- coding: utf-8 -*-
 
-from __future__ import absolute_import
+from __future__ import absolute_import, print_function
 
+import glob
+import io
+import multiprocessing
 import os
 import sys
+import time
 
-import pcbnew
-import wx
+# Names this script is run under, directly or by spawned multiprocessing
+# workers that import it to unpickle batch tasks
+SCRIPT_NAMES = ('__main__', '__mp_main__', '__parents_main__')
 
-if __name__ == "__main__":
+if __name__ in SCRIPT_NAMES and '--headless' in sys.argv:
+    # Use the bundled board reader even if KiCad is installed
+    sys.modules['pcbnew'] = None
+
+try:
+    import pcbnew
+except ImportError:
+    pcbnew = None
+try:
+    import wx
+except ImportError:
+    wx = None
+
+if __name__ in SCRIPT_NAMES:
     # Circumvent the "scripts can't do relative imports because they are not
     # packages" restriction by asserting dominance and making it a package!
     dirname = os.path.dirname(os.path.abspath(__file__))
@@ -16,7 +34,14 @@ if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(dirname))
     __import__(__package__)
 
-from . import dialog
+if pcbnew is None:
+    from .core import kicad_pcb
+    pcbnew = kicad_pcb.install()
+
+if wx is not None:
+    from . import dialog
+else:
+    dialog = None
 from .core import ibom
 from .core.config import Config
 from .schematic_data import find_latest_schematic_data
@@ -83,8 +108,156 @@ def to_utf(s):
         return s
 
 
+def expand_board_args(items):
+    # type: (list) -> list
+    """
+    Expands board arguments into list of board files.
+    Items can be file names, glob patterns or @manifest files listing one
+    board file or pattern per line relative to the manifest directory.
+    Empty lines and lines starting with # in manifests are skipped.
+    """
+    boards = []
+    for item in items:
+        if item.startswith('@'):
+            manifest = item[1:]
+            manifest_dir = os.path.dirname(os.path.abspath(manifest))
+            with io.open(manifest, 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+            boards.extend(expand_board_args(
+                    [os.path.join(manifest_dir, line) for line in lines
+                     if line and not line.startswith('#')]))
+        elif any(c in item for c in '*?['):
+            boards.extend(sorted(glob.glob(item)))
+        else:
+            boards.append(item)
+    return boards
+
+
+def generate_board(board_file, args):
+    # type: (str, argparse.Namespace) -> dict
+    """
+    Generates bom for one board of a batch.
+    :return: summary dict with board, status, time and size keys
+    """
+    start = time.time()
+    summary = {'board': board_file, 'status': 'ok', 'size': 0}
+    try:
+        if not os.path.isfile(board_file):
+            summary['status'] = 'missing'
+        else:
+            print("Loading %s" % board_file)
+            board = pcbnew.LoadBoard(os.path.abspath(board_file))
+            config = Config()
+            config.set_from_args(args)
+            bom_file = ibom.main(board, config, parse_schematic_data,
+                                 cli=True)
+            if bom_file is None:
+                summary['status'] = 'failed'
+            else:
+                summary['size'] = os.path.getsize(bom_file)
+    except Exception as e:
+        summary['status'] = 'error: %s' % e
+    summary['time'] = time.time() - start
+    return summary
+
+
+def batch_output_path(board_file, args):
+    # type: (str, argparse.Namespace) -> str
+    """
+    Bom file path of a batch board as far as it is known before the board
+    is loaded, substitutions other than %f are left as is.
+    """
+    board_dir = os.path.dirname(os.path.abspath(board_file))
+    bom_dir = os.path.join(board_dir, args.dest_dir)
+    name = args.name_format.replace(
+            '%f', os.path.splitext(os.path.basename(board_file))[0])
+    return os.path.normcase(os.path.normpath(os.path.join(bom_dir, name)))
+
+
+def find_output_collisions(boards, args):
+    # type: (list, argparse.Namespace) -> dict
+    """
+    :return: dict of board index to the earlier board it would overwrite
+        the bom file of
+    """
+    first_boards = {}
+    collisions = {}
+    for i, board_file in enumerate(boards):
+        path = batch_output_path(board_file, args)
+        if path in first_boards:
+            collisions[i] = first_boards[path]
+        else:
+            first_boards[path] = board_file
+    return collisions
+
+
+def generate_board_args(board_args):
+    # python 2 Pool has no starmap()
+    return generate_board(*board_args)
+
+
+def init_batch_worker():
+    global app
+    if wx is not None:
+        app = wx.App()
+    ibom.web_assets = ibom.WebAssets(cache=True)
+
+
+def generate_batch(boards, args):
+    # type: (list, argparse.Namespace) -> list
+    """
+    Generates boms for all boards reusing this interpreter, or a pool of
+    args.workers interpreters, for all of them. Boards that would write the
+    same bom file as an earlier board are not generated.
+    :return: list of summary dicts in boards order
+    """
+    ibom.web_assets = ibom.WebAssets(cache=True)
+    args.no_browser = True
+    collisions = find_output_collisions(boards, args)
+    summaries = [None] * len(boards)
+    for i, first_board in collisions.items():
+        summaries[i] = {
+            'board': boards[i],
+            'status': 'error: output collides with %s, add %%f to '
+                      'name format' % first_board,
+            'size': 0,
+            'time': 0.0,
+        }
+    pending = [i for i in range(len(boards)) if i not in collisions]
+    if args.workers <= 0 or len(pending) < 2:
+        for i in pending:
+            summaries[i] = generate_board(boards[i], args)
+        return summaries
+    # Pool workers are daemonic and can not start module building pools
+    args.parallel_threshold = 0
+    pool = multiprocessing.Pool(args.workers, init_batch_worker)
+    try:
+        results = pool.map(generate_board_args,
+                           [(boards[i], args) for i in pending])
+    finally:
+        pool.close()
+        pool.join()
+    for i, summary in zip(pending, results):
+        summaries[i] = summary
+    return summaries
+
+
+def print_batch_summary(summaries, total_time):
+    name_width = max([len(s['board']) for s in summaries] + [5])
+    row_format = '%-' + str(name_width) + 's %10s %12s  %s'
+    print(row_format % ('board', 'time, s', 'size, bytes', 'status'))
+    for s in summaries:
+        print(row_format % (s['board'], '%.2f' % s['time'], s['size'],
+                            s['status']))
+    failed = len([s for s in summaries if s['status'] != 'ok'])
+    print("%d boards, %d failed, %.2f s total" % (
+        len(summaries), failed, total_time))
+    return failed
+
+
 if __name__ == "__main__":
-    app = wx.App()
+    if wx is not None:
+        app = wx.App()
 
     import argparse
 
@@ -92,17 +265,47 @@ if __name__ == "__main__":
             description='KiCad InteractiveHtmlBom plugin CLI.',
             formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('file',
-                        type=lambda s: to_utf(s),
-                        help="KiCad PCB file")
+                        type=lambda s: to_utf(s), nargs='+',
+                        help="KiCad PCB file. Several files, glob patterns "
+                             "or @manifest files with one file per line "
+                             "generate boms for all boards in one run.")
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Number of processes generating boards in '
+                             'batch mode. 0 generates them one by one in '
+                             'this process.')
+    parser.add_argument('--headless', action='store_true',
+                        help='Read board files with the bundled parser '
+                             'instead of KiCad pcbnew module. Used '
+                             'automatically when pcbnew is not available.')
     config = Config()
-    config.add_options(
-            parser, dialog.GeneralSettingsPanel.FILE_NAME_FORMAT_HINT)
+    if dialog is not None:
+        file_name_format_hint = \
+            dialog.GeneralSettingsPanel.FILE_NAME_FORMAT_HINT
+    else:
+        file_name_format_hint = (
+            'Output file name format supports substitutions %f (pcb file '
+            'name), %p (title), %c (company), %r (revision), %d (pcb date), '
+            '%D (bom date) and %T (bom time).')
+    config.add_options(parser, file_name_format_hint)
     args = parser.parse_args()
-    if not os.path.isfile(args.file):
-        print("File %s does not exist." % args.file)
+    if args.show_dialog and dialog is None:
+        print("Settings dialog requires wxPython.")
+        exit(1)
+    board_files = expand_board_args(args.file)
+    if len(board_files) != 1 or board_files[0] != args.file[0]:
+        if args.show_dialog:
+            print("Settings dialog is not supported in batch mode.")
+            exit(1)
+        batch_start = time.time()
+        summaries = generate_batch(board_files, args)
+        failed = print_batch_summary(summaries, time.time() - batch_start)
+        exit(1 if failed or not summaries else 0)
+    board_file = board_files[0]
+    if not os.path.isfile(board_file):
+        print("File %s does not exist." % board_file)
         exit(1)
-    print("Loading %s" % args.file)
-    board = pcbnew.LoadBoard(os.path.abspath(args.file))
+    print("Loading %s" % board_file)
+    board = pcbnew.LoadBoard(os.path.abspath(board_file))
     if args.show_dialog:
         InteractiveHtmlBomPlugin.run_with_dialog(board, config, cli=True)
     else:
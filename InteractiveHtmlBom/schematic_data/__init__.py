@@ -1,5 +1,7 @@
 import os
+import stat
 
+from . import cache
 from .xmlparser import XmlParser
 from .netlistparser import NetlistParser
 
@@ -9,36 +11,78 @@ PARSERS = {
 }
 
 
-def parse_schematic_data(file_name):
+def parse_schematic_data(file_name, use_cache=True):
+    """
+    :param file_name: path to netlist or xml file
+    :param use_cache: reuse result of previous parse of unchanged file
+    :return: extra field data as returned by ParserBase.get_extra_field_data
+    """
     if not os.path.isfile(file_name):
         return None
     extension = os.path.splitext(file_name)[1]
     if extension not in PARSERS:
         return None
-    else:
-        parser = PARSERS[extension](file_name)
-        return parser.get_extra_field_data()
+    parser_class = PARSERS[extension]
+    key = cache.cache_key(file_name, parser_class) if use_cache else None
+    if key is not None:
+        result = cache.load(file_name, key)
+        if result is not None:
+            return result
+    result = parser_class(file_name).get_extra_field_data()
+    if key is not None and result is not None:
+        cache.store(file_name, key, result)
+    return result
+
+
+def _file_mtime(path):
+    """:return: modification time of regular file or None"""
+    try:
+        st = os.stat(path)
+    except EnvironmentError:
+        return None
+    return st.st_mtime if stat.S_ISREG(st.st_mode) else None
+
+
+# pcb directory -> (directory mtime, names of parsable files in it)
+_parsable_files = {}
 
 
 def find_latest_schematic_data(pcb_file):
     """
+    File named after the pcb is found by checking its possible names only.
+    Otherwise the directory is listed, the list of parsable files is reused
+    while directory mtime does not change.
     :param pcb_file: path to the pcb file
     :return: last modified parsable file path or None if not found
     """
     dir = os.path.dirname(pcb_file)
-    _, _, files = next(os.walk(dir), (None, None, []))
-    # filter out files that we can not parse
-    files = [f for f in files if os.path.splitext(f)[1] in PARSERS.keys()]
-    # get their modification time and sort in descending order
-    files = [(os.path.getmtime(os.path.join(dir, f)), f) for f in files]
-    files = sorted(files, reverse=True)
+    # try to find last modified file that has name matching pcb file
+    base_name = os.path.splitext(os.path.basename(pcb_file))[0]
+    files = []
+    for extension in PARSERS:
+        mtime = _file_mtime(os.path.join(dir, base_name + extension))
+        if mtime is not None:
+            files.append((mtime, base_name + extension))
     if files:
-        # try to find first (last modified) file that has name matching pcb file
-        base_name = os.path.splitext(os.path.basename(pcb_file))[0]
-        for _, f in files:
-            if os.path.splitext(f)[0] == base_name:
-                return os.path.join(dir, f)
-        # if no such file is found just return last modified
-        return os.path.join(dir, files[0][1])
-    else:
+        return os.path.join(dir, max(files)[1])
+
+    # if no such file is found just return last modified
+    try:
+        dir_mtime = os.path.getmtime(dir)
+    except EnvironmentError:
         return None
+    cached = _parsable_files.get(dir)
+    if cached is not None and cached[0] == dir_mtime:
+        names = cached[1]
+    else:
+        _, _, names = next(os.walk(dir), (None, None, []))
+        # filter out files that we can not parse
+        names = [f for f in names if os.path.splitext(f)[1] in PARSERS]
+        _parsable_files[dir] = (dir_mtime, names)
+    for f in names:
+        mtime = _file_mtime(os.path.join(dir, f))
+        if mtime is not None:
+            files.append((mtime, f))
+    if files:
+        return os.path.join(dir, max(files)[1])
+    return None
@@ -0,0 +1,98 @@
+"""
+Persistent cache of parsed schematic extra field data.
+
+Each schematic data file gets its own cache file in the user cache
+directory, named after a hash of the file path. Cache file is a marshal
+dump of (key, result) where key is (path, mtime, size, parser name,
+parser version). A cache file with a different key is stale and is
+replaced after parsing. A file that can not be read back is removed.
+Cache files are written to a temporary file first and renamed, so
+processes sharing the cache never read a partially written file.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+
+from ..core.cache_files import replace_file, user_cache_dir
+
+# marshal format 2 is supported by python 2.5+ and 3
+MARSHAL_VERSION = 2
+
+
+def cache_key(file_name, parser_class):
+    """
+    :return: key that changes whenever the file or the parser that parses
+        it changes, None if file can not be stat'ed.
+    """
+    try:
+        st = os.stat(file_name)
+    except EnvironmentError:
+        return None
+    mtime = getattr(st, 'st_mtime_ns', None) or st.st_mtime
+    # marshal format is tied to python major version
+    return (os.path.abspath(file_name), mtime, st.st_size,
+            parser_class.__name__, parser_class.VERSION,
+            sys.version_info[0])
+
+
+def cache_dir():
+    return os.path.join(user_cache_dir(), 'schematic_data')
+
+
+def cache_path(file_name):
+    path = os.path.abspath(file_name)
+    if not isinstance(path, bytes):
+        path = path.encode('utf-8')
+    return os.path.join(cache_dir(), hashlib.sha1(path).hexdigest())
+
+
+def load(file_name, key):
+    """:return: cached result for key or None"""
+    path = cache_path(file_name)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            cached_key, result = marshal.load(f)
+        field_list, comp_dict = result
+        if not isinstance(field_list, list) or \
+                not isinstance(comp_dict, dict):
+            raise ValueError('Unexpected cache content')
+    except EnvironmentError:
+        # Unreadable or removed by a concurrent invalidate(), same as a miss
+        return None
+    except (EOFError, ValueError, TypeError):
+        # Corrupt or written by incompatible version
+        invalidate(file_name)
+        return None
+    if tuple(cached_key) != key:
+        return None
+    return field_list, comp_dict
+
+
+def store(file_name, key, result):
+    path = cache_path(file_name)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(tmp_path, 'wb') as f:
+            marshal.dump((key, tuple(result)), f, MARSHAL_VERSION)
+        replace_file(tmp_path, path)
+    except EnvironmentError:
+        # Cache is optional, read only home directory is fine
+        invalidate(file_name)
+        try:
+            os.remove(tmp_path)
+        except EnvironmentError:
+            pass
+
+
+def invalidate(file_name):
+    """Removes cached data of the file."""
+    try:
+        os.remove(cache_path(file_name))
+    except EnvironmentError:
+        pass
@@ -1,19 +1,24 @@
 import io
 
 from .parser_base import ParserBase
-from .sexpressions import parse_sexpression
+from .sexpressions import iter_sections, iter_tokens
 
 
 class NetlistParser(ParserBase):
     def get_extra_field_data(self):
-        with io.open(self.file_name, 'r', encoding='utf-8') as f:
-            sexpression = parse_sexpression(f.read())
         components = None
-        for s in sexpression:
-            if s[0] == 'components':
-                components = s[1:]
+        with io.open(self.file_name, 'r', encoding='utf-8') as f:
+            # Stop reading once components are parsed, nets and libparts
+            # that follow are the bulk of large netlists.
+            for section in iter_sections(iter_tokens(f), ['components']):
+                components = section[1:]
+                break
         if components is None:
             return None
+        return self.parse_components(components)
+
+    @staticmethod
+    def parse_components(components):
         field_set = set()
         comp_dict = {}
         for c in components:
@@ -1,5 +1,7 @@
 class ParserBase:
     DEFAULT_FIELDS = []
+    # Bump when parser output for the same file changes, invalidates cache
+    VERSION = 1
 
     def __init__(self, file_name):
         """
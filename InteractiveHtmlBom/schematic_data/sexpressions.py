@@ -8,25 +8,160 @@ term_regex = r'''(?mx)
         (?P<s>[^(^)\s]+)
        )'''
 pattern = re.compile(term_regex)
+# Same terms as one group, findall() returns them as plain strings
+token_pattern = re.compile(r'\s*(\(|\)|"[^"]*"|[^(^)\s]+)')
 
+CHUNK_SIZE = 1024 * 1024
 
-def parse_sexpression(sexpression):
+
+def is_unterminated(token):
+    # Symbols never start with a quote unless there is no closing quote
+    # after it, otherwise term would match as quoted string.
+    return token[0] == '"' and (len(token) == 1 or token[-1] != '"')
+
+
+def scan(text, final=True):
+    """
+    Splits text into tokens. Tokens are '(' and ')' for brackets, quoted
+    strings with quotes and symbols as is. Quotes are stripped when
+    expression is built.
+    :param text: text to scan
+    :param final: if False text is followed by more data and scanning stops
+        before a token that may continue past the end of text.
+    :return: tuple of list of tokens and position where scanning stopped
+    """
+    if final:
+        return token_pattern.findall(text), len(text)
+    # Cut at a line break, no symbol spans it. Quoted string may, then it
+    # is the last token with a quote and looks unterminated.
+    cut = text.rfind('\n')
+    if cut >= 0:
+        tokens = token_pattern.findall(text, 0, cut)
+        for token in reversed(tokens):
+            if '"' in token:
+                if is_unterminated(token):
+                    break
+                return tokens, cut
+        else:
+            return tokens, cut
+    # Slow path, find exact end of last complete token
+    tokens = []
+    pos = 0
+    end = len(text)
+    for m in pattern.finditer(text):
+        token = m.group(m.lastgroup)
+        if m.end() == end or m.lastgroup == 's' and token[0] == '"':
+            break
+        tokens.append(token)
+        pos = m.end()
+    return tokens, pos
+
+
+def iter_tokens(f, chunk_size=CHUNK_SIZE):
+    """Yields tokens of text file object read in chunks."""
+    rest = ''
+    while True:
+        chunk = f.read(chunk_size)
+        text = rest + chunk
+        tokens, pos = scan(text, final=not chunk)
+        for token in tokens:
+            yield token
+        if not chunk:
+            return
+        rest = text[pos:]
+
+
+def atom(token):
+    if token[0] == '"' and len(token) > 1 and token[-1] == '"':
+        return token[1:-1]
+    return token
+
+
+def parse_tokens(tokens):
+    """Builds nested lists from tokens, returns first top level element."""
     stack = []
     out = []
-    for terms in pattern.finditer(sexpression):
-        term, value = [(t, v) for t, v in terms.groupdict().items() if v][0]
-        if term == 'open':
+    for token in tokens:
+        if token == '(':
             stack.append(out)
             out = []
-        elif term == 'close':
+        elif token == ')':
             assert stack, "Trouble with nesting of brackets"
             tmp, out = out, stack.pop(-1)
             out.append(tmp)
-        elif term == 'sq':
-            out.append(value[1:-1])
-        elif term == 's':
-            out.append(value)
         else:
-            raise NotImplementedError("Error: %s, %s" % (term, value))
+            out.append(atom(token))
     assert not stack, "Trouble with nesting of brackets"
     return out[0]
+
+
+def parse_sexpression(sexpression):
+    return parse_tokens(scan(sexpression)[0])
+
+
+def skip_expression(tokens):
+    """Consumes tokens up to the bracket closing current expression."""
+    depth = 0
+    for token in tokens:
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            if depth == 0:
+                return
+            depth -= 1
+    raise AssertionError("Trouble with nesting of brackets")
+
+
+def build_expression(tokens, head):
+    """
+    Builds list of current expression from tokens up to its closing bracket.
+    :param head: already consumed elements of the expression
+    """
+    stack = []
+    out = list(head)
+    for token in tokens:
+        if token == '(':
+            stack.append(out)
+            out = []
+        elif token == ')':
+            if not stack:
+                return out
+            tmp, out = out, stack.pop(-1)
+            out.append(tmp)
+        else:
+            out.append(atom(token))
+    raise AssertionError("Trouble with nesting of brackets")
+
+
+def iter_sections(tokens, names):
+    """
+    Event mode parsing of a top level expression like (export (design ..)
+    (components ..) ..). Yields only its child expressions whose first
+    element is in names, everything else is skipped without building it.
+    Consumer can stop iterating once it has the sections it needs, rest of
+    the input is then never read.
+    """
+    tokens = iter(tokens)
+    for token in tokens:
+        if token == '(':
+            break
+    else:
+        return
+    for token in tokens:
+        if token == ')':
+            return
+        if token != '(':
+            continue
+        head = next(tokens, None)
+        if head is None:
+            raise AssertionError("Trouble with nesting of brackets")
+        if head == ')':
+            continue
+        if head == '(':
+            # nested list as first element
+            skip_expression(tokens)
+            skip_expression(tokens)
+        elif atom(head) in names:
+            yield build_expression(tokens, [atom(head)])
+        else:
+            skip_expression(tokens)
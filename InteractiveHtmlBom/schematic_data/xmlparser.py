@@ -1,28 +1,49 @@
-from xml.dom import minidom
+try:
+    from xml.etree.cElementTree import iterparse
+except ImportError:
+    from xml.etree.ElementTree import iterparse
 
 from .parser_base import ParserBase
 
 
 class XmlParser(ParserBase):
     @staticmethod
-    def get_text(nodelist):
-        rc = []
-        for node in nodelist:
-            if node.nodeType == node.TEXT_NODE:
-                rc.append(node.data)
+    def get_text(element):
+        # Text directly inside element, same as concatenated text nodes
+        rc = [element.text or '']
+        for child in element:
+            rc.append(child.tail or '')
         return ''.join(rc)
 
     def get_extra_field_data(self):
-        xml = minidom.parse(self.file_name)
-        components = xml.getElementsByTagName('comp')
         field_set = set()
         comp_dict = {}
-        for c in components:
-            ref_fields = comp_dict.setdefault(c.attributes['ref'].value, {})
-            for f in c.getElementsByTagName('field'):
-                name = f.attributes['name'].value
-                if name not in self.DEFAULT_FIELDS:
-                    field_set.add(name)
-                    ref_fields[name] = self.get_text(f.childNodes)
+        # Open elements, used to drop processed children from their parent
+        parents = []
+        # Components in document order waiting for outermost one to end
+        components = []
+        comp_depth = 0
+        for event, elem in iterparse(self.file_name, ('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
+                if elem.tag == 'comp':
+                    comp_depth += 1
+                    components.append(elem)
+                continue
+            parents.pop()
+            if elem.tag == 'comp':
+                comp_depth -= 1
+            if comp_depth:
+                continue
+            for c in components:
+                ref_fields = comp_dict.setdefault(c.attrib['ref'], {})
+                for f in c.iter('field'):
+                    name = f.attrib['name']
+                    if name not in self.DEFAULT_FIELDS:
+                        field_set.add(name)
+                        ref_fields[name] = self.get_text(f)
+            components = []
+            if parents:
+                del parents[-1][:]
 
         return list(field_set), comp_dict
@@ -0,0 +1,76 @@
+"""
+Module bbox grid index tests, they run on python 2 and 3:
+    python -m unittest discover -s InteractiveHtmlBom/tests -t .
+"""
+
+from __future__ import absolute_import
+
+import random
+import unittest
+
+from InteractiveHtmlBom.core import bbox_index
+from InteractiveHtmlBom.core import compact
+
+
+def random_modules(rnd, count):
+    """pcbdata modules with only ref, layer and bbox on a 300x200 mm board."""
+    modules = []
+    for i in range(count):
+        if rnd.random() < 0.02:
+            w, h = rnd.uniform(10, 40), rnd.uniform(5, 15)
+        else:
+            w, h = rnd.uniform(0.5, 5), rnd.uniform(0.3, 3)
+        x = rnd.uniform(0, 300 - w)
+        y = rnd.uniform(0, 200 - h)
+        modules.append({
+            "ref": "U%d" % i,
+            "layer": "F" if rnd.random() < 0.8 else "B",
+            "bbox": {"pos": [x, y], "size": [w, h]},
+        })
+    return modules
+
+
+def quantized(modules):
+    """Modules with bboxes rounded the way compact pcbdata stores them."""
+    def rounded(values):
+        return [compact.quantize(v) * 1.0 / compact.COORD_SCALE
+                for v in values]
+
+    return [dict(m, bbox={"pos": rounded(m["bbox"]["pos"]),
+                          "size": rounded(m["bbox"]["size"])})
+            for m in modules]
+
+
+class BboxIndexTest(unittest.TestCase):
+
+    def check_against_scan(self, seed, count):
+        rnd = random.Random(seed)
+        modules = random_modules(rnd, count)
+        index = bbox_index.build_bbox_index(modules)
+        points = [(rnd.choice('FB'), rnd.uniform(-5, 305),
+                   rnd.uniform(-5, 205)) for _ in range(1000)]
+        # Points on bbox corners and edges
+        for m in modules[:200]:
+            pos, size = m["bbox"]["pos"], m["bbox"]["size"]
+            points.append((m["layer"], pos[0], pos[1]))
+            points.append((m["layer"], pos[0] + size[0],
+                           pos[1] + size[1] * 0.5))
+        # Index is built from exact bboxes, compact formats round them later
+        for checked in (modules, quantized(modules)):
+            for layer, x, y in points:
+                self.assertEqual(
+                        bbox_index.query(index, checked, layer, x, y),
+                        bbox_index.scan(checked, layer, x, y),
+                        "at %s %f %f" % (layer, x, y))
+
+    def test_query_matches_scan(self):
+        for seed, count in ((0, 1), (1, 50), (2, 2000)):
+            self.check_against_scan(seed, count)
+
+    def test_empty_board(self):
+        index = bbox_index.build_bbox_index([])
+        self.assertEqual(bbox_index.query(index, [], 'F', 1, 1), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
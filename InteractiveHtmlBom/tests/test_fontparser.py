@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Font parser tests, they run on python 2 and 3:
+    python -m unittest discover -s InteractiveHtmlBom/tests -t .
+"""
+
+from __future__ import absolute_import
+
+import json
+import unittest
+
+from InteractiveHtmlBom.core import template
+from InteractiveHtmlBom.core.fontparser import FontParser
+
+
+class FontParserTest(unittest.TestCase):
+
+    def parse(self, *strings):
+        parser = FontParser()
+        for s in strings:
+            parser.parse_font_for_string(s)
+        return parser
+
+    def test_parsed_font_is_plain_json(self):
+        font = self.parse(u'R1 µ', u'\tC2').get_parsed_font()
+        self.assertEqual(sorted(font), sorted(u' 12CRµ'))
+        glyph = json.loads(json.dumps(font))['R']
+        self.assertEqual(glyph, font['R'])
+        self.assertIsInstance(glyph['l'], list)
+
+    def test_encoded_font_matches_parsed_font(self):
+        parser = self.parse(u'U10', u'Ω')
+        encoded = u''.join(template.iterencode(parser.get_encoded_font()))
+        self.assertEqual(json.loads(encoded), parser.get_parsed_font())
+
+    def test_encoded_glyphs_are_shared(self):
+        first = self.parse(u'Q1').get_encoded_font()
+        second = self.parse(u'Q2').get_encoded_font()
+        self.assertIs(first['Q'], second['Q'])
+
+
+if __name__ == '__main__':
+    unittest.main()
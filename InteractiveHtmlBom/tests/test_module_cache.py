@@ -0,0 +1,78 @@
+"""
+Module cache tests, they run on python 2 and 3:
+    python -m unittest discover -s InteractiveHtmlBom/tests -t .
+"""
+
+from __future__ import absolute_import
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import pcbnew
+except ImportError:
+    from InteractiveHtmlBom.core import kicad_pcb
+    pcbnew = kicad_pcb.install()
+
+from InteractiveHtmlBom.core import ibom
+from InteractiveHtmlBom.core.fontparser import FontParser
+from InteractiveHtmlBom.core.module_cache import ModuleCache
+
+BOARD = u'''(kicad_pcb (version 20171130) (host pcbnew 5.1.5)
+  (module Lib:Part (layer F.Cu) (tedit 5E000000) (at 10 20)
+    (fp_text reference U1 (at 0 -2) (layer F.SilkS))
+    (fp_text value Part (at 0 2) (layer F.Fab))
+    (fp_text user QZ (at 0 0) (layer F.Cu)
+      (effects (font (size 1 1) (thickness 0.15))))
+    (pad 1 smd rect (at -1 0) (size %s) (layers F.Cu))
+    (pad 2 smd rect (at 1 0) (size 0.5 0.5) (layers F.Cu)))
+)
+'''
+
+
+class ModuleCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmp_dir, 'modules.pickle')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_parser(self, pad_size='0.5 0.5'):
+        """Parses modules of the board like one generator run does."""
+        pcb_file = os.path.join(self.tmp_dir, 'board.kicad_pcb')
+        with io.open(pcb_file, 'w', encoding='utf-8') as f:
+            f.write(BOARD % pad_size)
+        pcb = pcbnew.LoadBoard(pcb_file)
+        ibom.font_parser = FontParser()
+        cache = ModuleCache(self.cache_file, 10)
+        modules = ibom.parse_modules(list(pcb.GetModules()),
+                                     module_cache=cache)
+        cache.save()
+        return cache, modules, ibom.font_parser.get_parsed_font()
+
+    def test_warm_cache_keeps_copper_text_glyphs(self):
+        cold_cache, cold_modules, cold_font = self.run_parser()
+        self.assertEqual(cold_cache.misses, 1)
+        warm_cache, warm_modules, warm_font = self.run_parser()
+        self.assertEqual(warm_cache.hits, 1)
+        self.assertEqual(warm_modules, cold_modules)
+        self.assertEqual(warm_modules[0]['drawings'][0]['drawing']['text'],
+                         'QZ')
+        self.assertIn('Q', warm_font)
+        self.assertIn('Z', warm_font)
+
+    def test_pad_edit_misses(self):
+        self.run_parser()
+        cache, modules, _ = self.run_parser(pad_size='0.4 0.5')
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 1)
+        self.assertAlmostEqual(modules[0]['pads'][0]['size'][0], 0.4)
+
+
+if __name__ == '__main__':
+    unittest.main()
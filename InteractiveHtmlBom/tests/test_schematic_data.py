@@ -0,0 +1,63 @@
+"""
+Schematic data lookup tests, they run on python 2 and 3:
+    python -m unittest discover -s InteractiveHtmlBom/tests -t .
+"""
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from InteractiveHtmlBom.schematic_data import find_latest_schematic_data
+
+
+class FindLatestSchematicDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pcb_file = os.path.join(self.tmp_dir, 'board.kicad_pcb')
+        self.mtime = 1000000000
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def touch(self, name):
+        """Creates file that is newer than all previously touched files."""
+        path = os.path.join(self.tmp_dir, name)
+        open(path, 'w').close()
+        self.mtime += 10
+        os.utime(path, (self.mtime, self.mtime))
+        return path
+
+    def test_no_files(self):
+        self.touch('board.kicad_pcb')
+        self.assertIsNone(find_latest_schematic_data(self.pcb_file))
+
+    def test_named_file_wins(self):
+        named = self.touch('board.net')
+        self.touch('other.xml')
+        self.assertEqual(find_latest_schematic_data(self.pcb_file), named)
+        newer = self.touch('board.xml')
+        self.assertEqual(find_latest_schematic_data(self.pcb_file), newer)
+
+    def test_latest_file(self):
+        self.touch('a.net')
+        self.touch('b.txt')
+        latest = self.touch('c.xml')
+        self.assertEqual(find_latest_schematic_data(self.pcb_file), latest)
+        self.assertEqual(find_latest_schematic_data(self.pcb_file), latest)
+        latest = self.touch('a.net')
+        self.assertEqual(find_latest_schematic_data(self.pcb_file), latest)
+
+    def test_new_file_is_found(self):
+        self.assertIsNone(find_latest_schematic_data(self.pcb_file))
+        latest = self.touch('a.xml')
+        # directory mtime resolution may be too coarse to notice the change
+        os.utime(self.tmp_dir, (self.mtime, self.mtime))
+        self.assertEqual(find_latest_schematic_data(self.pcb_file), latest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Html output tests, they run on python 2 and 3:
+    python -m unittest discover -s InteractiveHtmlBom/tests -t .
+"""
+
+from __future__ import absolute_import
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import pcbnew
+except ImportError:
+    from InteractiveHtmlBom.core import kicad_pcb
+    pcbnew = kicad_pcb.install()
+
+from InteractiveHtmlBom.core import ibom
+from InteractiveHtmlBom.core import template
+from InteractiveHtmlBom.core.config import Config
+
+PCBDATA = {
+    "edges_bbox": {"minx": 0, "miny": 0, "maxx": 10.5, "maxy": 20},
+    "edges": [{"type": "segment", "start": [0, 0], "end": [10.5, 0],
+               "width": 0.1}],
+    "metadata": {"title": u"Board µ", "revision": "1", "company": "",
+                 "date": "2020-01-01"},
+    "bom": {"both": [[1, u"4.7µF", "C_0402", [["C1", 0]], []]]},
+    "font_data": {"A": template.RawJson(json.dumps({"w": 1, "l": []}))},
+}
+
+
+class TemplateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_iterencode_chunks_are_text(self):
+        chunks = list(template.iterencode(PCBDATA))
+        for chunk in chunks:
+            self.assertIsInstance(chunk, type(u''))
+        decoded = json.loads(u''.join(chunks))
+        self.assertEqual(decoded["metadata"]["title"], u"Board µ")
+        self.assertEqual(decoded["font_data"]["A"], {"w": 1, "l": []})
+
+    def test_write_to_text_file(self):
+        html = template.Template(u'<p>///DATA///</p>µ///MISSING///')
+        path = os.path.join(self.tmp_dir, 'out.html')
+        with io.open(path, 'wt', encoding='utf-8') as out:
+            html.write(out, {
+                'DATA': template.buffered(template.iterencode([1, 'a'])),
+            })
+        with io.open(path, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read(), u'<p>[1, "a"]</p>µ///MISSING///')
+
+    def test_generate_file(self):
+        for compression in Config.compression_choices:
+            config = Config()
+            config.compression = compression
+            config.bom_dest_dir = self.tmp_dir
+            config.bom_name_format = 'ibom-' + compression
+            path = ibom.generate_file(self.tmp_dir, 'board.kicad_pcb',
+                                      dict(PCBDATA), config)
+            with io.open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            self.assertTrue(html.rstrip().endswith(u'</html>'))
+            self.assertIn(u'var pcbdata = ', html)
+            if compression == 'none':
+                self.assertIn(u'Board \\u00b5', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,7 @@ function dbg(html) {
 
 function padsVisible(value) {
   renderPads = value;
+  invalidateLayerCache();
   if (initDone) {
     redrawCanvas(allcanvas.front);
     redrawCanvas(allcanvas.back);
@@ -36,6 +37,7 @@ function setDarkMode(value) {
     topmostdiv.classList.remove("dark");
   }
   writeStorage("darkmode", value);
+  invalidateLayerCache();
   if (initDone) {
     redrawCanvas(allcanvas.front);
     redrawCanvas(allcanvas.back);
@@ -47,6 +49,12 @@ function layerVisible(visible, frontCavnas, backCanvas, storageString) {
   frontCavnas.style.display = display;
   backCanvas.style.display = display;
   writeStorage(storageString, visible);
+  // Zoom cache only holds layers that were visible when it was built
+  invalidateLayerCache();
+  if (initDone) {
+    redrawCanvas(allcanvas.front);
+    redrawCanvas(allcanvas.back);
+  }
 }
 
 function fabricationVisible(visible) {
@@ -60,6 +68,7 @@ function silkscreenVisible(visible) {
 function setHighlightPin1(value) {
   writeStorage("highlightpin1", value);
   highlightpin1 = value;
+  invalidateLayerCache();
   if (initDone) {
     redrawCanvas(allcanvas.front);
     redrawCanvas(allcanvas.back);
@@ -759,6 +768,7 @@ function initDefaults() {
   b = getStorageBooleanOrDefault("redrawOnDrag", config.redraw_on_drag);
   document.getElementById("dragCheckbox").checked = b;
   setRedrawOnDrag(b);
+  zoomCacheBudget = config.zoom_cache_budget || 0;
 
   b = getStorageBooleanOrDefault("darkmode", config.dark_mode);
   document.getElementById("darkmodeCheckbox").checked = b;
@@ -779,6 +789,7 @@ function initDefaults() {
 }
 
 window.onload = function(e) {
+  decodePcbdata();
   initUtils();
   initRender();
   initStorage();
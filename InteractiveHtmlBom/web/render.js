@@ -3,6 +3,12 @@
 var redrawOnDrag = true;
 var boardRotation = 0;
 var renderPads = true;
+// Megapixels of offscreen canvases caching static layers, 0 disables
+var zoomCacheBudget = 0;
+// Cached zoom levels, least recently used first
+var layerCache = [];
+// Cached area extends past the canvas by this fraction on each side
+var LAYER_CACHE_MARGIN = 0.05;
 
 function deg2rad(deg) {
   return deg * Math.PI / 180;
@@ -77,6 +83,22 @@ function drawtext(ctx, text, color, flip) {
   ctx.restore();
 }
 
+function drawPolylines(ctx, drawing, color) {
+  // Text pre-tessellated by text_geometry.py, already in board coordinates
+  ctx.strokeStyle = color;
+  ctx.lineCap = "round";
+  ctx.lineJoin = "round";
+  ctx.lineWidth = drawing.thickness;
+  ctx.beginPath();
+  for (var line of drawing.lines) {
+    ctx.moveTo(line[0], line[1]);
+    for (var i = 2; i < line.length; i += 2) {
+      ctx.lineTo(line[i], line[i + 1]);
+    }
+  }
+  ctx.stroke();
+}
+
 function drawedge(ctx, scalefactor, edge, color) {
   ctx.strokeStyle = color;
   ctx.lineWidth = Math.max(1 / scalefactor, edge.width);
@@ -152,6 +174,8 @@ function drawDrawing(ctx, layer, scalefactor, drawing, color) {
     drawedge(ctx, scalefactor, drawing, color);
   } else if (drawing.type == "polygon") {
     drawPolygonShape(ctx, drawing, color);
+  } else if (drawing.type == "polylines") {
+    drawPolylines(ctx, drawing, color);
   } else {
     drawtext(ctx, drawing, color, layer == "B");
   }
@@ -272,6 +296,8 @@ function drawBgLayer(layername, canvas, layer, scalefactor, edgeColor, polygonCo
       drawedge(ctx, scalefactor, d, edgeColor);
     } else if (d.type == "polygon") {
       drawPolygonShape(ctx, d, polygonColor);
+    } else if (d.type == "polylines") {
+      drawPolylines(ctx, d, textColor);
     } else {
       drawtext(ctx, d, textColor, layer == "B");
     }
@@ -398,9 +424,125 @@ function recalcLayerScale(canvasdict) {
   }
 }
 
+function cachedLayerNames(canvasdict) {
+  // Hidden layers are not rasterized, cache is reset when they are shown
+  return ["bg", "fab", "silk"].filter(
+    (c) => c == "bg" || canvasdict[c].style.display != "none");
+}
+
+function releaseLayerCache(entry) {
+  for (var c in entry.canvases) {
+    // Some browsers only free canvas memory when it is resized
+    entry.canvases[c].width = 0;
+    entry.canvases[c].height = 0;
+  }
+}
+
+function invalidateLayerCache() {
+  for (var entry of layerCache) {
+    releaseLayerCache(entry);
+  }
+  layerCache = [];
+}
+
+function buildLayerCache(canvasdict) {
+  var t = canvasdict.transform;
+  var layers = cachedLayerNames(canvasdict);
+  var mx = Math.ceil(canvasdict.bg.width * LAYER_CACHE_MARGIN);
+  var my = Math.ceil(canvasdict.bg.height * LAYER_CACHE_MARGIN);
+  var width = Math.ceil((canvasdict.bg.width + 2 * mx) * t.zoom);
+  var height = Math.ceil((canvasdict.bg.height + 2 * my) * t.zoom);
+  var pixels = width * height * layers.length;
+  if (pixels > zoomCacheBudget * 1e6) {
+    return null;
+  }
+  var entry = {
+    layer: canvasdict.layer,
+    zoom: t.zoom,
+    layers: layers.join(),
+    mx: mx,
+    my: my,
+    pixels: pixels,
+    canvases: {},
+  };
+  // Board is drawn as if panned so that the margin is at the origin
+  var cachetransform = Object.assign({}, t, {
+    panx: mx,
+    pany: my
+  });
+  var target = {
+    layer: canvasdict.layer,
+    transform: t,
+  };
+  for (var c of ["bg", "fab", "silk"]) {
+    var canvas = document.createElement("canvas");
+    if (layers.includes(c)) {
+      canvas.width = width;
+      canvas.height = height;
+      entry.canvases[c] = canvas;
+    } else {
+      canvas.width = 0;
+      canvas.height = 0;
+    }
+    prepareCanvas(canvas, canvasdict.layer == "B", cachetransform);
+    target[c] = canvas;
+  }
+  drawBackground(target);
+  var used = pixels;
+  for (var e of layerCache) {
+    used += e.pixels;
+  }
+  while (layerCache.length > 0 && used > zoomCacheBudget * 1e6) {
+    var evicted = layerCache.shift();
+    used -= evicted.pixels;
+    releaseLayerCache(evicted);
+  }
+  layerCache.push(entry);
+  return entry;
+}
+
+function getLayerCache(canvasdict) {
+  if (zoomCacheBudget <= 0) {
+    return null;
+  }
+  var layers = cachedLayerNames(canvasdict).join();
+  for (var i = 0; i < layerCache.length; i++) {
+    var entry = layerCache[i];
+    if (entry.layer == canvasdict.layer &&
+      entry.zoom == canvasdict.transform.zoom && entry.layers == layers) {
+      layerCache.push(layerCache.splice(i, 1)[0]);
+      return entry;
+    }
+  }
+  return buildLayerCache(canvasdict);
+}
+
+function drawCachedBackground(canvasdict) {
+  var entry = getLayerCache(canvasdict);
+  if (!entry) {
+    return false;
+  }
+  var t = canvasdict.transform;
+  for (var c of ["bg", "fab", "silk"]) {
+    clearCanvas(canvasdict[c]);
+    if (!(c in entry.canvases)) {
+      continue;
+    }
+    var ctx = canvasdict[c].getContext("2d");
+    ctx.save();
+    ctx.setTransform(1, 0, 0, 1, 0, 0);
+    ctx.drawImage(entry.canvases[c],
+      t.zoom * (t.panx - entry.mx), t.zoom * (t.pany - entry.my));
+    ctx.restore();
+  }
+  return true;
+}
+
 function redrawCanvas(layerdict) {
   prepareLayer(layerdict);
-  drawBackground(layerdict);
+  if (!drawCachedBackground(layerdict)) {
+    drawBackground(layerdict);
+  }
   drawHighlightsOnLayer(layerdict);
 }
 
@@ -410,6 +552,7 @@ function resizeCanvas(layerdict) {
 }
 
 function resizeAll() {
+  invalidateLayerCache();
   resizeCanvas(allcanvas.front);
   resizeCanvas(allcanvas.back);
 }
@@ -429,6 +572,30 @@ function bboxScan(layer, x, y) {
   return result;
 }
 
+function bboxQuery(layer, x, y) {
+  // Same result as bboxScan() using per layer grid built by bbox_index.py
+  var grid = pcbdata.bbox_index[layer];
+  if (!grid) {
+    return [];
+  }
+  var ix = Math.floor((x - grid.x) / grid.cw);
+  var iy = Math.floor((y - grid.y) / grid.ch);
+  // Points outside of the grid are clamped to the border cells
+  ix = Math.min(Math.max(ix, 0), grid.nx - 1);
+  iy = Math.min(Math.max(iy, 0), grid.ny - 1);
+  var k = iy * grid.nx + ix;
+  var result = [];
+  for (var j = grid.offsets[k]; j < grid.offsets[k + 1]; j++) {
+    var i = grid.items[j];
+    var b = pcbdata.modules[i].bbox;
+    if (b.pos[0] <= x && b.pos[0] + b.size[0] >= x &&
+      b.pos[1] <= y && b.pos[1] + b.size[1] >= y) {
+      result.push(i);
+    }
+  }
+  return result;
+}
+
 function handlePointerDown(e, layerdict) {
   if (e.button != 0) {
     return;
@@ -467,7 +634,12 @@ function handleMouseClick(e, layerdict) {
   }
   y = (devicePixelRatio * y / t.zoom - t.y - t.pany) / t.s;
   var v = rotateVector([x, y], -boardRotation);
-  var modules = bboxScan(layerdict.layer, v[0], v[1]);
+  var modules;
+  if (pcbdata.bbox_index) {
+    modules = bboxQuery(layerdict.layer, v[0], v[1]);
+  } else {
+    modules = bboxScan(layerdict.layer, v[0], v[1]);
+  }
   if (modules.length > 0) {
     modulesClicked(modules);
   }
@@ -650,6 +822,230 @@ function setBoardRotation(value) {
   resizeAll();
 }
 
+/* Compact pcbdata decoding, see core/compact.py */
+
+function decodeColumn(column) {
+  if (typeof column != "string") {
+    return column;
+  }
+  // Base64 packed zigzag varints of deltas
+  var bytes = atob(column);
+  var result = [];
+  var value = 0;
+  var acc = 0;
+  var mul = 1;
+  for (var i = 0; i < bytes.length; i++) {
+    var b = bytes.charCodeAt(i);
+    acc += (b & 0x7f) * mul;
+    if (b & 0x80) {
+      mul *= 128;
+      continue;
+    }
+    value += (acc % 2) ? -(acc + 1) / 2 : acc / 2;
+    result.push(value);
+    acc = 0;
+    mul = 1;
+  }
+  return result;
+}
+
+function decodeColumns(table) {
+  var result = {};
+  for (var key in table) {
+    result[key] = decodeColumn(table[key]);
+  }
+  return result;
+}
+
+function decodePolygons(polygons, scale) {
+  return polygons.map((flat) => {
+    var polygon = [];
+    for (var i = 0; i < flat.length; i += 2) {
+      polygon.push([flat[i] / scale, flat[i + 1] / scale]);
+    }
+    return polygon;
+  });
+}
+
+function decodeDrawings(drawings, compact) {
+  var s = compact.coord_scale;
+  var as = compact.angle_scale;
+  // Decoded drawings by type letter of the order string
+  var decoded = {
+    s: [],
+    a: [],
+    c: [],
+    p: [],
+    l: [],
+    t: drawings.texts || [],
+  };
+  var c;
+  if (drawings.segments) {
+    c = decodeColumns(drawings.segments);
+    for (var i = 0; i < c.w.length; i++) {
+      decoded.s.push({
+        type: "segment",
+        start: [c.x1[i] / s, c.y1[i] / s],
+        end: [c.x2[i] / s, c.y2[i] / s],
+        width: c.w[i] / s,
+      });
+    }
+  }
+  if (drawings.arcs) {
+    c = decodeColumns(drawings.arcs);
+    for (var i = 0; i < c.w.length; i++) {
+      decoded.a.push({
+        type: "arc",
+        start: [c.x[i] / s, c.y[i] / s],
+        radius: c.r[i] / s,
+        startangle: c.a1[i] / as,
+        endangle: c.a2[i] / as,
+        width: c.w[i] / s,
+      });
+    }
+  }
+  if (drawings.circles) {
+    c = decodeColumns(drawings.circles);
+    for (var i = 0; i < c.w.length; i++) {
+      decoded.c.push({
+        type: "circle",
+        start: [c.x[i] / s, c.y[i] / s],
+        radius: c.r[i] / s,
+        width: c.w[i] / s,
+      });
+    }
+  }
+  for (var polygon of drawings.polygons || []) {
+    decoded.p.push({
+      type: "polygon",
+      pos: [polygon.pos[0] / s, polygon.pos[1] / s],
+      angle: polygon.angle,
+      polygons: decodePolygons(polygon.polygons, s),
+    });
+  }
+  if (drawings.polylines) {
+    c = decodeColumns(drawings.polylines);
+    var ps = compact.polyline_scale;
+    var line = 0;
+    var point = 0;
+    for (var i = 0; i < c.w.length; i++) {
+      var lines = [];
+      for (var j = 0; j < c.lines[i]; j++, line++) {
+        var flat = [];
+        for (var k = 0; k < c.points[line]; k++, point++) {
+          flat.push(c.x[point] / ps, c.y[point] / ps);
+        }
+        lines.push(flat);
+      }
+      decoded.l.push({
+        type: "polylines",
+        thickness: c.w[i] / s,
+        lines: lines,
+      });
+    }
+  }
+  // Restore original drawing order, it is the z-order of the layer
+  var next = {};
+  var result = [];
+  for (var code of drawings.order || "") {
+    next[code] = next[code] || 0;
+    result.push(decoded[code][next[code]++]);
+  }
+  return result;
+}
+
+function decodePadShape(shape, s) {
+  var result = {
+    shape: shape.shape,
+    type: shape.type,
+    size: [shape.size[0] / s, shape.size[1] / s],
+  };
+  if ("radius" in shape) {
+    result.radius = shape.radius / s;
+  }
+  if ("polygons" in shape) {
+    result.polygons = decodePolygons(shape.polygons, s);
+  }
+  if ("drillshape" in shape) {
+    result.drillshape = shape.drillshape;
+    result.drillsize = [shape.drillsize[0] / s, shape.drillsize[1] / s];
+  }
+  if ("offset" in shape) {
+    result.offset = [shape.offset[0] / s, shape.offset[1] / s];
+  }
+  return result;
+}
+
+function decodeModules(modules, compact) {
+  var s = compact.coord_scale;
+  var as = compact.angle_scale;
+  var padLayers = [[], ["F"], ["B"], ["F", "B"]];
+  var padShapes = compact.pad_shapes.map((shape) => decodePadShape(shape, s));
+  var c = decodeColumns(modules.columns);
+  var pin1 = new Set(c.pin1);
+  var result = [];
+  var padIndex = 0;
+  for (var i = 0; i < modules.ref.length; i++) {
+    var pads = [];
+    for (var j = 0; j < c.padcount[i]; j++, padIndex++) {
+      var pad = Object.assign({
+        layers: padLayers[c.players[padIndex]],
+        pos: [c.px[padIndex] / s, c.py[padIndex] / s],
+        angle: c.pangle[padIndex] / as,
+      }, padShapes[c.pshape[padIndex]]);
+      if (pin1.has(padIndex)) {
+        pad.pin1 = 1;
+      }
+      pads.push(pad);
+    }
+    var drawings = [];
+    if (i in modules.drawings) {
+      for (var layer in modules.drawings[i]) {
+        for (var drawing of decodeDrawings(modules.drawings[i][layer], compact)) {
+          drawings.push({
+            layer: layer,
+            drawing: drawing,
+          });
+        }
+      }
+    }
+    result.push({
+      ref: modules.ref[i],
+      center: [c.cx[i] / s, c.cy[i] / s],
+      bbox: {
+        pos: [c.bx[i] / s, c.by[i] / s],
+        size: [c.bw[i] / s, c.bh[i] / s],
+      },
+      pads: pads,
+      drawings: drawings,
+      layer: modules.layer[i] == "-" ? null : modules.layer[i],
+    });
+  }
+  return result;
+}
+
+function decodePcbdata() {
+  if (!pcbdata.compact) {
+    return;
+  }
+  var compact = pcbdata.compact;
+  pcbdata.edges = decodeDrawings(pcbdata.edges, compact);
+  for (var group of ["silkscreen", "fabrication"]) {
+    for (var layer in pcbdata[group]) {
+      pcbdata[group][layer] = decodeDrawings(pcbdata[group][layer], compact);
+    }
+  }
+  pcbdata.modules = decodeModules(pcbdata.modules, compact);
+  if (pcbdata.bbox_index) {
+    for (var layer in pcbdata.bbox_index) {
+      var grid = pcbdata.bbox_index[layer];
+      grid.offsets = decodeColumn(grid.offsets);
+      grid.items = decodeColumn(grid.items);
+    }
+  }
+  delete pcbdata.compact;
+}
+
 function initRender() {
   allcanvas = {
     front: {
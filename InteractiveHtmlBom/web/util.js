@@ -1,5 +1,187 @@
 /* Utility functions */
 
+/* Decompression of embedded data, see core/compress.py */
+
+var inflateTables = {
+  lengthBase: [3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31, 35,
+    43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258],
+  lengthExtra: [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3,
+    4, 4, 4, 4, 5, 5, 5, 5, 0],
+  distBase: [1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193, 257,
+    385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289, 16385,
+    24577],
+  distExtra: [0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9,
+    9, 10, 10, 11, 11, 12, 12, 13, 13],
+  codeLengthOrder: [16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2,
+    14, 1, 15],
+}
+
+function buildHuffman(lengths) {
+  var counts = new Uint16Array(16);
+  var offsets = new Uint16Array(16);
+  var symbols = new Uint16Array(lengths.length);
+  for (var i = 0; i < lengths.length; i++) {
+    counts[lengths[i]]++;
+  }
+  counts[0] = 0;
+  for (var i = 1; i < 16; i++) {
+    offsets[i] = offsets[i - 1] + counts[i - 1];
+  }
+  for (var i = 0; i < lengths.length; i++) {
+    if (lengths[i]) {
+      symbols[offsets[lengths[i]]++] = i;
+    }
+  }
+  return {
+    counts: counts,
+    symbols: symbols
+  };
+}
+
+function inflate(data) {
+  // Raw deflate stream decoder, data is Uint8Array
+  var out = new Uint8Array(Math.max(1024, data.length * 4));
+  var outLen = 0;
+  var pos = 0;
+  var bitBuf = 0;
+  var bitCnt = 0;
+  var t = inflateTables;
+
+  function ensure(n) {
+    if (outLen + n > out.length) {
+      var grown = new Uint8Array(Math.max(out.length * 2, outLen + n));
+      grown.set(out);
+      out = grown;
+    }
+  }
+
+  function bits(n) {
+    while (bitCnt < n) {
+      bitBuf |= data[pos++] << bitCnt;
+      bitCnt += 8;
+    }
+    var v = bitBuf & ((1 << n) - 1);
+    bitBuf >>>= n;
+    bitCnt -= n;
+    return v;
+  }
+
+  function decodeSymbol(h) {
+    var code = 0;
+    var first = 0;
+    var index = 0;
+    for (var len = 1; len < 16; len++) {
+      code |= bits(1);
+      var count = h.counts[len];
+      if (code - count < first) {
+        return h.symbols[index + (code - first)];
+      }
+      index += count;
+      first = (first + count) << 1;
+      code <<= 1;
+    }
+    throw "Invalid compressed data";
+  }
+
+  var fixedLit = null;
+  var fixedDist = null;
+  var last;
+  do {
+    last = bits(1);
+    var type = bits(2);
+    if (type == 0) {
+      // Stored block, skip to byte boundary
+      bitBuf = 0;
+      bitCnt = 0;
+      var len = data[pos] | (data[pos + 1] << 8);
+      pos += 4;
+      ensure(len);
+      out.set(data.subarray(pos, pos + len), outLen);
+      outLen += len;
+      pos += len;
+      continue;
+    }
+    var lit, dist;
+    if (type == 1) {
+      if (!fixedLit) {
+        var lengths = new Uint8Array(288);
+        lengths.fill(8, 0, 144);
+        lengths.fill(9, 144, 256);
+        lengths.fill(7, 256, 280);
+        lengths.fill(8, 280, 288);
+        fixedLit = buildHuffman(lengths);
+        fixedDist = buildHuffman(new Uint8Array(30).fill(5));
+      }
+      lit = fixedLit;
+      dist = fixedDist;
+    } else if (type == 2) {
+      var nlen = bits(5) + 257;
+      var ndist = bits(5) + 1;
+      var ncode = bits(4) + 4;
+      var lengths = new Uint8Array(19);
+      for (var i = 0; i < ncode; i++) {
+        lengths[t.codeLengthOrder[i]] = bits(3);
+      }
+      var lencode = buildHuffman(lengths);
+      lengths = new Uint8Array(nlen + ndist);
+      for (var i = 0; i < nlen + ndist;) {
+        var sym = decodeSymbol(lencode);
+        if (sym < 16) {
+          lengths[i++] = sym;
+        } else {
+          var repeat, value = 0;
+          if (sym == 16) {
+            value = lengths[i - 1];
+            repeat = 3 + bits(2);
+          } else if (sym == 17) {
+            repeat = 3 + bits(3);
+          } else {
+            repeat = 11 + bits(7);
+          }
+          lengths.fill(value, i, i + repeat);
+          i += repeat;
+        }
+      }
+      lit = buildHuffman(lengths.subarray(0, nlen));
+      dist = buildHuffman(lengths.subarray(nlen));
+    } else {
+      throw "Invalid compressed data";
+    }
+    while (true) {
+      var sym = decodeSymbol(lit);
+      if (sym < 256) {
+        ensure(1);
+        out[outLen++] = sym;
+      } else if (sym == 256) {
+        break;
+      } else {
+        sym -= 257;
+        var len = t.lengthBase[sym] + bits(t.lengthExtra[sym]);
+        var dsym = decodeSymbol(dist);
+        var from = outLen - t.distBase[dsym] - bits(t.distExtra[dsym]);
+        ensure(len);
+        for (var i = 0; i < len; i++) {
+          out[outLen++] = out[from + i];
+        }
+      }
+    }
+  } while (!last);
+  return out.subarray(0, outLen);
+}
+
+function decompressString(b64) {
+  var raw = atob(b64);
+  var data = new Uint8Array(raw.length);
+  for (var i = 0; i < raw.length; i++) {
+    data[i] = raw.charCodeAt(i);
+  }
+  return new TextDecoder("utf-8").decode(inflate(data));
+}
+
+if (typeof pcbdata == "string") {
+  pcbdata = JSON.parse(decompressString(pcbdata));
+}
+
 var storagePrefix = 'KiCad_HTML_BOM__' + pcbdata.metadata.title + '__' +
   pcbdata.metadata.revision + '__';
 var storage;
@@ -28,7 +28,23 @@ import shutil
 import os
 import random
 import pprint
+import math
 import wx
+try:
+    import numpy
+except ImportError:
+    # Reported by FillArea.Run(), the plugin still registers without numpy
+    numpy = None
+try:
+    from .SpatialIndex import Obstacles, ObstacleIndex
+except (ImportError, ValueError):
+    # Used as a script or from the python console
+    from SpatialIndex import Obstacles, ObstacleIndex
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport: always run in one process
+    ProcessPoolExecutor = None
 
 
 def wxPrint(msg):
@@ -41,6 +57,9 @@ if sys.version[0] == '2':  # maui
 else:
     xrange = range
 
+NUMPY_MISSING = "Via Stitching requires numpy, install it for the python " \
+    "interpreter of KiCad."
+
 
 """
 #  This script fills all areas of a specific net with Vias (Via Stitching)
@@ -67,6 +86,9 @@ FillArea.FillArea().SetDebug().SetNetname("GND").SetStepMM(1.27).SetSizeMM(0.6).
 # SetSizeMM: Change Via copper size (in mm)
 # SetDrillMM: Change Via drill hole size (in mm)
 # SetClearanceMM: Change clearance for Via (in mm)
+# SetWorkers: Search via positions in this number of processes (default 1)
+# Each process works on tiles of the board. Meant for very large boards from
+# the command line, worker processes may not start from within pcbnew.
 
 #  You can also use it in command line. In this case, the first parameter is
 # the pcb file path. Default options are applied.
@@ -74,17 +96,388 @@ FillArea.FillArea().SetDebug().SetNetname("GND").SetStepMM(1.27).SetSizeMM(0.6).
 """
 
 
-class ViaObject:
+def PolySetRings(poly_set):
+    """
+    Outlines and holes of a SHAPE_POLY_SET as a list of (n, 2) arrays
+    """
+    rings = []
+    for i in range(poly_set.OutlineCount()):
+        chains = [poly_set.Outline(i)] + [poly_set.Hole(i, h) for h in range(poly_set.HoleCount(i))]
+        for chain in chains:
+            points = [(chain.CPoint(j).x, chain.CPoint(j).y) for j in range(chain.PointCount())]
+            if points:
+                rings.append(numpy.array(points, dtype=numpy.float64))
+    return rings
+
+
+def PointsInRings(rings, xs, ys):
+    """
+    Even-odd test of the grid of points xs * ys against all rings (holes
+    included), returns a (len(xs), len(ys)) bool array. xs must be sorted.
+    """
+    result = numpy.zeros((len(xs), len(ys)), dtype=bool)
+    if not rings:
+        return result
+    start = numpy.concatenate(rings)
+    end = numpy.concatenate([numpy.roll(ring, -1, axis=0) for ring in rings])
+    for j, y in enumerate(ys):
+        # Edges crossing the horizontal line of the row, same half open
+        # rule as the usual ray casting so that vertices are counted once
+        crossing = (start[:, 1] > y) != (end[:, 1] > y)
+        if not crossing.any():
+            continue
+        x0, y0 = start[crossing, 0], start[crossing, 1]
+        x1, y1 = end[crossing, 0], end[crossing, 1]
+        intersections = numpy.sort(x0 + (y - y0) * (x1 - x0) / (y1 - y0))
+        # Points are inside if an odd number of intersections is on their right
+        right = len(intersections) - numpy.searchsorted(intersections, xs, side='right')
+        result[:, j] = (right % 2) == 1
+    return result
+
+
+def PointsNearRings(rings, xs, ys, distance):
+    """
+    Returns a (len(xs), len(ys)) bool array of the points of the grid
+    xs * ys closer than distance to an edge of the rings. xs and ys must
+    be sorted.
+    """
+    result = numpy.zeros((len(xs), len(ys)), dtype=bool)
+    for ring in rings:
+        for k in range(len(ring)):
+            ax, ay = ring[k - 1]
+            bx, by = ring[k]
+            # Only points in the bounding box of the edge can be close to it
+            i0 = numpy.searchsorted(xs, min(ax, bx) - distance, side='left')
+            i1 = numpy.searchsorted(xs, max(ax, bx) + distance, side='right')
+            j0 = numpy.searchsorted(ys, min(ay, by) - distance, side='left')
+            j1 = numpy.searchsorted(ys, max(ay, by) + distance, side='right')
+            if i0 >= i1 or j0 >= j1:
+                continue
+            px = xs[i0:i1, numpy.newaxis] - ax
+            py = ys[numpy.newaxis, j0:j1] - ay
+            dx = bx - ax
+            dy = by - ay
+            length = dx * dx + dy * dy
+            if length > 0:
+                t = numpy.clip((px * dx + py * dy) / length, 0, 1)
+            else:
+                t = 0
+            squared_distance = (px - t * dx) ** 2 + (py - t * dy) ** 2
+            result[i0:i1, j0:j1] |= squared_distance <= distance * distance
+    return result
+
+
+def BoxesOverlap(a, b, margin=0):
+    """
+    True if the boxes (min x, min y, max x, max y) a and b are closer than margin
+    """
+    return (a[0] - margin <= b[2] and b[0] <= a[2] + margin and
+            a[1] - margin <= b[3] and b[1] <= a[3] + margin)
+
+
+def RingsTouchCircles(rings, xs, ys, radius):
+    """
+    Returns a (len(xs), len(ys)) bool array of the circles of radius
+    centered on the grid of points xs * ys overlapping the rings
+    """
+    return PointsInRings(rings, xs, ys) | PointsNearRings(rings, xs, ys, radius)
+
+
+def RingsContainCircles(rings, xs, ys, radius):
+    """
+    Returns a (len(xs), len(ys)) bool array of the circles of radius
+    centered on the grid of points xs * ys inside of the rings
+    """
+    return PointsInRings(rings, xs, ys) & ~PointsNearRings(rings, xs, ys, radius)
+
+
+# Tiles of the board per worker process, smaller tiles balance the load better
+TILES_PER_WORKER = 4
+
+
+class AreaPolygons:
+
+    """
+    AreaPolygons holds the polygons of a zone, read once from pcbnew
+    """
+
+    def __init__(self, area):
+        self.netname = area.GetNetname()
+        self.layer = area.GetLayer()
+        self.layer_name = area.GetLayerName()
+        self.is_selected = area.IsSelected()
+        self.priority = area.GetPriority()
+        self.clearance = area.GetClearance()
+        self.is_keepout = area.GetIsKeepout()
+        self.outline = PolySetRings(area.Outline())
+        self.filled = PolySetRings(area.GetFilledPolysList())
+        self.bbox = None
+        if self.outline:
+            points = numpy.concatenate(self.outline)
+            self.bbox = (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max())
+
+
+class ViaGrid:
+
+    """
+    ViaGrid holds all possible Via positions of the board on a regular grid.
+    reasons[x][y] is the REASON_* code of the cell, REASON_OK marks a cell
+    where a Via can be placed. pos_x[x] and pos_y[y] are the board
+    coordinates of the cell centers.
+    A tile of the board grid starts at cell first_x, first_y of it and has
+    the same cell coordinates.
+    """
+
+    def __init__(self, origin_x, origin_y, pitch, x_count, y_count, reason, first_x=0, first_y=0):
+        self.origin_x = float(origin_x)
+        self.origin_y = float(origin_y)
+        self.pitch = float(pitch)
+        self.first_x = first_x
+        self.first_y = first_y
+        self.reasons = numpy.full((x_count, y_count), reason, dtype=numpy.int8)
+        self.pos_x = self.origin_x + numpy.arange(first_x, first_x + x_count) * self.pitch
+        self.pos_y = self.origin_y + numpy.arange(first_y, first_y + y_count) * self.pitch
+
+    def Window(self, min_x, min_y, max_x, max_y):
+        """
+        Slices of the cells covering the given board rectangle, clamped
+        to the grid
+        """
+        x_count, y_count = self.reasons.shape
+        start_x = max(int(math.floor((min_x - self.origin_x) / self.pitch)) - self.first_x, 0)
+        stop_x = min(int(math.ceil((max_x - self.origin_x) / self.pitch)) + 1 - self.first_x, x_count)
+        start_y = max(int(math.floor((min_y - self.origin_y) / self.pitch)) - self.first_y, 0)
+        stop_y = min(int(math.ceil((max_y - self.origin_y) / self.pitch)) + 1 - self.first_y, y_count)
+        return (slice(start_x, max(stop_x, start_x)), slice(start_y, max(stop_y, start_y)))
+
+    def Bounds(self, margin=0):
+        """
+        Board rectangle (min x, min y, max x, max y) of the cell centers
+        grown by margin
+        """
+        return (self.pos_x[0] - margin, self.pos_y[0] - margin, self.pos_x[-1] + margin, self.pos_y[-1] + margin)
+
+    def Tiles(self, count):
+        """
+        Splits the grid in about count tiles of similar size, copies of
+        the cells in them
+        """
+        x_count, y_count = self.reasons.shape
+        tiles_x = max(1, min(x_count, int(round(math.sqrt(count * x_count / float(y_count))))))
+        tiles_y = max(1, min(y_count, int(math.ceil(count / float(tiles_x)))))
+        tiles = []
+        for columns in numpy.array_split(numpy.arange(x_count), tiles_x):
+            for rows in numpy.array_split(numpy.arange(y_count), tiles_y):
+                tile = ViaGrid(self.origin_x, self.origin_y, self.pitch, len(columns), len(rows), 0,
+                               self.first_x + int(columns[0]), self.first_y + int(rows[0]))
+                tile.reasons[:] = self.reasons[columns[0]:columns[-1] + 1, rows[0]:rows[-1] + 1]
+                tiles.append(tile)
+        return tiles
+
+    def Paste(self, tile):
+        """
+        Copies the cells of tile back at their place in the grid
+        """
+        x_count, y_count = tile.reasons.shape
+        x = tile.first_x - self.first_x
+        y = tile.first_y - self.first_y
+        self.reasons[x:x + x_count, y:y + y_count] = tile.reasons
+
+    def Cells(self, reason, window=None):
+        """
+        List of (x, y) indexes of the cells set to reason, ordered by x then y
+        """
+        if window is None:
+            window = (slice(0, self.reasons.shape[0]), slice(0, self.reasons.shape[1]))
+        xs, ys = numpy.nonzero(self.reasons[window] == reason)
+        return list(zip((xs + window[0].start).tolist(), (ys + window[1].start).tolist()))
+
+    def CornerPoints(self, window, offset):
+        """
+        Sorted coordinates of the corners (center +/- offset) of the cells
+        in window, truncated like wxPoint does, and the index of the
+        lower and upper corner of each cell column and row in them
+        """
+        corners_x = numpy.trunc(numpy.concatenate((self.pos_x[window[0]] - offset, self.pos_x[window[0]] + offset)))
+        corners_y = numpy.trunc(numpy.concatenate((self.pos_y[window[1]] - offset, self.pos_y[window[1]] + offset)))
+        xs, index_x = numpy.unique(corners_x, return_inverse=True)
+        ys, index_y = numpy.unique(corners_y, return_inverse=True)
+        return xs, ys, index_x.reshape(2, -1), index_y.reshape(2, -1)
+
+    @staticmethod
+    def CornerValues(values, index_x, index_y):
+        """
+        Values of the 4 corners of every cell, shape (4, columns, rows)
+        """
+        return numpy.array([values[numpy.ix_(index_x[i], index_y[j])] for i in (0, 1) for j in (0, 1)])
+
+    def MarkCollisions(self, obstacles, candidate, reason):
+        """
+        Sets the cells set to candidate closer to an obstacle than its
+        reach to reason
+        """
+        xs, ys = numpy.nonzero(self.reasons == candidate)
+        hit = ObstacleIndex(obstacles).Collide(self.pos_x[xs], self.pos_y[ys])
+        self.reasons[xs[hit], ys[hit]] = reason
+
+
+class ViaCandidates:
 
     """
-    ViaObject holds all information of a single Via
+    ViaCandidates holds what the search of possible Via positions needs
+    from the board: areas, pads, tracks and drawings. It is read once
+    from pcbnew and is plain python and numpy data, so that it can be sent
+    to worker processes.
     """
 
-    def __init__(self, x, y, pos_x, pos_y):
-        self.X = x
-        self.Y = y
-        self.PosX = pos_x
-        self.PosY = pos_y
+    def __init__(self, netname, size, clearance, only_selected_area):
+        self.netname = netname
+        self.size = size
+        self.clearance = clearance
+        self.only_selected_area = only_selected_area
+        self.max_target_area_clearance = 0
+        self.areas = []
+        self.pads = Obstacles()
+        self.tracks = Obstacles()
+        # Bounding boxes (min x, min y, max x, max y) of drawings grown by the via size and clearance
+        self.drawings = []
+
+    def AreaRadius(self, area):
+        # Radius is half the size of the via plus the clearance of the via or the area
+        return max(self.clearance, area.clearance) + self.size / 2
+
+    def Crop(self, min_x, min_y, max_x, max_y):
+        """
+        Copy holding only the areas, pads, tracks and drawings that can
+        change the Vias of the given board rectangle
+        """
+        box = (min_x, min_y, max_x, max_y)
+        cropped = ViaCandidates(self.netname, self.size, self.clearance, self.only_selected_area)
+        cropped.max_target_area_clearance = self.max_target_area_clearance
+        cropped.areas = [area for area in self.areas
+                         if area.bbox is not None and BoxesOverlap(area.bbox, box, self.AreaRadius(area))]
+        cropped.pads = self.pads.Crop(*box)
+        cropped.tracks = self.tracks.Crop(*box)
+        cropped.drawings = [drawing for drawing in self.drawings if BoxesOverlap(drawing, box)]
+        return cropped
+
+    def Evaluate(self, grid, log=None, trace=None):
+        """
+        Sets the cells of grid to REASON_OK where a Via can be placed or
+        to the reason why it can not. log(msg) reports the progress,
+        trace(title) is called after each step.
+        """
+        log = log or (lambda msg: None)
+        trace = trace or (lambda title: None)
+
+        self.MarkTargetAreas(grid, log)
+        trace("\nPost target areas:")
+
+        # Enum all vias
+        log("Processing all vias of target area...")
+        self.CheckViaInAllAreas(grid)
+        trace("\nPost areas:")
+
+        # Same job with all pads => all pads on all layers
+        log("Processing all pads...")
+        grid.MarkCollisions(self.pads, FillArea.REASON_OK, FillArea.REASON_PAD)
+        trace("\nPost pads:")
+
+        # Same job with tracks => all tracks and vias on all layers
+        log("Processing all tracks...")
+        grid.MarkCollisions(self.tracks, FillArea.REASON_OK, FillArea.REASON_TRACK)
+        trace("\nPost tracks:")
+
+        # Same job with existing text
+        log("Processing all existing drawings...")
+        for drawing in self.drawings:
+            grid.reasons[grid.Window(*drawing)] = FillArea.REASON_DRAWING
+        trace("Post Drawnings:")
+
+    def MarkTargetAreas(self, grid, log):
+        '''
+        Search possible positions for vias on the target net: cells that are
+        inside a filled target area and not on its edge
+        '''
+        rectangle = grid.reasons
+        # Enum all target areas
+        for area in self.areas:
+            # KeepOuts are filtered because they have no name
+            if area.netname != self.netname:
+                continue
+            log("Processing Target Area: %s, LayerName: %s..." % (area.netname, area.layer_name))
+
+            if (not self.only_selected_area) or (self.only_selected_area and area.is_selected):         # All areas or only the selected area
+                offset = self.AreaRadius(area)
+                # Cells farther than offset from the area bounding box can not be inside the area
+                min_x, min_y, max_x, max_y = area.bbox
+                window = grid.Window(min_x - offset, min_y - offset, max_x + offset, max_y + offset)
+                # All 4 corners of the via are tested (upper, lower, left, right) but not the center
+                # at once against the polygons of the area
+                xs, ys, index_x, index_y = grid.CornerPoints(window, offset)
+                # Collides with a filled area
+                hit_test_area = grid.CornerValues(PointsInRings(area.filled, xs, ys),
+                                                  index_x, index_y).all(axis=0)
+                # Collides with an edge/corner
+                hit_test_edge = grid.CornerValues(PointsNearRings(area.outline, xs, ys, area.clearance),
+                                                  index_x, index_y).any(axis=0)
+
+                # Positions not found in another "target area" yet, inside the area and not on an edge
+                # are possible vias
+                cells = rectangle[window]
+                cells[(cells == FillArea.REASON_NO_SIGNAL) & hit_test_area & ~hit_test_edge] = FillArea.REASON_OK
+
+    def CheckViaInAllAreas(self, grid):
+        '''
+        Marks the possible vias of grid colliding with another area: closer
+        to a keepout area or to an area of another net than their clearance
+        '''
+        # Areas of the target net by layer, they can override areas of other nets with a lower priority
+        target_areas = {}
+        for area in self.areas:
+            if area.netname == self.netname:
+                target_areas.setdefault(area.layer, []).append(area)
+
+        rectangle = grid.reasons
+        # Enum all area
+        for area in self.areas:
+            if area.netname == self.netname or area.bbox is None:                       # Only process areas that are not in the target net
+                continue
+            radius = self.AreaRadius(area)
+            min_x, min_y, max_x, max_y = area.bbox
+            window = grid.Window(min_x - radius, min_y - radius, max_x + radius, max_y + radius)
+            cells = rectangle[window]
+            candidates = cells == FillArea.REASON_OK
+            if not candidates.any():
+                continue
+            xs = grid.pos_x[window[0]]
+            ys = grid.pos_y[window[1]]
+
+            # Via overlaps the zone (e.g. KeepOut)
+            hit_test_zone = RingsTouchCircles(area.outline, xs, ys, radius)
+            if area.is_keepout:
+                cells[candidates & hit_test_zone] = FillArea.REASON_KEEPOUT             # Collides with keepout
+                continue
+
+            # Collides with a filled area of another signal (e.g. on another layer)
+            collide = RingsTouchCircles(area.filled, xs, ys, radius)
+            # Overlapping the zone is fine where an area of the target net with a higher priority
+            # on the same layer covers the whole via
+            covered = numpy.zeros_like(collide)
+            for target_area in target_areas.get(area.layer, []):
+                if target_area.priority > area.priority:
+                    covered |= RingsContainCircles(target_area.outline, xs, ys, radius)
+            collide |= hit_test_zone & ~covered
+            cells[candidates & collide] = FillArea.REASON_OTHER_SIGNAL
+
+
+def EvaluateTile(job):
+    """
+    Searches the possible Vias of one tile, run in a worker process
+    """
+    candidates, tile = job
+    candidates.Evaluate(tile)
+    return tile
 
 
 class FillArea:
@@ -133,6 +526,8 @@ class FillArea:
         if self.netname is None:
             self.SetNetname("GND")
 
+        self.workers = 1
+
         self.tmp_dir = None
 
     def SetFile(self, filename):
@@ -189,8 +584,12 @@ class FillArea:
         self.clearance = float(FromMM(s))
         return self
 
+    def SetWorkers(self, n):
+        self.workers = max(int(n), 1)
+        return self
+
     def GetReasonSymbol(self, reason):
-        if isinstance(reason, ViaObject):
+        if reason == self.REASON_OK:
             return "X"
         if reason == self.REASON_NO_SIGNAL:
             return " "
@@ -213,13 +612,11 @@ class FillArea:
         """debuging tool
         Print board in ascii art
         """
-        print("_" * (len(rectangle)+2))
-        for y in range(len(rectangle[0])):
-            print("|", end='')
-            for x in range(len(rectangle)):
-                print("%s" % self.GetReasonSymbol(rectangle[x][y]), end='')
-            print("|")
-        print("_" * (len(rectangle)+2))
+        x_count, y_count = rectangle.shape
+        print("_" * (x_count+2))
+        for y in range(y_count):
+            print("|" + "".join(self.GetReasonSymbol(reason) for reason in rectangle[:, y].tolist()) + "|")
+        print("_" * (x_count+2))
         print('''
 OK           = 'X'
 NO_SIGNAL    = ' '
@@ -251,56 +648,6 @@ STEP         = '-'
         filler = ZONE_FILLER(self.pcb)
         filler.Fill(self.pcb.Zones())
 
-    def CheckViaInAllAreas(self, via, all_areas):
-        '''
-        Checks if an existing Via collides with another area
-        '''
-        # Enum all area
-        for area in all_areas:
-            area_layer = area.GetLayer()
-            area_clearance = area.GetClearance()
-            area_priority = area.GetPriority()
-            is_keepout_area = area.GetIsKeepout()
-            is_target_net = (area.GetNetname() == self.netname)  # (area.GetNetname().upper() == self.netname)
-            # wx.LogMessage(area.GetNetname()) #wx.LogMessage(area.GetNetname().upper())
-
-            if (not is_target_net):                                                         # Only process areas that are not in the target net
-                # Offset is half the size of the via plus the clearance of the via or the area
-                offset = max(self.clearance, area_clearance) + self.size / 2
-                for dx in [-offset, offset]:
-                    # All 4 corners of the via are testet (upper, lower, left, right) but not the center
-                    for dy in [-offset, offset]:
-                        point_to_test = wxPoint(via.PosX + dx, via.PosY + dy)
-
-                        hit_test_area = area.HitTestFilledArea(point_to_test)             # Collides with a filled area
-                        hit_test_edge = area.HitTestForEdge(point_to_test, 1)              # Collides with an edge/corner
-                        try:
-                            hit_test_zone = area.HitTestInsideZone(point_to_test)         # Is inside a zone (e.g. KeepOut)
-                        except:
-                            hit_test_zone = False
-                            wxPrint('exception: missing HitTestInsideZone: To Be Fixed')
-                            # hit_test_zone   = area.HitTest(point_to_test)              # Is inside a zone (e.g. KeepOut) kicad nightly 5.99
-                        if is_keepout_area and (hit_test_area or hit_test_edge or hit_test_zone):
-                            return self.REASON_KEEPOUT                                      # Collides with keepout
-
-                        elif (hit_test_area or hit_test_edge):
-                            # Collides with another signal (e.g. on another layer)
-                            return self.REASON_OTHER_SIGNAL
-
-                        elif hit_test_zone:
-                            # Check if the zone is higher priority than other zones of the target net in the same point
-                            #target_areas_on_same_layer = filter(lambda x: ((x.GetPriority() > area_priority) and (x.GetLayer() == area_layer) and (x.GetNetname().upper() == self.netname)), all_areas)
-                            target_areas_on_same_layer = filter(lambda x: ((x.GetPriority() > area_priority) and (
-                                x.GetLayer() == area_layer) and (x.GetNetname() == self.netname)), all_areas)
-                            for area_with_higher_priority in target_areas_on_same_layer:
-                                if area_with_higher_priority.HitTestInsideZone(point_to_test):
-                                    break                                                   # Area of target net has higher priority on this layer
-                            else:
-                                # Collides with another signal (e.g. on another layer)
-                                return self.REASON_OTHER_SIGNAL
-
-        return self.REASON_OK
-
     def ClearViaInStepSize(self, rectangle, x, y, distance):
         '''
         Stepsize==0
@@ -330,14 +677,110 @@ STEP         = '-'
               O   O   O   O
             O   O   O   O   O
         '''
-        for x_pos in range(x-distance, x+distance+1):
-            if (x_pos >= 0) and (x_pos < len(rectangle)):
-                distance_y = distance-abs(x-x_pos) if self.star else distance       # Star or Standard shape
-                for y_pos in range(y-distance_y, y+distance_y+1):
-                    if (y_pos >= 0) and (y_pos < len(rectangle[0])):
-                        if (x_pos == x) and (y_pos == y):
-                            continue
-                        rectangle[x_pos][y_pos] = self.REASON_STEP
+        x_count = rectangle.shape[0]
+        if self.star:
+            for x_pos in range(max(x-distance, 0), min(x+distance+1, x_count)):
+                distance_y = distance-abs(x-x_pos)
+                rectangle[x_pos, max(y-distance_y, 0):y+distance_y+1] = self.REASON_STEP
+        else:
+            rectangle[max(x-distance, 0):x+distance+1, max(y-distance, 0):y+distance+1] = self.REASON_STEP
+        rectangle[x, y] = self.REASON_OK
+
+    def PadObstacles(self, pads, min_clearance):
+        '''
+        Shapes of pads with the distance a via center has to keep from them
+        '''
+        obstacles = Obstacles()
+        for pad in pads:
+            reach = max(pad.GetClearance(), self.clearance, min_clearance) + (self.size / 2)
+            shape = pad.GetShape()
+            size = pad.GetSize()
+            pos = pad.ShapePos()
+            angle = math.radians(pad.GetOrientation() / 10.0)
+            if shape == PAD_SHAPE_CIRCLE:
+                obstacles.AddCircle(pos.x, pos.y, size.x / 2.0, reach)
+            elif shape == PAD_SHAPE_OVAL:
+                # Segment between the centers of the rounded ends, rotated like RotatePoint() does
+                radius = min(size.x, size.y) / 2.0
+                half = max(size.x, size.y) / 2.0 - radius
+                if size.x >= size.y:
+                    dx, dy = half * math.cos(angle), -half * math.sin(angle)
+                else:
+                    dx, dy = half * math.sin(angle), half * math.cos(angle)
+                obstacles.AddSegment(pos.x - dx, pos.y - dy, pos.x + dx, pos.y + dy, radius, reach)
+            elif shape in (PAD_SHAPE_RECT, PAD_SHAPE_ROUNDRECT):
+                radius = pad.GetRoundRectCornerRadius() if shape == PAD_SHAPE_ROUNDRECT else 0
+                obstacles.AddBox(pos.x, pos.y, size.x / 2.0 - radius, size.y / 2.0 - radius, angle, radius, reach)
+            else:
+                # Trapezoid, chamfered and custom pads: use the bounding box
+                bbox = pad.GetBoundingBox()
+                obstacles.AddBox(bbox.GetX() + bbox.GetWidth() / 2.0, bbox.GetY() + bbox.GetHeight() / 2.0,
+                                 bbox.GetWidth() / 2.0, bbox.GetHeight() / 2.0, 0, 0, reach)
+        return obstacles.Freeze()
+
+    def TrackObstacles(self, tracks, min_clearance):
+        '''
+        Shapes of tracks and vias with the distance a via center has to keep from them
+        '''
+        obstacles = Obstacles()
+        for track in tracks:
+            reach = max(track.GetClearance(), self.clearance, min_clearance) + (self.size / 2)
+            start = track.GetStart()
+            end = track.GetEnd()
+            obstacles.AddSegment(start.x, start.y, end.x, end.y, track.GetWidth() / 2.0, reach)
+        return obstacles.Freeze()
+
+    def GetViaCandidates(self):
+        '''
+        Reads the areas, pads, tracks and drawings of the board
+        '''
+        all_pads = self.pcb.GetPads()
+        all_tracks = self.pcb.GetTracks()
+        try:
+            all_drawings = filter(lambda x: x.GetClass() == 'PTEXT' and self.pcb.GetLayerID(
+                x.GetLayerName()) in (F_Cu, B_Cu), self.pcb.DrawingsList())
+        except:
+            all_drawings = filter(lambda x: x.GetClass() == 'PTEXT' and self.pcb.GetLayerID(
+                x.GetLayerName()) in (F_Cu, B_Cu), self.pcb.Drawings())
+            #wxPrint("exception on missing BOARD.DrawingsList")
+        all_areas = [self.pcb.GetArea(i) for i in xrange(self.pcb.GetAreaCount())]
+
+        candidates = ViaCandidates(self.netname, self.size, self.clearance, self.only_selected_area)
+        candidates.areas = [AreaPolygons(area) for area in all_areas]
+        for area in candidates.areas:
+            if area.netname == self.netname:
+                candidates.max_target_area_clearance = max(candidates.max_target_area_clearance, area.clearance)
+        candidates.pads = self.PadObstacles(all_pads, candidates.max_target_area_clearance)
+        candidates.tracks = self.TrackObstacles(all_tracks, candidates.max_target_area_clearance)
+        inter = float(self.clearance + self.size)
+        for draw in all_drawings:
+            bbox = draw.GetBoundingBox()
+            candidates.drawings.append((bbox.GetPosition().x - inter, bbox.GetPosition().y - inter,
+                                        bbox.GetPosition().x + bbox.GetSize().x + inter,
+                                        bbox.GetPosition().y + bbox.GetSize().y + inter))
+        return candidates
+
+    def EvaluateTiles(self, candidates, grid):
+        '''
+        Searches the possible vias in worker processes, on tiles of the grid.
+        Tiles do not overlap, each one is sent with the areas, pads, tracks and
+        drawings close enough to change its cells. Results come back in the
+        order of the tiles and are pasted at their place, so the grid is the
+        same as in a single process.
+        '''
+        tiles = grid.Tiles(self.workers * TILES_PER_WORKER)
+        wxPrint("Processing %d tiles in %d processes..." % (len(tiles), self.workers))
+        # Windows of drawings also cover the cells next to them, keep one more cell around tiles
+        jobs = [(candidates.Crop(*tile.Bounds(grid.pitch)), tile) for tile in tiles]
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            for tile in executor.map(EvaluateTile, jobs):
+                grid.Paste(tile)
+        finally:
+            executor.shutdown()
+        if self.debug:
+            wxPrint("Post tiles:")
+            self.PrintRect(grid.reasons)
 
     def Run(self):
         """
@@ -358,183 +801,34 @@ STEP         = '-'
             self.RefillBoardAreas()
             return                                          # no need to run the rest of logic
 
+        if numpy is None:
+            wx.LogError(NUMPY_MISSING)
+            return
+
         lboard = self.pcb.ComputeBoundingBox(False)
         origin = lboard.GetPosition()
 
-        # Create an initial rectangle: all is set to "REASON_NO_SIGNAL"
+        # Create an initial grid: all is set to "REASON_NO_SIGNAL"
         # get a margin to avoid out of range
         l_clearance = self.clearance + self.size
         x_limit = int((lboard.GetWidth() + l_clearance) / l_clearance) + 1
         y_limit = int((lboard.GetHeight() + l_clearance) / l_clearance) + 1
 
-        rectangle = [[self.REASON_NO_SIGNAL]*y_limit for i in xrange(x_limit)]
+        grid = ViaGrid(origin.x, origin.y, l_clearance, x_limit, y_limit, self.REASON_NO_SIGNAL)
+        rectangle = grid.reasons
 
-        all_pads = self.pcb.GetPads()
-        all_tracks = self.pcb.GetTracks()
-        try:
-            all_drawings = filter(lambda x: x.GetClass() == 'PTEXT' and self.pcb.GetLayerID(
-                x.GetLayerName()) in (F_Cu, B_Cu), self.pcb.DrawingsList())
-        except:
-            all_drawings = filter(lambda x: x.GetClass() == 'PTEXT' and self.pcb.GetLayerID(
-                x.GetLayerName()) in (F_Cu, B_Cu), self.pcb.Drawings())
-            #wxPrint("exception on missing BOARD.DrawingsList")
-        all_areas = [self.pcb.GetArea(i) for i in xrange(self.pcb.GetAreaCount())]
-        # target_areas    = filter(lambda x: (x.GetNetname().upper() == self.netname), all_areas)         # KeepOuts are filtered because they have no name
-        # KeepOuts are filtered because they have no name
-        target_areas = filter(lambda x: (x.GetNetname() == self.netname), all_areas)
-
-        via_list = []       # Create a list of existing vias => faster than scanning through the whole rectangle
-        max_target_area_clearance = 0
-
-        # Enum all target areas (Search possible positions for vias on the target net)
-        for area in target_areas:
-            wxPrint("Processing Target Area: %s, LayerName: %s..." % (area.GetNetname(), area.GetLayerName()))
-
-            is_selected_area = area.IsSelected()
-            area_clearance = area.GetClearance()
-            if max_target_area_clearance < area_clearance:
-                max_target_area_clearance = area_clearance
-
-            if (not self.only_selected_area) or (self.only_selected_area and is_selected_area):         # All areas or only the selected area
-                # Check every possible point in the virtual coordinate system
-                for x in xrange(len(rectangle)):
-                    for y in xrange(len(rectangle[0])):
-                        # No other "target area" found yet => go on with processing
-                        if rectangle[x][y] == self.REASON_NO_SIGNAL:
-                            current_x = origin.x + (x * l_clearance)                                    # Center of the via
-                            current_y = origin.y + (y * l_clearance)
-
-                            test_result = True                                                          # Start with true, if a check fails, it is set to false
-
-                            # Offset is half the size of the via plus the clearance of the via or the area
-                            offset = max(self.clearance, area_clearance) + self.size / 2
-                            for dx in [-offset, offset]:
-                                # All 4 corners of the via are testet (upper, lower, left, right) but not the center
-                                for dy in [-offset, offset]:
-                                    point_to_test = wxPoint(current_x + dx, current_y + dy)
-                                    hit_test_area = area.HitTestFilledArea(point_to_test)             # Collides with a filled area
-                                    # Collides with an edge/corner
-                                    hit_test_edge = area.HitTestForEdge(point_to_test, area_clearance)
-
-                                    # test_result only remains true if the via is inside an area and not on an edge
-                                    test_result &= (hit_test_area and not hit_test_edge)
-
-                            if test_result:
-                                # Create a via object with information about the via and place it in the rectangle
-                                via_obj = ViaObject(x=x, y=y, pos_x=current_x, pos_y=current_y)
-                                rectangle[x][y] = via_obj
-                                via_list.append(via_obj)
-
-        if self.debug:
-            wxPrint("\nPost target areas:")
-            self.PrintRect(rectangle)
-
-        # Enum all vias
-        wxPrint("Processing all vias of target area...")
-        for via in via_list:
-            reason = self.CheckViaInAllAreas(via, all_areas)
-            if reason != self.REASON_OK:
-                rectangle[via.X][via.Y] = reason
-
-        if self.debug:
-            wxPrint("\nPost areas:")
-            self.PrintRect(rectangle)
+        candidates = self.GetViaCandidates()
 
-        # Same job with all pads => all pads on all layers
-        wxPrint("Processing all pads...")
-        for pad in all_pads:
-            local_offset = max(pad.GetClearance(), self.clearance, max_target_area_clearance) + (self.size / 2)
-            max_size = max(pad.GetSize().x, pad.GetSize().y)
-
-            start_x = int(floor(((pad.GetPosition().x - (max_size / 2.0 + local_offset)) - origin.x) / l_clearance))
-            stop_x = int(ceil(((pad.GetPosition().x + (max_size / 2.0 + local_offset)) - origin.x) / l_clearance))
-
-            start_y = int(floor(((pad.GetPosition().y - (max_size / 2.0 + local_offset)) - origin.y) / l_clearance))
-            stop_y = int(ceil(((pad.GetPosition().y + (max_size / 2.0 + local_offset)) - origin.y) / l_clearance))
-
-            for x in range(start_x, stop_x + 1):
-                for y in range(start_y, stop_y + 1):
-                    try:
-                        if isinstance(rectangle[x][y], ViaObject):
-                            start_rect = wxPoint(origin.x + (l_clearance * x) - local_offset,
-                                                 origin.y + (l_clearance * y) - local_offset)
-                            size_rect = wxSize(2 * local_offset, 2 * local_offset)
-                            if pad.HitTest(EDA_RECT(start_rect, size_rect), False):
-                                rectangle[x][y] = self.REASON_PAD
-                    except:
-                        wxPrint("exception on Processing all pads...")
-        if self.debug:
-            wxPrint("\nPost pads:")
-            self.PrintRect(rectangle)
-
-        # Same job with tracks => all tracks on all layers
-        wxPrint("Processing all tracks...")
-        for track in all_tracks:
-            start_x = track.GetStart().x
-            start_y = track.GetStart().y
-
-            stop_x = track.GetEnd().x
-            stop_y = track.GetEnd().y
-
-            if start_x > stop_x:
-                d = stop_x
-                stop_x = start_x
-                start_x = d
-
-            if start_y > stop_y:
-                d = stop_y
-                stop_y = start_y
-                start_y = d
-
-            osx = start_x
-            osy = start_y
-            opx = stop_x
-            opy = stop_y
-
-            clearance = max(track.GetClearance(), self.clearance, max_target_area_clearance) + (self.size / 2) + (track.GetWidth() / 2)
-
-            start_x = int(floor(((start_x - clearance) - origin.x) / l_clearance))
-            stop_x = int(ceil(((stop_x + clearance) - origin.x) / l_clearance))
-
-            start_y = int(floor(((start_y - clearance) - origin.y) / l_clearance))
-            stop_y = int(ceil(((stop_y + clearance) - origin.y) / l_clearance))
-
-            for x in range(start_x, stop_x + 1):
-                for y in range(start_y, stop_y + 1):
-                    try:
-                        if isinstance(rectangle[x][y], ViaObject):
-                            start_rect = wxPoint(origin.x + (l_clearance * x) - clearance,
-                                                 origin.y + (l_clearance * y) - clearance)
-                            size_rect = wxSize(2 * clearance, 2 * clearance)
-                            if track.HitTest(EDA_RECT(start_rect, size_rect), False):
-                                rectangle[x][y] = self.REASON_TRACK
-                    except:
-                        wxPrint("exception on Processing all tracks...")
-
-        if self.debug:
-            wxPrint("\nPost tracks:")
-            self.PrintRect(rectangle)
-
-        # Same job with existing text
-        wxPrint("Processing all existing drawings...")
-        for draw in all_drawings:
-            inter = float(self.clearance + self.size)
-            bbox = draw.GetBoundingBox()
-
-            start_x = int(floor(((bbox.GetPosition().x - inter) - origin.x) / l_clearance))
-            stop_x = int(ceil(((bbox.GetPosition().x + (bbox.GetSize().x + inter)) - origin.x) / l_clearance))
-
-            start_y = int(floor(((bbox.GetPosition().y - inter) - origin.y) / l_clearance))
-            stop_y = int(ceil(((bbox.GetPosition().y + (bbox.GetSize().y + inter)) - origin.y) / l_clearance))
-
-            for x in range(start_x, stop_x + 1):
-                for y in range(start_y, stop_y + 1):
-                    rectangle[x][y] = self.REASON_DRAWING
-
-        if self.debug:
-            wxPrint("Post Drawnings:")
-            self.PrintRect(rectangle)
+        if self.workers > 1 and ProcessPoolExecutor is not None:
+            self.EvaluateTiles(candidates, grid)
+        else:
+            def Trace(title):
+                if self.debug:
+                    wxPrint(title)
+                    self.PrintRect(rectangle)
+            candidates.Evaluate(grid, wxPrint, Trace)
 
+        # Always done on the whole grid so that vias on both sides of tile seams keep the step
         wxPrint("Remove vias to guarantee step size...")
         clear_distance = 0
         if self.step != 0.0:
@@ -542,22 +836,22 @@ STEP         = '-'
             clear_distance = int((self.step+l_clearance) / l_clearance)
 
         via_placed = 0
-        for x in xrange(len(rectangle)):
-            for y in xrange(len(rectangle[0])):
-                if isinstance(rectangle[x][y], ViaObject):
-                    if clear_distance:
-                        self.ClearViaInStepSize(rectangle, x, y, clear_distance)
-
-                    via = rectangle[x][y]
-                    ran_x = 0
-                    ran_y = 0
-
-                    if self.random:
-                        ran_x = (random.random() * l_clearance / 2.0) - (l_clearance / 4.0)
-                        ran_y = (random.random() * l_clearance / 2.0) - (l_clearance / 4.0)
-
-                    self.AddVia(wxPoint(via.PosX + ran_x, via.PosY + ran_y), via.X, via.Y)
-                    via_placed += 1
+        for x, y in grid.Cells(self.REASON_OK):
+            # Skip positions removed by the step size of a via placed before
+            if rectangle[x, y] != self.REASON_OK:
+                continue
+            if clear_distance:
+                self.ClearViaInStepSize(rectangle, x, y, clear_distance)
+
+            ran_x = 0
+            ran_y = 0
+
+            if self.random:
+                ran_x = (random.random() * l_clearance / 2.0) - (l_clearance / 4.0)
+                ran_y = (random.random() * l_clearance / 2.0) - (l_clearance / 4.0)
+
+            self.AddVia(wxPoint(grid.pos_x[x] + ran_x, grid.pos_y[y] + ran_y), x, y)
+            via_placed += 1
 
         if self.debug:
             wxPrint("\nFinal result:")
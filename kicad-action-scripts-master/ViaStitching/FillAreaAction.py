@@ -70,7 +70,10 @@ class FillAreaAction(pcbnew.ActionPlugin):
 
         PopulateNets("GND", a)
         modal_result = a.ShowModal()
-        if modal_result == wx.ID_OK:
+        if modal_result == wx.ID_OK and FillArea.numpy is None:
+            wx.MessageBox(FillArea.NUMPY_MISSING, "Via Stitching",
+                          wx.OK | wx.ICON_ERROR)
+        elif modal_result == wx.ID_OK:
             wx.LogMessage('Via Stitching: Version 1.5')
             if 1:  # try:
                 fill = FillArea.FillArea()
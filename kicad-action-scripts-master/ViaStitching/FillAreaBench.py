@@ -0,0 +1,225 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#  FillAreaBench.py
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+
+from __future__ import print_function
+import argparse
+import multiprocessing
+import random
+import timeit
+import pcbnew
+import FillArea
+
+
+"""
+#  Benchmark of FillArea on synthetic boards
+#
+#  Run it from this directory with the python interpreter of KiCad:
+python FillAreaBench.py
+python FillAreaBench.py large --size 0.4 --clearance 0.2 --repeat 1
+python FillAreaBench.py medium --save medium.kicad_pcb
+python FillAreaBench.py large --workers 8
+
+#  With --workers N each board is also filled with 2, 4, .. N worker
+# processes, the speedup over one process is reported and the vias are
+# checked to be the same.
+
+#  Each synthetic board is filled with a GND zone on both copper layers and
+# holds randomly placed pads, tracks and texts of another net.
+"""
+
+# name: (width mm, height mm, pads, tracks, texts)
+SYNTHETIC_BOARDS = {
+    'small': (100, 80, 200, 150, 10),
+    'medium': (200, 150, 1000, 800, 40),
+    'large': (300, 400, 4000, 3000, 100),
+}
+
+
+def RandomPoint(rnd, width, height, margin):
+    return pcbnew.wxPoint(rnd.uniform(margin, width - margin),
+                          rnd.uniform(margin, height - margin))
+
+
+def SyntheticBoard(width_mm, height_mm, pads, tracks, texts, seed=0):
+    rnd = random.Random(seed)
+    board = pcbnew.BOARD()
+    gnd = pcbnew.NETINFO_ITEM(board, "GND")
+    board.Add(gnd)
+    signal = pcbnew.NETINFO_ITEM(board, "SIGNAL")
+    board.Add(signal)
+
+    width = pcbnew.FromMM(width_mm)
+    height = pcbnew.FromMM(height_mm)
+    margin = pcbnew.FromMM(2)
+    corners = [(0, 0), (width, 0), (width, height), (0, height)]
+    for i in range(len(corners)):
+        edge = pcbnew.DRAWSEGMENT(board)
+        edge.SetLayer(pcbnew.Edge_Cuts)
+        edge.SetStart(pcbnew.wxPoint(*corners[i - 1]))
+        edge.SetEnd(pcbnew.wxPoint(*corners[i]))
+        edge.SetWidth(pcbnew.FromMM(0.1))
+        board.Add(edge)
+
+    for layer in (pcbnew.F_Cu, pcbnew.B_Cu):
+        zone = pcbnew.ZONE_CONTAINER(board)
+        zone.SetLayer(layer)
+        zone.SetNetCode(gnd.GetNet())
+        outline = zone.Outline()
+        outline.NewOutline()
+        for x, y in corners:
+            outline.Append(x, y)
+        board.Add(zone)
+
+    for i in range(pads):
+        module = pcbnew.MODULE(board)
+        position = RandomPoint(rnd, width, height, margin)
+        module.SetPosition(position)
+        board.Add(module)
+        pad = pcbnew.D_PAD(module)
+        pad.SetShape(rnd.choice([pcbnew.PAD_SHAPE_RECT, pcbnew.PAD_SHAPE_ROUNDRECT,
+                                 pcbnew.PAD_SHAPE_CIRCLE, pcbnew.PAD_SHAPE_OVAL]))
+        pad.SetOrientation(rnd.choice([0, 0, 900, 450]))
+        pad.SetAttribute(pcbnew.PAD_ATTRIB_SMD)
+        pad.SetLayerSet(pad.SMDMask())
+        pad.SetSize(pcbnew.wxSize(pcbnew.FromMM(rnd.choice([0.6, 1, 1.5])),
+                                  pcbnew.FromMM(rnd.choice([0.6, 1, 2]))))
+        pad.SetPosition(position)
+        pad.SetLocalCoord()
+        pad.SetNetCode(signal.GetNet())
+        module.Add(pad)
+
+    for i in range(tracks):
+        track = pcbnew.TRACK(board)
+        start = RandomPoint(rnd, width, height, margin)
+        length = pcbnew.FromMM(rnd.uniform(1, 20))
+        if rnd.random() < 0.5:
+            end = pcbnew.wxPoint(min(start.x + length, width - margin), start.y)
+        else:
+            end = pcbnew.wxPoint(start.x, min(start.y + length, height - margin))
+        track.SetStart(start)
+        track.SetEnd(end)
+        track.SetWidth(pcbnew.FromMM(rnd.choice([0.2, 0.25, 0.5])))
+        track.SetLayer(rnd.choice([pcbnew.F_Cu, pcbnew.B_Cu]))
+        track.SetNetCode(signal.GetNet())
+        board.Add(track)
+
+    for i in range(texts):
+        text = pcbnew.TEXTE_PCB(board)
+        text.SetText("TEXT%d" % i)
+        text.SetTextSize(pcbnew.wxSize(pcbnew.FromMM(1.5), pcbnew.FromMM(1.5)))
+        text.SetPosition(RandomPoint(rnd, width, height, pcbnew.FromMM(10)))
+        text.SetLayer(rnd.choice([pcbnew.F_Cu, pcbnew.B_Cu]))
+        board.Add(text)
+
+    pcbnew.ZONE_FILLER(board).Fill(board.Zones())
+    return board
+
+
+def AddedVias(board):
+    return sorted((t.GetPosition().x, t.GetPosition().y) for t in board.GetTracks()
+                  if t.Type() == pcbnew.PCB_VIA_T and t.GetTimeStamp() == 33)
+
+
+def WorkerCounts(workers):
+    """
+    1, 2, 4, .. up to and including workers
+    """
+    counts = [1]
+    while counts[-1] * 2 < workers:
+        counts.append(counts[-1] * 2)
+    if workers > 1:
+        counts.append(workers)
+    return counts
+
+
+def RunFillArea(board, args, workers=1):
+    fill = FillArea.FillArea()
+    fill.SetPCB(board)
+    fill.SetNetname("GND")
+    fill.SetStepMM(args.step)
+    fill.SetSizeMM(args.size)
+    fill.SetDrillMM(args.drill)
+    fill.SetClearanceMM(args.clearance)
+    if args.star:
+        fill.SetStar()
+    fill.SetWorkers(workers)
+    fill.Run()
+
+
+def BenchBoard(name, args):
+    width, height, pads, tracks, texts = SYNTHETIC_BOARDS[name]
+    pitch = args.size + args.clearance
+    print("%-7s %dx%d mm, %d cells, %d pads, %d tracks:" % (
+        name, width, height,
+        int(width / pitch + 2) * int(height / pitch + 2),
+        pads, tracks))
+    serial = None
+    board = None
+    for workers in WorkerCounts(args.workers):
+        best = None
+        for i in range(args.repeat):
+            # Vias are added to the board, each run starts on a new one
+            board = SyntheticBoard(width, height, pads, tracks, texts, args.seed)
+            start = timeit.default_timer()
+            RunFillArea(board, args, workers)
+            elapsed = timeit.default_timer() - start
+            best = elapsed if best is None else min(best, elapsed)
+        vias = AddedVias(board)
+        if serial is None:
+            serial = (best, vias)
+        elif vias != serial[1]:
+            raise AssertionError("%d workers placed other vias than 1 worker" % workers)
+        print("  %2d workers: %d vias in %.2f s, speedup %.2f" % (
+            workers, len(vias), best, serial[0] / best))
+    if args.save:
+        board.Save(args.save)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='FillArea benchmark on synthetic boards.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('boards', nargs='*',
+                        help='Boards to run, all if omitted. One of: ' +
+                        ', '.join(sorted(SYNTHETIC_BOARDS)))
+    parser.add_argument('--step', type=float, default=2.54, help='Step between vias in mm.')
+    parser.add_argument('--size', type=float, default=0.4, help='Via copper size in mm.')
+    parser.add_argument('--drill', type=float, default=0.2, help='Via drill size in mm.')
+    parser.add_argument('--clearance', type=float, default=0.2, help='Via clearance in mm.')
+    parser.add_argument('--star', action='store_true', help='Use star pattern.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic boards.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs, best one is reported.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Also run with 2, 4, .. up to this number of worker processes, at most %d here.' %
+                        multiprocessing.cpu_count())
+    parser.add_argument('--save', help='Save the last filled board to this file.')
+    parser.add_argument('--verbose', action='store_true', help='Show FillArea messages.')
+    args = parser.parse_args()
+    for name in args.boards:
+        if name not in SYNTHETIC_BOARDS:
+            parser.error('Unknown board %s' % name)
+    if not args.verbose:
+        FillArea.wxPrint = lambda msg: None
+    for name in args.boards or sorted(SYNTHETIC_BOARDS, key=lambda n: SYNTHETIC_BOARDS[n][0]):
+        BenchBoard(name, args)
+
+
+if __name__ == '__main__':
+    main()
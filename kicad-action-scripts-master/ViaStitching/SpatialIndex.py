@@ -0,0 +1,327 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+#  SpatialIndex.py
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+
+from __future__ import print_function
+import math
+import sys
+try:
+    import numpy
+except ImportError:
+    # FillArea reports missing numpy when it is run, importing this module
+    # must not prevent the plugin from registering
+    numpy = None
+
+
+"""
+#  Spatial index of the obstacles (pads, tracks, vias) of via stitching
+#
+#  Obstacles are stored as plain numpy arrays and do not depend on pcbnew.
+# Each obstacle is one of:
+#   - a segment from (x0, y0) to (x1, y1) with a radius: tracks, vias,
+#     round and oval pads
+#   - a box centered on (x0, y0) with half sizes (x1, y1), an orientation
+#     and rounded corners of a radius: rectangular pads
+# and has a reach: the distance a via center has to keep from its shape.
+#
+#  ObstacleIndex sorts obstacles in a uniform grid of cells by their
+# bounding box grown by their reach. Collide() only measures the
+# distance of a point to the obstacles listed in the cell of the point.
+#
+#  Run this file to compare the index with a brute force search on
+# random obstacles:
+python SpatialIndex.py
+"""
+
+SHAPE_SEGMENT = 0
+SHAPE_BOX = 1
+
+# Average number of obstacles per cell the grid is sized for
+OBSTACLES_PER_CELL = 2
+# Upper bound of columns and rows
+MAX_GRID_SIZE = 1024
+# Number of points measured at once by BruteForceCollide
+BRUTE_FORCE_CHUNK = 1024
+
+
+class Obstacles:
+
+    """
+    Obstacles holds the shapes of all obstacles as numpy arrays
+    """
+
+    COLUMNS = ["shape", "x0", "y0", "x1", "y1", "cos", "sin", "radius", "reach"]
+
+    def __init__(self):
+        self.rows = []
+        self.Freeze()
+
+    def __len__(self):
+        return len(self.shape)
+
+    def AddSegment(self, x0, y0, x1, y1, radius, reach):
+        self.rows.append((SHAPE_SEGMENT, x0, y0, x1, y1, 1.0, 0.0, radius, reach))
+
+    def AddCircle(self, x, y, radius, reach):
+        self.AddSegment(x, y, x, y, radius, reach)
+
+    def AddBox(self, x, y, half_x, half_y, angle, radius, reach):
+        """
+        Box of half sizes half_x, half_y rotated by angle (in radians, same
+        direction as pcbnew orientations) around x, y
+        """
+        self.rows.append((SHAPE_BOX, x, y, half_x, half_y, math.cos(angle), math.sin(angle), radius, reach))
+
+    def Freeze(self):
+        """
+        Moves added obstacles to the column arrays
+        """
+        table = numpy.array(self.rows, dtype=numpy.float64).reshape(-1, len(self.COLUMNS))
+        for i, name in enumerate(self.COLUMNS):
+            setattr(self, name, table[:, i].copy())
+        self.shape = self.shape.astype(numpy.int8)
+        return self
+
+    def Subset(self, mask):
+        """
+        Obstacles selected by the bool array mask
+        """
+        subset = Obstacles()
+        subset.rows = [row for row, keep in zip(self.rows, mask.tolist()) if keep]
+        for name in self.COLUMNS:
+            setattr(subset, name, getattr(self, name)[mask])
+        return subset
+
+    def Crop(self, min_x, min_y, max_x, max_y):
+        """
+        Obstacles that may collide with a point of the given rectangle
+        """
+        boxes = self.BoundingBoxes()
+        return self.Subset((boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x) &
+                           (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y))
+
+    def BoundingBoxes(self):
+        """
+        (n, 4) array of min x, min y, max x, max y of the obstacles grown
+        by their radius and reach
+        """
+        is_box = self.shape == SHAPE_BOX
+        # Half extents of rotated boxes
+        box_x = numpy.abs(self.x1 * self.cos) + numpy.abs(self.y1 * self.sin)
+        box_y = numpy.abs(self.x1 * self.sin) + numpy.abs(self.y1 * self.cos)
+        grow = self.radius + self.reach
+        min_x = numpy.where(is_box, self.x0 - box_x, numpy.minimum(self.x0, self.x1)) - grow
+        max_x = numpy.where(is_box, self.x0 + box_x, numpy.maximum(self.x0, self.x1)) + grow
+        min_y = numpy.where(is_box, self.y0 - box_y, numpy.minimum(self.y0, self.y1)) - grow
+        max_y = numpy.where(is_box, self.y0 + box_y, numpy.maximum(self.y0, self.y1)) + grow
+        return numpy.column_stack((min_x, min_y, max_x, max_y))
+
+    def Distances(self, ids, px, py):
+        """
+        (len(px), len(ids)) array of the distances of points px, py to the
+        shapes of obstacles ids, negative inside of a shape
+        """
+        px = numpy.asarray(px, dtype=numpy.float64)[:, numpy.newaxis]
+        py = numpy.asarray(py, dtype=numpy.float64)[:, numpy.newaxis]
+        x0 = self.x0[ids]
+        y0 = self.y0[ids]
+        x1 = self.x1[ids]
+        y1 = self.y1[ids]
+        is_box = self.shape[ids] == SHAPE_BOX
+
+        # Segments: distance to the closest point of the segment
+        dx = numpy.where(is_box, 0, x1 - x0)
+        dy = numpy.where(is_box, 0, y1 - y0)
+        length = dx * dx + dy * dy
+        t = ((px - x0) * dx + (py - y0) * dy) / numpy.where(length > 0, length, 1)
+        t = numpy.clip(t, 0, 1)
+        segment = numpy.hypot(px - x0 - t * dx, py - y0 - t * dy)
+
+        # Boxes: distance in the box coordinates, see RotatePoint() of KiCad
+        cos = self.cos[ids]
+        sin = self.sin[ids]
+        u = numpy.abs((px - x0) * cos - (py - y0) * sin) - x1
+        v = numpy.abs((px - x0) * sin + (py - y0) * cos) - y1
+        box = (numpy.hypot(numpy.maximum(u, 0), numpy.maximum(v, 0)) +
+               numpy.minimum(numpy.maximum(u, v), 0))
+
+        return numpy.where(is_box, box, segment) - self.radius[ids]
+
+    def Collide(self, ids, px, py):
+        """
+        Bool array of the points px, py closer than the reach of one of
+        obstacles ids
+        """
+        if len(ids) == 0:
+            return numpy.zeros(len(px), dtype=bool)
+        return (self.Distances(ids, px, py) < self.reach[ids]).any(axis=1)
+
+
+class ObstacleIndex:
+
+    """
+    Uniform grid of cells listing the obstacles that may collide with a
+    point of the cell. Obstacles of cell k are
+    items[offsets[k]:offsets[k + 1]], cell k = iy * nx + ix.
+    """
+
+    def __init__(self, obstacles):
+        self.obstacles = obstacles
+        boxes = obstacles.BoundingBoxes()
+        if len(boxes) == 0:
+            self.x = self.y = 0.0
+            self.cw = self.ch = 1.0
+            self.nx = self.ny = 1
+            self.offsets = numpy.zeros(2, dtype=numpy.int64)
+            self.items = numpy.zeros(0, dtype=numpy.int64)
+            return
+        self.x = boxes[:, 0].min()
+        self.y = boxes[:, 1].min()
+        width = max(boxes[:, 2].max() - self.x, 1.0)
+        height = max(boxes[:, 3].max() - self.y, 1.0)
+        cell = math.sqrt(width * height * OBSTACLES_PER_CELL / len(boxes))
+        self.nx = max(1, min(MAX_GRID_SIZE, int(math.ceil(width / cell))))
+        self.ny = max(1, min(MAX_GRID_SIZE, int(math.ceil(height / cell))))
+        self.cw = width / self.nx
+        self.ch = height / self.ny
+
+        first_x, last_x = self.CellRange(boxes[:, 0], boxes[:, 2], self.x, self.cw, self.nx)
+        first_y, last_y = self.CellRange(boxes[:, 1], boxes[:, 3], self.y, self.ch, self.ny)
+        cells = []
+        items = []
+        for i in range(len(boxes)):
+            for iy in range(first_y[i], last_y[i] + 1):
+                row = iy * self.nx
+                cells.extend(range(row + first_x[i], row + last_x[i] + 1))
+                items.extend([i] * (last_x[i] - first_x[i] + 1))
+        cells = numpy.array(cells, dtype=numpy.int64)
+        order = numpy.argsort(cells, kind='mergesort')
+        self.items = numpy.array(items, dtype=numpy.int64)[order]
+        self.offsets = numpy.searchsorted(cells[order], numpy.arange(self.nx * self.ny + 1))
+
+    @staticmethod
+    def CellRange(lo, hi, origin, size, count):
+        first = numpy.floor((lo - origin) / size).astype(numpy.int64)
+        last = numpy.floor((hi - origin) / size).astype(numpy.int64)
+        return numpy.clip(first, 0, count - 1).tolist(), numpy.clip(last, 0, count - 1).tolist()
+
+    def Cell(self, px, py):
+        """
+        Cell index of points px, py, -1 for points outside of the grid
+        """
+        ix = numpy.floor((numpy.asarray(px) - self.x) / self.cw).astype(numpy.int64)
+        iy = numpy.floor((numpy.asarray(py) - self.y) / self.ch).astype(numpy.int64)
+        inside = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        return numpy.where(inside, iy * self.nx + ix, -1)
+
+    def Collide(self, px, py):
+        """
+        Bool array of the points px, py closer to an obstacle than its reach
+        """
+        px = numpy.asarray(px, dtype=numpy.float64)
+        py = numpy.asarray(py, dtype=numpy.float64)
+        result = numpy.zeros(len(px), dtype=bool)
+        cells = self.Cell(px, py)
+        # Points outside of the grid are out of reach of all obstacles
+        points = numpy.nonzero(cells >= 0)[0]
+        if len(points) == 0:
+            return result
+        points = points[numpy.argsort(cells[points], kind='mergesort')]
+        cells = cells[points]
+        # Measure points of a cell at once against the obstacles of the cell
+        starts = numpy.nonzero(numpy.concatenate(([True], cells[1:] != cells[:-1])))[0].tolist()
+        for start, end in zip(starts, starts[1:] + [len(points)]):
+            k = cells[start]
+            ids = self.items[self.offsets[k]:self.offsets[k + 1]]
+            if len(ids):
+                cell_points = points[start:end]
+                result[cell_points] = self.obstacles.Collide(ids, px[cell_points], py[cell_points])
+        return result
+
+
+def BruteForceCollide(obstacles, px, py):
+    """
+    Same as ObstacleIndex(obstacles).Collide(px, py) without index
+    """
+    result = numpy.zeros(len(px), dtype=bool)
+    ids = numpy.arange(len(obstacles))
+    for start in range(0, len(px), BRUTE_FORCE_CHUNK):
+        end = start + BRUTE_FORCE_CHUNK
+        result[start:end] = obstacles.Collide(ids, px[start:end], py[start:end])
+    return result
+
+
+def RandomObstacles(rnd, count, width, height):
+    obstacles = Obstacles()
+    for i in range(count):
+        x = rnd.uniform(0, width)
+        y = rnd.uniform(0, height)
+        reach = rnd.uniform(0.2, 0.8)
+        kind = rnd.random()
+        if kind < 0.4:
+            length = rnd.uniform(0, 20)
+            angle = rnd.choice([0, math.pi / 4, math.pi / 2, rnd.uniform(0, math.pi)])
+            obstacles.AddSegment(x, y, x + length * math.cos(angle), y + length * math.sin(angle),
+                                 rnd.choice([0.1, 0.125, 0.25]), reach)
+        elif kind < 0.6:
+            obstacles.AddCircle(x, y, rnd.uniform(0.2, 1.5), reach)
+        else:
+            half_x = rnd.uniform(0.2, 2)
+            half_y = rnd.uniform(0.2, 2)
+            radius = rnd.choice([0, 0, min(half_x, half_y) * 0.5])
+            obstacles.AddBox(x, y, half_x - radius, half_y - radius,
+                             math.radians(rnd.choice([0, 90, 45, rnd.uniform(0, 360)])), radius, reach)
+    return obstacles.Freeze()
+
+
+def Check(count=5000, points=20000, seed=0):
+    """
+    Compares ObstacleIndex with brute force on random obstacles and points
+    """
+    import random
+    import timeit
+    rnd = random.Random(seed)
+    width, height = 300.0, 400.0
+    obstacles = RandomObstacles(rnd, count, width, height)
+    px = numpy.array([rnd.uniform(-5, width + 5) for i in range(points)])
+    py = numpy.array([rnd.uniform(-5, height + 5) for i in range(points)])
+    # Points on the reach boundary of obstacles
+    px[:count] = obstacles.x0 + obstacles.radius + obstacles.reach
+    py[:count] = obstacles.y0
+
+    start = timeit.default_timer()
+    index = ObstacleIndex(obstacles)
+    build = timeit.default_timer() - start
+    start = timeit.default_timer()
+    indexed = index.Collide(px, py)
+    query = timeit.default_timer() - start
+    start = timeit.default_timer()
+    brute_force = BruteForceCollide(obstacles, px, py)
+    scan = timeit.default_timer() - start
+
+    mismatches = numpy.count_nonzero(indexed != brute_force)
+    print("%d obstacles, %d points, %d collisions, %d mismatches" % (
+        count, points, numpy.count_nonzero(brute_force), mismatches))
+    print("index build %.3f s, query %.3f s, brute force %.3f s" % (build, query, scan))
+    return mismatches == 0
+
+
+if __name__ == '__main__':
+    if not Check(*[int(arg) for arg in sys.argv[1:]]):
+        sys.exit(1)